@@ -0,0 +1,255 @@
+#!/usr/bin/env python3.8
+
+"""
+Generator of IPPcode22 benchmark workloads
+
+Writes XML representation of every workload program (and its input)
+into the workloads directory. Programs are generated deterministically,
+so the same scale always gives the same files.
+"""
+
+import os
+from argparse import ArgumentParser
+from random import Random
+from typing import Callable, Dict, List, NamedTuple, Optional
+from xml.sax.saxutils import escape
+
+WORKLOADS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "workloads")
+
+
+class Workload(NamedTuple):
+    """Generated benchmark program
+
+    Attributes:
+    source -- IPPcode22 source code
+    input -- program input, None if program doesn't read
+    """
+    source: str
+    input: Optional[str] = None
+
+
+class Generator:
+    """IPPcode22 workloads generator
+
+    Attributes:
+    scale -- multiplier of workloads size
+    """
+    _LABEL_FIRST = {"LABEL", "JUMP", "CALL", "JUMPIFEQ", "JUMPIFNEQ", "JUMPIFEQS", "JUMPIFNEQS"}
+    _FRAMES = ("GF", "LF", "TF")
+
+    def __init__(self, scale: float = 1.0):
+        """
+        Generator constructor
+
+        :param scale: multiplier of workloads size
+        """
+        self.scale = scale
+        self.workloads: Dict[str, Callable[[], Workload]] = {
+            "arith_loop": self.arith_loop,
+            "recursive_calls": self.recursive_calls,
+            "string_build": self.string_build,
+            "io_heavy": self.io_heavy,
+            "large_program": self.large_program,
+        }
+
+    def size(self, base: int) -> int:
+        """Scaled size of workload"""
+        return max(1, int(base * self.scale))
+
+    def arith_loop(self) -> Workload:
+        """Integer arithmetic and comparisons in counted loop"""
+        return Workload(f"""
+.IPPcode22
+DEFVAR GF@i
+DEFVAR GF@acc
+DEFVAR GF@tmp
+DEFVAR GF@cond
+MOVE GF@i int@0
+MOVE GF@acc int@1
+LABEL loop
+MUL GF@tmp GF@i int@7
+ADD GF@acc GF@acc GF@tmp
+IDIV GF@acc GF@acc int@3
+SUB GF@tmp GF@acc GF@i
+LT GF@cond GF@tmp int@0
+JUMPIFEQ skip GF@cond bool@false
+MOVE GF@acc int@1
+LABEL skip
+ADD GF@i GF@i int@1
+JUMPIFNEQ loop GF@i int@{self.size(100000)}
+WRITE GF@acc
+""")
+
+    def recursive_calls(self) -> Workload:
+        """Recursive fibonacci with frames, data stack and CALL/RETURN"""
+        n = 12 + max(0, round(self.scale * 6))
+        return Workload(f"""
+.IPPcode22
+JUMP main
+LABEL fib
+PUSHFRAME
+DEFVAR LF@a
+DEFVAR LF@b
+LT LF@a LF@n int@2
+JUMPIFEQ small LF@a bool@true
+CREATEFRAME
+DEFVAR TF@n
+SUB TF@n LF@n int@1
+CALL fib
+POPS LF@a
+CREATEFRAME
+DEFVAR TF@n
+SUB TF@n LF@n int@2
+CALL fib
+POPS LF@b
+ADD LF@a LF@a LF@b
+PUSHS LF@a
+POPFRAME
+RETURN
+LABEL small
+PUSHS LF@n
+POPFRAME
+RETURN
+LABEL main
+CREATEFRAME
+DEFVAR TF@n
+MOVE TF@n int@{n}
+CALL fib
+DEFVAR GF@r
+POPS GF@r
+WRITE GF@r
+""")
+
+    def string_build(self) -> Workload:
+        """String building by CONCAT, rewriting by SETCHAR and scanning by GETCHAR"""
+        return Workload(f"""
+.IPPcode22
+DEFVAR GF@s
+DEFVAR GF@i
+DEFVAR GF@len
+DEFVAR GF@ch
+DEFVAR GF@count
+MOVE GF@s string@
+MOVE GF@i int@0
+LABEL build
+CONCAT GF@s GF@s string@ab
+ADD GF@i GF@i int@1
+JUMPIFNEQ build GF@i int@{self.size(5000)}
+STRLEN GF@len GF@s
+MOVE GF@i int@0
+LABEL rewrite
+SETCHAR GF@s GF@i string@c
+ADD GF@i GF@i int@3
+LT GF@ch GF@i GF@len
+JUMPIFEQ rewrite GF@ch bool@true
+MOVE GF@i int@0
+MOVE GF@count int@0
+LABEL scan
+GETCHAR GF@ch GF@s GF@i
+JUMPIFNEQ next GF@ch string@c
+ADD GF@count GF@count int@1
+LABEL next
+ADD GF@i GF@i int@1
+JUMPIFNEQ scan GF@i GF@len
+WRITE GF@count
+""")
+
+    def io_heavy(self) -> Workload:
+        """READ of every input line and WRITE of every value"""
+        lines = self.size(50000)
+        rng = Random(14)
+        data = "".join(f"{rng.randint(-1000, 1000)}\n" for _ in range(lines))
+        return Workload("""
+.IPPcode22
+DEFVAR GF@x
+DEFVAR GF@t
+DEFVAR GF@sum
+MOVE GF@sum int@0
+LABEL loop
+READ GF@x int
+TYPE GF@t GF@x
+JUMPIFEQ end GF@t string@nil
+ADD GF@sum GF@sum GF@x
+WRITE GF@x
+WRITE string@\\010
+JUMP loop
+LABEL end
+WRITE GF@sum
+""", data)
+
+    def large_program(self) -> Workload:
+        """Long straight-line program, dominated by loading time"""
+        rng = Random(5)
+        lines = [".IPPcode22"] + [f"DEFVAR GF@v{i}" for i in range(100)] + \
+                [f"MOVE GF@v{i} int@{i}" for i in range(100)]
+        for _ in range(self.size(30000)):
+            dst, src = rng.randrange(100), rng.randrange(100)
+            op = rng.choice(["ADD", "SUB"])
+            lines.append(f"{op} GF@v{dst} GF@v{src} int@{rng.randint(-3, 3)}")
+            if rng.random() < 0.05:
+                lines.append(f"JUMPIFEQ l{len(lines)} GF@v{dst} int@-1000000000")
+                lines.append(f"LABEL l{len(lines) - 1}")
+        lines.append("WRITE GF@v0")
+        return Workload("\n".join(lines))
+
+    def to_xml(self, source: str) -> str:
+        """
+        Convert IPPcode22 source into its XML representation
+
+        :param source: IPPcode22 source code
+        :return: XML document
+        """
+        out = ['<?xml version="1.0" encoding="UTF-8"?>', '<program language="IPPcode22">']
+        order = 0
+        for line in source.strip().splitlines()[1:]:
+            parts = line.split()
+            if not parts:
+                continue
+            order += 1
+            opcode = parts[0]
+            out.append(f'<instruction order="{order}" opcode="{opcode}">')
+            for position, arg in enumerate(parts[1:], 1):
+                if position == 1 and opcode in self._LABEL_FIRST:
+                    type_, value = "label", arg
+                elif position == 2 and opcode == "READ":
+                    type_, value = "type", arg
+                elif arg.split("@", 1)[0] in self._FRAMES:
+                    type_, value = "var", arg
+                else:
+                    type_, value = arg.split("@", 1)
+                out.append(f'<arg{position} type="{type_}">{escape(value)}</arg{position}>')
+            out.append("</instruction>")
+        out.append("</program>")
+        return "\n".join(out) + "\n"
+
+    def write(self, directory: str, names: Optional[List[str]] = None) -> List[str]:
+        """
+        Generate workloads files
+
+        :param directory: output directory
+        :param names: workloads to generate, all if None
+        :return: names of generated workloads
+        """
+        os.makedirs(directory, exist_ok=True)
+        names = names or list(self.workloads)
+        for name in names:
+            workload = self.workloads[name]()
+            with open(os.path.join(directory, f"{name}.xml"), "w") as file:
+                file.write(self.to_xml(workload.source))
+            with open(os.path.join(directory, f"{name}.in"), "w") as file:
+                file.write(workload.input or "")
+        return names
+
+
+def main():
+    parser = ArgumentParser(description="Generate IPPcode22 benchmark workloads")
+    parser.add_argument("workloads", nargs="*", help="workloads to generate (default: all)")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplier of workloads size (default: 1.0)")
+    parser.add_argument("--output", default=WORKLOADS_DIR, metavar="~/dir", help="output directory")
+    args = parser.parse_args()
+    for name in Generator(args.scale).write(args.output, args.workloads):
+        print(f"{name}: {os.path.join(args.output, name + '.xml')}")
+
+
+if __name__ == "__main__":
+    main()
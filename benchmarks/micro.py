@@ -0,0 +1,294 @@
+#!/usr/bin/env python3.8
+
+"""
+Per-instruction micro-benchmarks
+
+Times evaluation of single instruction classes of interpret_ext.instructions
+in process, with constant operands and with variable operands in GF, LF and TF.
+Results are written as JSON and compared with stored baseline, opcodes slower
+than baseline beyond threshold make the harness exit with non zero code.
+"""
+
+import json
+import os
+import sys
+from argparse import ArgumentParser
+from time import perf_counter
+from typing import Callable, Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import interpret_ext.xml_parse     # noqa: E402 (imports instructions before program)
+import interpret_ext.instructions as instructions   # noqa: E402
+from interpret_ext.output import Output     # noqa: E402
+from interpret_ext.program import Program, UNDEFINED    # noqa: E402
+from interpret_ext.types_ import Constant, Label, Type, Variable, NIL    # noqa: E402
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "micro_baseline.json")
+
+# operand values: name: (type, value)
+VALUES: Dict[str, Tuple[str, object]] = {
+    "i": ("int", 7), "j": ("int", 3), "k": ("int", 1), "n": ("int", 65),
+    "p": ("bool", True), "q": ("bool", False),
+    "s": ("string", "hello"), "t": ("string", "world"), "c": ("string", "x"),
+    "w": ("string", "hello"),
+}
+
+
+class Undefine(instructions.Instruction):
+    """Make variable undefined again, frame reset of DEFVAR case"""
+    __slots__ = ()
+
+    def eval(self):
+        var = self.arguments[0]
+        self.program.frame(var)[var.slot] = UNDEFINED
+
+
+class Sink:
+    """Stream of WRITE and DPRINT output, written texts are dropped"""
+    def write(self, text: str) -> None:
+        pass
+
+    def flush(self) -> None:
+        pass
+
+
+class Lines:
+    """Endless in-memory input of READ, every line is LINE"""
+    LINE: str = "42\n"
+
+    def read(self, size: int) -> str:
+        return self.LINE * max(1, size // len(self.LINE))
+
+
+# case name: evaluated instructions with operands
+# "=x" is destination variable, "@l" label, ":t" type, other names are source operands from VALUES
+CASES: Dict[str, List[Tuple[type, List[str]]]] = {
+    "MOVE": [(instructions.Move, ["=r", "i"])],
+    "ADD": [(instructions.Add, ["=r", "i", "j"])],
+    "SUB": [(instructions.Sub, ["=r", "i", "j"])],
+    "MUL": [(instructions.Mul, ["=r", "i", "j"])],
+    "IDIV": [(instructions.Idiv, ["=r", "i", "j"])],
+    "LT": [(instructions.Lt, ["=r", "i", "j"])],
+    "GT": [(instructions.Gt, ["=r", "i", "j"])],
+    "EQ": [(instructions.Eq, ["=r", "i", "j"])],
+    "AND": [(instructions.And, ["=r", "p", "q"])],
+    "OR": [(instructions.Or, ["=r", "p", "q"])],
+    "NOT": [(instructions.Not, ["=r", "p"])],
+    "INT2CHAR": [(instructions.Int2Char, ["=r", "n"])],
+    "STRI2INT": [(instructions.Stri2Int, ["=r", "s", "k"])],
+    "CONCAT": [(instructions.Concat, ["=r", "s", "t"])],
+    "STRLEN": [(instructions.Strlen, ["=r", "s"])],
+    "GETCHAR": [(instructions.Getchar, ["=r", "s", "k"])],
+    "SETCHAR": [(instructions.Setchar, ["=w", "k", "c"])],
+    "TYPE": [(instructions.Type, ["=r", "s"])],
+    "JUMPIFEQ": [(instructions.Jumpifeq, ["@l", "i", "i"])],
+    "JUMPIFNEQ": [(instructions.Jumpifneq, ["@l", "i", "j"])],
+    "PUSHS/POPS": [(instructions.Pushs, ["i"]), (instructions.Pops, ["=r"])],
+    # stack variants, operands are pushed and result popped, so the data stack stays balanced
+    "ADDS": [(instructions.Pushs, ["i"]), (instructions.Pushs, ["j"]), (instructions.Adds, []),
+             (instructions.Pops, ["=r"])],
+    "LTS": [(instructions.Pushs, ["i"]), (instructions.Pushs, ["j"]), (instructions.Lts, []),
+            (instructions.Pops, ["=r"])],
+    "JUMPIFEQS": [(instructions.Pushs, ["i"]), (instructions.Pushs, ["i"]), (instructions.Jumpifeqs, ["@l"])],
+    "CLEARS": [(instructions.Pushs, ["i"]), (instructions.Clears, [])],
+    # check-free variants of proven operand types
+    "ADD unchecked": [(instructions.AddUnchecked, ["=r", "i", "j"])],
+    "LT unchecked": [(instructions.LtUnchecked, ["=r", "i", "j"])],
+    "CONCAT unchecked": [(instructions.ConcatUnchecked, ["=r", "s", "t"])],
+    "JUMPIFEQ unchecked": [(instructions.JumpifeqUnchecked, ["@l", "i", "i"])],
+    # input and output, WRITE and DPRINT write into Sink, READ reads from Lines
+    "WRITE": [(instructions.Write, ["s"])],
+    "DPRINT": [(instructions.Dprint, ["s"])],
+    "READ": [(instructions.Read, ["=r", ":int"])],
+    "DEFVAR": [(Undefine, ["=d"]), (instructions.Defvar, ["=d"])],
+    "EXIT": [(instructions.Exit, ["k"])],
+    # frame independent cases
+    "JUMP": [(instructions.Jump, ["@l"])],
+    "CALL/RETURN": [(instructions.Call, ["@l"]), (instructions.Return, [])],
+    "CREATEFRAME": [(instructions.Createframe, [])],
+    "PUSHFRAME/POPFRAME": [(instructions.Pushframe, []), (instructions.Popframe, [])],
+}
+
+KINDS = ("const", "GF", "LF", "TF")
+
+
+class Harness:
+    """Micro-benchmark harness
+
+    Every case is built for every operand kind: "const" uses constant
+    sources (and GF destination), GF, LF and TF use variables of the frame.
+    Cases without variable operands are built once with kind "-".
+    Program output goes into Sink and input is read from Lines,
+    SystemExit of EXIT is caught in the timed loop.
+
+    Attributes:
+    number -- evaluations in one timed run
+    repeat -- count of timed runs, the fastest one is reported
+    """
+    def __init__(self, number: int, repeat: int):
+        """
+        Harness constructor
+
+        :param number: evaluations in one timed run
+        :param repeat: count of timed runs
+        """
+        self.number = number
+        self.repeat = repeat
+        Program(Lines())   # first instance, READ input
+        self.program = Program.get_instance()
+        self.program.output = self.program.errors = Output(Sink())
+        self._cases: Dict[str, List] = {}     # "NAME kind": instructions
+        for name, sequence in CASES.items():
+            variables = any(operand[0] not in "@:" for _, operands in sequence for operand in operands)
+            for kind in KINDS if variables else ("-",):
+                self._cases[f"{name} {kind}"] = [cls([self.operand(o, kind) for o in operands])
+                                                 for cls, operands in sequence]
+        self.program.load_instructions([inst for insts in self._cases.values() for inst in insts], {"l": 0})
+        self.program.link()
+
+    @staticmethod
+    def operand(operand: str, kind: str):
+        """
+        Build instruction operand
+
+        :param operand: operand description from CASES
+        :param kind: operand kind
+        :return: operand
+        """
+        if operand[0] == "@":
+            return Label(operand[1:])
+        if operand[0] == ":":
+            return Type(operand[1:])
+        if operand[0] == "=":
+            return Variable(f"{'GF' if kind == 'const' else kind}@{operand[1:]}")
+        if kind == "const":
+            return Constant.of(*VALUES[operand])
+        return Variable(f"{kind}@{operand}")
+
+    def reset(self) -> None:
+        """Define all variables in fresh frames and clear stacks"""
+        program = self.program
+
+        def fill(frame: List, slots: Dict[str, int]) -> None:
+            for name, slot in slots.items():
+                frame[slot] = Constant.of(*VALUES[name]) if name in VALUES else NIL
+
+        fill(program.global_frame, program.get_global_slots)
+        local = program.get_empty_frame.copy()
+        fill(local, program.get_frame_slots)
+        program.local_frame[:] = [local]
+        program.tmp_frame = local.copy()
+        program.data_stack.clear()
+        program.call_stack.clear()
+
+    @staticmethod
+    def caught(evaluate: Callable[[], None]) -> Callable[[], None]:
+        """
+        Wrap evaluation ending the program
+
+        :param evaluate: evaluation raising SystemExit
+        :return: evaluation with caught SystemExit
+        """
+        def run() -> None:
+            try:
+                evaluate()
+            except SystemExit:
+                pass
+        return run
+
+    def time(self, insts: List) -> float:
+        """
+        Time evaluation of instructions sequence
+
+        :param insts: evaluated instructions
+        :return: nanoseconds of one sequence evaluation (the fastest run)
+        """
+        evals = [self.caught(inst.eval) if isinstance(inst, instructions.Exit) else inst.eval for inst in insts]
+        first, second = evals[0], evals[-1]
+        loop = range(self.number)
+        best = float("inf")
+        for _ in range(self.repeat):
+            self.reset()
+            if len(evals) == 1:
+                start = perf_counter()
+                for _ in loop:
+                    first()
+                elapsed = perf_counter() - start
+            elif len(evals) == 2:
+                start = perf_counter()
+                for _ in loop:
+                    first()
+                    second()
+                elapsed = perf_counter() - start
+            else:
+                start = perf_counter()
+                for _ in loop:
+                    for evaluate in evals:
+                        evaluate()
+                elapsed = perf_counter() - start
+            best = min(best, elapsed)
+        return best / self.number * 1e9
+
+    def run(self) -> Dict[str, float]:
+        """
+        Time all cases
+
+        :return: case name: nanoseconds per evaluation
+        """
+        return {case: round(self.time(insts), 1) for case, insts in self._cases.items()}
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], threshold: float) -> List[str]:
+    """
+    Find regressed cases
+
+    :param results: measured nanoseconds per case
+    :param baseline: stored nanoseconds per case
+    :param threshold: allowed relative slowdown
+    :return: regression descriptions
+    """
+    return [f"{case}: {baseline[case]} ns -> {ns} ns" for case, ns in results.items()
+            if case in baseline and ns > baseline[case] * (1 + threshold)]
+
+
+def main():
+    parser = ArgumentParser(description="Run per-instruction micro-benchmarks")
+    parser.add_argument("--number", type=int, default=20000, help="evaluations in one timed run (default: 20000)")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs of every case (default: 5)")
+    parser.add_argument("--output", metavar="~/results.json", help="write results JSON")
+    parser.add_argument("--baseline", default=BASELINE, metavar="~/baseline.json", help="stored baseline")
+    parser.add_argument("--update-baseline", action="store_true", help="store results as new baseline")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed relative slowdown of opcode (default: 0.25)")
+    args = parser.parse_args()
+
+    results = Harness(args.number, args.repeat).run()
+    try:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    except FileNotFoundError:
+        baseline = {}
+    for case, ns in results.items():
+        change = f"{(ns / baseline[case] - 1) * 100:+6.1f} %" if case in baseline else ""
+        print(f"{case:<26}{ns:>10.1f} ns {change}")
+
+    for path in [args.output] + ([args.baseline] if args.update_baseline else []):
+        if path:
+            with open(path, "w") as file:
+                json.dump(results, file, indent=1)
+                file.write("\n")
+    if args.update_baseline:
+        print(f"baseline stored: {args.baseline}")
+        return
+    regressions = compare(results, baseline, args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if regressions:
+        exit(1)
+    print("no regressions" if baseline else "no baseline to compare")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3.8
+
+"""
+Runner of IPPcode22 benchmark workloads
+
+Runs interpret.py on every generated workload and reports executed
+instructions per second, program loading time and peak RSS.
+Results are compared with stored baseline, regressions beyond tolerance
+make the runner exit with non zero code.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from argparse import ArgumentParser
+from typing import Any, Dict, List, Optional
+
+from generate import Generator, WORKLOADS_DIR
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INTERPRET = os.path.join(ROOT, "interpret.py")
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+NOISE = 0.01    # load time differences below this many seconds are ignored
+
+# loading of program without execution, prints elapsed seconds
+_LOAD_SCRIPT = """
+import sys, time
+sys.path.insert(0, sys.argv[1])
+import interpret_ext.xml_parse as xml_parse
+from interpret_ext.program import Program
+start = time.perf_counter()
+program = Program(None)
+with open(sys.argv[2]) as source:
+    program.process_instructions(xml_parse.XMLParse(source).get_instructions)
+program.link()
+print(time.perf_counter() - start)
+"""
+
+
+class Runner:
+    """Benchmark runner
+
+    Attributes:
+    directory -- workloads directory
+    repeat -- count of timed runs, the fastest one is reported
+    interpret_args -- additional interpret.py arguments (e.g. engine)
+    """
+    def __init__(self, directory: str, repeat: int, interpret_args: List[str]):
+        """
+        Runner constructor
+
+        :param directory: workloads directory
+        :param repeat: count of timed runs
+        :param interpret_args: additional interpret.py arguments
+        """
+        self.directory = directory
+        self.repeat = repeat
+        self.interpret_args = interpret_args
+
+    def files(self, name: str) -> List[str]:
+        """Source and input arguments of workload"""
+        return [f"--source={os.path.join(self.directory, name + '.xml')}",
+                f"--input={os.path.join(self.directory, name + '.in')}"]
+
+    @staticmethod
+    def execute(args: List[str]) -> Dict[str, float]:
+        """
+        Run interpret.py once
+
+        :param args: interpret.py arguments
+        :return: CPU time in seconds and peak RSS in MB
+        """
+        process = subprocess.Popen([sys.executable, INTERPRET] + args,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        _, status, usage = os.wait4(process.pid, 0)
+        if not os.WIFEXITED(status) or os.WEXITSTATUS(status) != 0:
+            raise RuntimeError(f"interpret.py {' '.join(args)} failed (status {status})")
+        return {"time": usage.ru_utime + usage.ru_stime, "peak_rss_mb": usage.ru_maxrss / 1024}
+
+    def count_instructions(self, name: str) -> int:
+        """Count of executed instructions, taken from profile report"""
+        with tempfile.TemporaryDirectory() as directory:
+            report = os.path.join(directory, "profile.json")
+            self.execute(self.files(name) + [f"--profile={report}"])
+            with open(report) as file:
+                return json.load(file)["executed_instructions"]
+
+    def load_time(self, name: str) -> float:
+        """Time of program loading (XML parsing and linking) in seconds"""
+        times = []
+        for _ in range(self.repeat):
+            output = subprocess.run([sys.executable, "-c", _LOAD_SCRIPT, ROOT,
+                                     os.path.join(self.directory, name + ".xml")],
+                                    check=True, capture_output=True, text=True).stdout
+            times.append(float(output))
+        return min(times)
+
+    def measure(self, name: str) -> Dict[str, Any]:
+        """
+        Measure single workload
+
+        :param name: workload name
+        :return: workload metrics
+        """
+        runs = [self.execute(self.files(name) + self.interpret_args) for _ in range(self.repeat)]
+        time = min(run["time"] for run in runs)    # CPU time is less noisy than wall time
+        instructions = self.count_instructions(name)
+        return {
+            "instructions": instructions,
+            "time": round(time, 4),
+            "instructions_per_second": round(instructions / time),
+            "load_time": round(self.load_time(name), 4),
+            "peak_rss_mb": round(max(run["peak_rss_mb"] for run in runs), 1),
+        }
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float) -> List[str]:
+    """
+    Find regressions against baseline
+
+    :param results: measured metrics of workloads
+    :param baseline: stored metrics of workloads
+    :param tolerance: allowed relative slowdown or growth
+    :return: regression descriptions
+    """
+    regressions = []
+    for name, metrics in results.items():
+        base: Optional[Dict] = baseline.get(name)
+        if base is None:
+            continue
+        checks = [("instructions_per_second", metrics["instructions_per_second"] < base["instructions_per_second"] * (1 - tolerance)),
+                  ("load_time", metrics["load_time"] > max(base["load_time"] * (1 + tolerance), base["load_time"] + NOISE)),
+                  ("peak_rss_mb", metrics["peak_rss_mb"] > base["peak_rss_mb"] * (1 + tolerance))]
+        regressions += [f"{name}: {metric} {base[metric]} -> {metrics[metric]}" for metric, failed in checks if failed]
+    return regressions
+
+
+def main():
+    parser = ArgumentParser(description="Run IPPcode22 benchmark workloads")
+    parser.add_argument("workloads", nargs="*", help="workloads to run (default: all)")
+    parser.add_argument("--directory", default=WORKLOADS_DIR, metavar="~/dir", help="workloads directory")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs of every workload (default: 3)")
+    parser.add_argument("--baseline", default=BASELINE, metavar="~/baseline.json", help="stored baseline")
+    parser.add_argument("--update-baseline", action="store_true", help="store results as new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="allowed relative regression (default: 0.15)")
+    parser.add_argument("--interpret-args", default="", metavar="ARGS",
+                        help="additional interpret.py arguments, e.g. '--engine=closure'")
+    args = parser.parse_args()
+
+    generator = Generator()
+    names = args.workloads or list(generator.workloads)
+    missing = [name for name in names if not os.path.exists(os.path.join(args.directory, name + ".xml"))]
+    if missing:     # separate process, so forked interpret.py runs don't inherit memory of generated workloads
+        subprocess.run([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "generate.py"),
+                        f"--output={args.directory}", *missing], check=True, stdout=subprocess.DEVNULL)
+
+    runner = Runner(args.directory, args.repeat, args.interpret_args.split())
+    results = {}
+    print(f"{'workload':<18}{'instructions':>13}{'time [s]':>10}{'instr/s':>12}{'load [s]':>10}{'RSS [MB]':>10}")
+    for name in names:
+        metrics = results[name] = runner.measure(name)
+        print(f"{name:<18}{metrics['instructions']:>13}{metrics['time']:>10.3f}{metrics['instructions_per_second']:>12}"
+              f"{metrics['load_time']:>10.3f}{metrics['peak_rss_mb']:>10.1f}")
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump(results, file, indent=1, sort_keys=True)
+            file.write("\n")
+        print(f"baseline stored: {args.baseline}")
+        return
+    try:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    except FileNotFoundError:
+        print("no baseline to compare")
+        return
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if regressions:
+        exit(1)
+    print("no regressions")
+
+
+if __name__ == "__main__":
+    main()
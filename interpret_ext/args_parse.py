@@ -2,10 +2,12 @@
 
 from argparse import ArgumentParser, RawTextHelpFormatter
 from sys import stdin, argv
-from typing import TextIO
+from typing import TextIO, List, Optional
 
 from interpret_ext.utils import Utils
 from interpret_ext.ret_codes import RetCodes
+from interpret_ext.cache import ProgramCache
+from interpret_ext.memo import Memoization
 
 
 class ArgsParse:
@@ -18,6 +20,7 @@ class ArgsParse:
     _PROGRAM = "interpret.py"
     _DESCRIPTION = "The script reads an XML representation of the program,\n" \
                    "interprets it using command line parameters and generates output."
+    _ENGINES: List = ["interpret", "closure", "trace"]
     _EPILOG = "At least one of the parameters (source or input) must be always assigned.\n" \
               "If one of them is missing, reads missing data from standard input.\n"
 
@@ -34,6 +37,40 @@ class ArgsParse:
                                   help="path to program XML representation")
         self._parser.add_argument("--input", nargs="?", type=open, default=stdin, metavar="~/src",
                                   help="path to file with input")
+        self._parser.add_argument("--engine", default="interpret", metavar="ENGINE",
+                                  help="execution engine: 'interpret' (default) evaluates instructions one by one,\n"
+                                       "'closure' compiles instructions into specialized closures first,\n"
+                                       "'trace' interprets and compiles hot loops into python functions")
+        self._parser.add_argument("--compile", action="store_true",
+                                  help="translate program into python module, cached as .pyc by source hash")
+        self._parser.add_argument("--cache", action="store_true",
+                                  help="cache processed program in binary form, repeated runs skip XML parsing")
+        self._parser.add_argument("--cache-dir", default=None, metavar="~/dir",
+                                  help=f"directory for cached programs (default: {ProgramCache.DIRECTORY} next to source)")
+        self._parser.add_argument("--profile", default=None, metavar="~/out.json",
+                                  help="write execution count and time of every opcode, instruction and label\n"
+                                       "into JSON file (only with default engine)")
+        self._parser.add_argument("--sample", default=None, metavar="~/out.folded",
+                                  help="periodically sample call stack and write it in folded stacks format\n"
+                                       "for flamegraph tools (not with --compile)")
+        self._parser.add_argument("-O", dest="optimize", action="store_true",
+                                  help="optimize program before execution (constant folding, copy propagation,\n"
+                                       "dead code removal, tail calls, type and variable checks elision)")
+        self._parser.add_argument("--peephole", action="store_true",
+                                  help="fuse recurring instructions sequences into superinstructions\n"
+                                       "(only with default engine)")
+        self._parser.add_argument("--peephole-report", default=None, metavar="~/out.json",
+                                  help="write fused patterns and their counts into JSON file (implies --peephole)")
+        self._parser.add_argument("--memo", action="store_true",
+                                  help="cache results of pure function calls by their arguments frame\n"
+                                       "(not with --compile)")
+        self._parser.add_argument("--memo-size", type=int, default=Memoization.SIZE, metavar="N",
+                                  help=f"maximal count of cached call results (default: {Memoization.SIZE})")
+        self._parser.add_argument("--memo-report", default=None, metavar="~/out.json",
+                                  help="write cache hits and misses into JSON file (implies --memo)")
+        self._parser.add_argument("--line-buffered", action="store_true",
+                                  help="flush program output after every line (interactive use),\n"
+                                       "by default output is collected in large buffer")
         try:
             self.args, self._unknown_args = self._parser.parse_known_args()
         except FileNotFoundError:
@@ -56,6 +93,20 @@ class ArgsParse:
             Utils.error("can't open file", RetCodes.OPEN_IN_ERR)
         elif self._unknown_args:
             Utils.error("unknown parameter", RetCodes.PARAM_ERR)
+        elif self.get_engine not in self._ENGINES:
+            Utils.error(f"unknown engine ({self.get_engine})", RetCodes.PARAM_ERR)
+        elif self.get_compile and self.get_engine != "interpret":
+            Utils.error("--compile can't be combined with --engine", RetCodes.PARAM_ERR)
+        elif self.get_profile is not None and (self.get_compile or self.get_engine != "interpret"):
+            Utils.error("--profile can be used only with default engine", RetCodes.PARAM_ERR)
+        elif self.get_sample is not None and self.get_compile:
+            Utils.error("--sample can't be combined with --compile", RetCodes.PARAM_ERR)
+        elif self.get_peephole and (self.get_compile or self.get_engine != "interpret"):
+            Utils.error("--peephole can be used only with default engine", RetCodes.PARAM_ERR)
+        elif self.get_memo and self.get_compile:
+            Utils.error("--memo can't be combined with --compile", RetCodes.PARAM_ERR)
+        elif self.get_memo_size < 1:
+            Utils.error("--memo-size must be positive", RetCodes.PARAM_ERR)
 
     @staticmethod
     def check_help() -> None:
@@ -75,3 +126,68 @@ class ArgsParse:
     def get_input(self) -> TextIO:
         """Input file getter"""
         return self.args.input
+
+    @property
+    def get_engine(self) -> str:
+        """Execution engine name getter"""
+        return self.args.engine
+
+    @property
+    def get_compile(self) -> bool:
+        """Translation into python module flag getter"""
+        return self.args.compile
+
+    @property
+    def get_cache_dir(self) -> Optional[str]:
+        """Cache directory getter"""
+        return self.args.cache_dir
+
+    @property
+    def get_cache(self) -> bool:
+        """Binary program cache flag getter"""
+        return self.args.cache
+
+    @property
+    def get_profile(self) -> Optional[str]:
+        """Profile report file path getter"""
+        return self.args.profile
+
+    @property
+    def get_sample(self) -> Optional[str]:
+        """Sampling report file path getter"""
+        return self.args.sample
+
+    @property
+    def get_optimize(self) -> bool:
+        """Static optimization flag getter"""
+        return self.args.optimize
+
+    @property
+    def get_peephole(self) -> bool:
+        """Peephole optimization flag getter"""
+        return self.args.peephole or self.args.peephole_report is not None
+
+    @property
+    def get_peephole_report(self) -> Optional[str]:
+        """Peephole report file path getter"""
+        return self.args.peephole_report
+
+    @property
+    def get_memo(self) -> bool:
+        """Pure calls memoization flag getter"""
+        return self.args.memo or self.args.memo_report is not None
+
+    @property
+    def get_memo_size(self) -> int:
+        """Memoization cache size getter"""
+        return self.args.memo_size
+
+    @property
+    def get_memo_report(self) -> Optional[str]:
+        """Memoization report file path getter"""
+        return self.args.memo_report
+
+    @property
+    def get_line_buffered(self) -> bool:
+        """Line buffered output flag getter"""
+        return self.args.line_buffered
@@ -0,0 +1,185 @@
+"""Definite assignment analysis of loaded program"""
+
+from collections import Counter
+from heapq import heappop, heappush
+from typing import Dict, List, Optional, Set, Tuple
+
+from interpret_ext.program import Program
+from interpret_ext.cfg import ControlFlowGraph
+from interpret_ext.optimizer import READS, WRITES
+import interpret_ext.instructions as instructions
+import interpret_ext.types_ as types
+
+FRAMES: Tuple[str, ...] = ("GF", "LF", "TF")
+
+# variables of frame: (defined, initialized, possibly defined), slots sets
+# possibly defined is None, if it isn't known (any variable may be defined)
+FrameFacts = Tuple[frozenset, frozenset, Optional[frozenset]]
+Facts = Dict[str, FrameFacts]
+
+EMPTY_FRAME: FrameFacts = (frozenset(), frozenset(), frozenset())  # new frame, no variable is defined
+UNKNOWN_FRAME: FrameFacts = (frozenset(), frozenset(), None)        # frame of unknown content
+
+
+class DefiniteAssignment:
+    """Definite assignment analysis
+
+    Optional load time pass over linked program (-O). Over control flow graph
+    are propagated variables, which are surely defined, surely initialized
+    and which are possibly defined. Variable operands of accesses, which can't fail,
+    are replaced with unchecked copies (Variable.unchecked): reads of surely
+    initialized variables (TYPE needs only defined one), writes of surely defined
+    variables and DEFVAR of variables, which can't be defined yet.
+    Other accesses keep their checks, so errors of program stay the same.
+
+    Variable surely exists after successful access too. Global variables
+    can't be undefined, so their facts are kept after CALL, facts of local
+    and temporary frames are moved by frames changing instructions
+    and forgotten on return from CALL.
+
+    Attributes:
+    program -- linked program
+    stats -- count of unchecked accesses by kind (read, write, defvar)
+    """
+    def __init__(self, program: Program):
+        """
+        Definite assignment analysis constructor
+
+        :param program: linked program
+        """
+        self.program = program
+        self.stats: Counter = Counter()
+        self._insts: List[instructions.Instruction] = program.get_instructions
+        self._cfg: ControlFlowGraph = ControlFlowGraph(self._insts)
+        self._unchecked: Dict[Tuple[str, int], types.Variable] = {}    # shared unchecked copies of variables
+
+    def optimize(self) -> None:
+        """Analyze program and replace operands of safe accesses"""
+        cfg = self._cfg
+        for block, entry in self.analyze().items():
+            facts = self.thaw(entry)
+            for index in range(cfg.starts[block], cfg.end(block)):
+                self.transfer(self._insts[index], facts, rewrite=True)
+
+    def analyze(self) -> Dict[int, Facts]:
+        """
+        Propagate assignment facts through reachable blocks
+
+        :return: facts on entry of every reachable block
+        """
+        cfg = self._cfg
+        entry: Dict[int, Facts] = {0: {frame: EMPTY_FRAME for frame in FRAMES}} if cfg.starts else {}
+        pending: List[int] = [0] if cfg.starts else []     # heap of blocks with changed entry facts
+        while pending:
+            block = heappop(pending)
+            while pending and pending[0] == block:
+                heappop(pending)
+            facts = self.thaw(entry[block])
+            for index in range(cfg.starts[block], cfg.end(block)):
+                self.transfer(self._insts[index], facts)
+            out = self.freeze(facts)
+            outgoing = [(successor, out) for successor in cfg.successors[block]]
+            if cfg.returns[block] is not None:
+                # callee may define global variables and change other frames
+                defined, initialized, _ = out["GF"]
+                outgoing.append((cfg.returns[block], {"GF": (defined, initialized, None),
+                                                      "LF": UNKNOWN_FRAME, "TF": UNKNOWN_FRAME}))
+            for successor, facts_out in outgoing:
+                new = self.meet(entry.get(successor), facts_out)
+                if successor not in entry or new != entry[successor]:
+                    entry[successor] = new
+                    heappush(pending, successor)
+        return entry
+
+    @staticmethod
+    def meet(first: Optional[Facts], second: Facts) -> Facts:
+        """Facts valid on both paths"""
+        if first is None:
+            return second
+        facts = {}
+        for frame in FRAMES:
+            defined1, initialized1, possible1 = first[frame]
+            defined2, initialized2, possible2 = second[frame]
+            possible = None if possible1 is None or possible2 is None else possible1 | possible2
+            facts[frame] = (defined1 & defined2, initialized1 & initialized2, possible)
+        return facts
+
+    @staticmethod
+    def thaw(facts: Facts) -> Dict[str, List[Optional[Set[int]]]]:
+        """Mutable copy of facts"""
+        return {frame: [set(defined), set(initialized), None if possible is None else set(possible)]
+                for frame, (defined, initialized, possible) in facts.items()}
+
+    @staticmethod
+    def freeze(facts: Dict[str, List[Optional[Set[int]]]]) -> Facts:
+        """Immutable copy of facts"""
+        return {frame: (frozenset(defined), frozenset(initialized), None if possible is None else frozenset(possible))
+                for frame, (defined, initialized, possible) in facts.items()}
+
+    def transfer(self, inst: instructions.Instruction, facts: Dict[str, List[Optional[Set[int]]]],
+                 rewrite: bool = False) -> None:
+        """
+        Update facts by effect of instruction
+
+        :param inst: instruction
+        :param facts: facts before instruction, updated in place
+        :param rewrite: replace operands of safe accesses
+        """
+        cls = type(inst)
+        args = inst.arguments
+        reads = (0, 1, 2) if cls is instructions.Setchar else READS.get(cls, ())
+        for position in reads:
+            var = args[position]
+            if not isinstance(var, types.Variable):
+                continue
+            defined, initialized, possible = facts[var.get_frame]
+            # TYPE reads also uninitialized variable
+            required = defined if cls is instructions.Type else initialized
+            if rewrite and var.slot in required:
+                args[position] = self.unchecked(var, "read")
+            defined.add(var.slot)
+            if cls is not instructions.Type:
+                initialized.add(var.slot)
+            if possible is not None:
+                possible.add(var.slot)
+        if cls is instructions.Defvar:
+            var = args[0]
+            defined, initialized, possible = facts[var.get_frame]
+            if rewrite and possible is not None and var.slot not in possible:
+                args[0] = self.unchecked(var, "defvar")
+            defined.add(var.slot)
+            initialized.discard(var.slot)
+            if possible is not None:
+                possible.add(var.slot)
+        elif cls in WRITES:
+            var = args[0]
+            defined, initialized, possible = facts[var.get_frame]
+            # SETCHAR destination is read operand too, its access is decided as read
+            if rewrite and var.slot in defined and cls is not instructions.Setchar:
+                args[0] = self.unchecked(var, "write")
+            defined.add(var.slot)
+            initialized.add(var.slot)
+            if possible is not None:
+                possible.add(var.slot)
+        elif cls is instructions.Createframe:
+            facts["TF"] = [set(), set(), set()]
+        elif cls is instructions.Pushframe:
+            facts["LF"], facts["TF"] = facts["TF"], [set(), set(), set()]
+        elif cls is instructions.Popframe:
+            facts["TF"], facts["LF"] = facts["LF"], [set(), set(), None]
+
+    def unchecked(self, var: types.Variable, kind: str) -> types.Variable:
+        """
+        Shared unchecked copy of variable
+
+        :param var: accessed variable
+        :param kind: access kind for statistics
+        :return: unchecked variable
+        """
+        self.stats[kind] += 1
+        if not var.checked:
+            return var
+        copy = self._unchecked.get((var.get_frame, var.slot))
+        if copy is None:
+            copy = self._unchecked[(var.get_frame, var.slot)] = var.unchecked()
+        return copy
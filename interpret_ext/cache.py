@@ -0,0 +1,161 @@
+"""On disk cache of processed programs"""
+
+import marshal
+from hashlib import sha256
+from importlib.util import MAGIC_NUMBER, source_hash
+from os import makedirs, replace, getpid
+from os.path import abspath, dirname, join
+from types import CodeType
+from typing import Optional, List, Dict, Tuple
+
+from interpret_ext import __version__
+import interpret_ext.instructions as instructions
+import interpret_ext.types_ as types
+
+
+class ProgramCache:
+    """Cache of artifacts built from single program source
+
+    Artifacts are keyed by hash of the source content and interpreter version,
+    translated module also by options variant (processed program is the same for all variants).
+    They are stored in cache directory next to the source file (or in the working
+    directory, when source is read from standard input).
+    Cache failures are never fatal, program is processed again instead.
+
+    Attributes:
+    key -- hex digest identifying program source
+    code_key -- hex digest identifying program source translated with options variant
+    directory -- cache directory
+    """
+    DIRECTORY = "__ippcache__"
+    _PYC_FLAGS = (1).to_bytes(4, "little")     # hash based, unchecked pyc (PEP 552)
+    _PROGRAM_MAGIC = b"IPC" + bytes([marshal.version])
+
+    def __init__(self, source: str, source_path: Optional[str] = None, directory: Optional[str] = None,
+                 variant: str = ""):
+        """
+        Program cache constructor
+
+        :param source: program XML source
+        :param source_path: path of the source file, None for standard input
+        :param directory: explicit cache directory
+        :param variant: options changing translated module (e.g. optimization)
+        """
+        self._source = source.encode()
+        self.key = sha256(__version__.encode() + b"\0" + self._source).hexdigest()
+        self.code_key = sha256(f"{__version__}{variant}".encode() + b"\0" + self._source).hexdigest()
+        if directory is None:
+            directory = join(dirname(abspath(source_path)) if source_path else ".", self.DIRECTORY)
+        self.directory = directory
+
+    def path(self, key: str, suffix: str) -> str:
+        """
+        Path of cached artifact
+
+        :param key: artifact key
+        :param suffix: artifact file extension
+        :return: path in cache directory
+        """
+        return join(self.directory, f"{key}{suffix}")
+
+    def read(self, key: str, suffix: str) -> Optional[bytes]:
+        """
+        Read cached artifact
+
+        :param key: artifact key
+        :param suffix: artifact file extension
+        :return: artifact content, None if not cached
+        """
+        try:
+            with open(self.path(key, suffix), "rb") as file:
+                return file.read()
+        except OSError:
+            return None
+
+    def write(self, key: str, suffix: str, data: bytes) -> None:
+        """
+        Atomically store artifact
+
+        :param key: artifact key
+        :param suffix: artifact file extension
+        :param data: artifact content
+        """
+        path = self.path(key, suffix)
+        tmp_path = f"{path}.{getpid()}.tmp"
+        try:
+            makedirs(self.directory, exist_ok=True)
+            with open(tmp_path, "wb") as file:
+                file.write(data)
+            replace(tmp_path, path)
+        except OSError:
+            pass
+
+    def load_code(self) -> Optional[CodeType]:
+        """
+        Load cached compiled module
+
+        :return: module code object, None if not cached or compiled by other python version
+        """
+        data = self.read(self.code_key, ".pyc")
+        if data is None or data[:4] != MAGIC_NUMBER or data[4:8] != self._PYC_FLAGS:
+            return None
+        try:
+            return marshal.loads(data[16:])
+        except (EOFError, ValueError, TypeError):
+            return None
+
+    def store_code(self, code: CodeType) -> None:
+        """
+        Store compiled module as .pyc file
+
+        :param code: module code object
+        """
+        self.write(self.code_key, ".pyc",
+                   MAGIC_NUMBER + self._PYC_FLAGS + source_hash(self._source) + marshal.dumps(code))
+
+    def load_program(self) -> Optional[Tuple[List[instructions.Instruction], Dict[str, int]]]:
+        """
+        Load cached processed program
+
+        :return: instructions without labels and labels dictionary, None if not cached
+        """
+        data = self.read(self.key, ".ippc")
+        if data is None or data[:4] != self._PROGRAM_MAGIC:
+            return None
+        try:
+            encoded, labels = marshal.loads(data[4:])
+            operands: Dict[Tuple, types.Types] = {}     # decoded operands are interned as in XML parsing
+            return [getattr(instructions, opcode)([operands[arg] if arg in operands else
+                                                   operands.setdefault(arg, self._decode_argument(arg))
+                                                   for arg in args])
+                    for opcode, args in encoded], labels
+        except (EOFError, ValueError, TypeError, AttributeError):
+            return None
+
+    def store_program(self, insts: List[instructions.Instruction], labels: Dict[str, int]) -> None:
+        """
+        Store processed program in compact binary form
+
+        :param insts: instructions without labels
+        :param labels: labels name:line dictionary
+        """
+        encoded = [(type(inst).__name__, [self._encode_argument(arg) for arg in inst.arguments]) for inst in insts]
+        self.write(self.key, ".ippc", self._PROGRAM_MAGIC + marshal.dumps((encoded, labels)))
+
+    @staticmethod
+    def _encode_argument(arg: types.Types) -> Tuple:
+        """Instruction argument to marshallable tuple"""
+        if isinstance(arg, types.Constant):
+            return "c", arg.get_type, arg.get_value
+        elif isinstance(arg, types.Variable):
+            return "v", f"{arg.get_frame}@{arg.get_value}"
+        return ("l" if isinstance(arg, types.Label) else "t"), arg.get_value
+
+    @staticmethod
+    def _decode_argument(arg: Tuple) -> types.Types:
+        """Instruction argument from marshalled tuple"""
+        if arg[0] == "c":
+            return types.Constant.of(arg[1], arg[2])
+        elif arg[0] == "v":
+            return types.Variable(arg[1])
+        return (types.Label if arg[0] == "l" else types.Type)(arg[1])
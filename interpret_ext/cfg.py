@@ -0,0 +1,77 @@
+"""Control flow graph of loaded program"""
+
+from typing import List, Optional, Set
+
+import interpret_ext.instructions as instructions
+
+
+class ControlFlowGraph:
+    """Control flow graph
+
+    Linked program instructions split into basic blocks. Block ends
+    by jump, RETURN or EXIT or before jump target. CALL ends block too,
+    block continuing after it is not its successor, but its return block,
+    because it is entered only by RETURN of called function.
+
+    Attributes:
+    starts -- first instruction of every block
+    successors -- successor blocks of every block
+    returns -- block continuing after CALL, which ends the block (None otherwise)
+    """
+    def __init__(self, insts: List[instructions.Instruction]):
+        """
+        Split instructions into basic blocks and find their successors
+
+        :param insts: linked program instructions
+        """
+        self._insts = insts
+        leaders = {0} if insts else set()
+        for index, inst in enumerate(insts):
+            if isinstance(inst, instructions.Jump):
+                leaders.add(inst.target + 1)
+            if isinstance(inst, (instructions.Jump, instructions.Return, instructions.Exit)):
+                leaders.add(index + 1)
+        self.starts: List[int] = sorted(leader for leader in leaders if leader < len(insts))
+        block_of = {start: block for block, start in enumerate(self.starts)}
+        self.successors: List[List[int]] = []
+        self.returns: List[Optional[int]] = []
+        for block in range(len(self.starts)):
+            last = self.end(block) - 1
+            inst = insts[last]
+            successors: List[Optional[int]] = []
+            following = block_of.get(last + 1)
+            returns = None
+            if isinstance(inst, instructions.Jump):
+                successors.append(block_of.get(inst.target + 1))
+                if type(inst) is instructions.Call:
+                    returns = following
+                elif type(inst) is not instructions.Jump:
+                    successors.append(following)
+            elif not isinstance(inst, (instructions.Return, instructions.Exit)):
+                successors.append(following)
+            self.successors.append([successor for successor in successors if successor is not None])
+            self.returns.append(returns)
+
+    def end(self, block: int) -> int:
+        """Index after the last instruction of block"""
+        return self.starts[block + 1] if block + 1 < len(self.starts) else len(self._insts)
+
+    def reachable(self, block: int, calls: bool) -> Set[int]:
+        """
+        Blocks reachable from given block
+
+        :param block: first block
+        :param calls: follow also continuation after CALL
+        :return: reachable blocks
+        """
+        found: Set[int] = set()
+        stack = [block] if self.starts else []
+        while stack:
+            current = stack.pop()
+            if current in found:
+                continue
+            found.add(current)
+            stack.extend(self.successors[current])
+            if calls and self.returns[current] is not None:
+                stack.append(self.returns[current])
+        return found
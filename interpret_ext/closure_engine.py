@@ -0,0 +1,87 @@
+"""Closure compiled execution engine"""
+
+from typing import Any, Callable, Dict, List, Union
+
+from interpret_ext.codegen import CodeGen
+from interpret_ext.program import Program
+import interpret_ext.instructions as instructions
+
+
+class ClosureEngine:
+    """Closure compiled program execution
+
+    Lowers loaded instructions into Python closures specialized on
+    operands kinds and frames. Each closure executes single instruction
+    and returns index of the next one. Closure factories are shared between
+    instructions with the same generated code, instructions without
+    generated form are executed through their eval method.
+
+    Attributes:
+    program -- program to execute
+    """
+    def __init__(self, program: Program):
+        """
+        Engine constructor, compiles all program instructions
+
+        :param program: loaded program
+        """
+        self.program = program
+        self._factories: Dict[str, Callable] = {}
+        self._namespace: Dict[str, Any] = CodeGen.namespace(program)
+        self._code: List[Callable[[], int]] = [self.compile_instruction(inst, index)
+                                               for index, inst in enumerate(program.get_instructions)]
+
+    def compile_instruction(self, inst: instructions.Instruction, index: int) -> Callable[[], int]:
+        """
+        Create closure executing given instruction
+
+        :param inst: instruction to compile
+        :param index: instruction index in program
+        :return: closure returning index of the next instruction
+        """
+        bindings: Dict[str, Any] = {}
+
+        def lit(value: Any) -> str:
+            name = f"k{len(bindings)}"
+            bindings[name] = value
+            return name
+
+        def goto(target: Union[int, str]) -> str:
+            return f"return {target if isinstance(target, str) else lit(target)}"
+
+        lines = CodeGen(lit, goto).emit(inst, index)
+        if lines is None:
+            return self._fallback(inst, index)
+        lines.append(goto(index + 1))
+        source = "\n".join([f"def factory({', '.join(bindings)}):",
+                            "    def op():"] + CodeGen.indent(lines, 2) + ["    return op"])
+        factory = self._factories.get(source)
+        if factory is None:
+            scope: Dict[str, Any] = {}
+            exec(compile(source, f"<{type(inst).__name__.upper()}>", "exec"), self._namespace, scope)
+            factory = self._factories[source] = scope["factory"]
+        return factory(**bindings)
+
+    def _fallback(self, inst: instructions.Instruction, index: int) -> Callable[[], int]:
+        """
+        Create closure executing instruction by its eval method
+
+        :param inst: instruction to execute
+        :param index: instruction index in program
+        :return: closure returning index of the next instruction
+        """
+        program = self.program
+
+        def op() -> int:
+            program.program_ptr = index
+            inst.eval()
+            return program.program_ptr + 1
+        return op
+
+    def run(self) -> None:
+        """Execute compiled program"""
+        code = self._code
+        end = len(code)
+        ptr = 0
+        while ptr < end:
+            ptr = code[ptr]()
@@ -0,0 +1,577 @@
+"""Python source generation of instructions semantics"""
+
+from typing import Callable, Dict, List, Optional, Union, Any, NamedTuple
+
+import interpret_ext.instructions as instructions   # imports program too, must be first
+import interpret_ext.types_ as types
+from interpret_ext.program import Program, UNDEFINED
+from interpret_ext.output import Output
+from interpret_ext.ret_codes import RetCodes
+from interpret_ext.utils import Utils
+
+
+class Operand(NamedTuple):
+    """Source expressions of loaded instruction operand
+
+    Attributes:
+    lines -- statements loading the operand (empty for constants)
+    obj -- expression with operand constant
+    value -- expression with operand native value
+    type_ -- expression with operand type name
+    const -- operand constant, if known at compile time
+    """
+    lines: List[str]
+    obj: str
+    value: str
+    type_: str
+    const: Optional[types.Constant]
+
+
+class CodeGen:
+    """Instructions source generator
+
+    Emits Python statements with semantics of single instruction.
+    Variables are accessed directly in frames, any irregular access
+    falls back on Program methods, which report the same errors
+    as interpreted instructions.
+
+    Variables are accessed by their frame slots, so instructions must be linked.
+    Generated code expects names: program, gf, lfs, cs, ds, EMPTY (frame with all
+    variables undefined), UNDEFINED, Constant, StrBuffer, TRUE, FALSE, Read, RetCodes, error,
+    flush (flushing all output channels), out and err (write methods of program output channels)
+
+    Attributes:
+    lit -- callback returning expression with given literal value
+    goto -- callback returning statement, which continues on given instruction index
+    """
+    def __init__(self, lit: Callable[[Any], str], goto: Callable[[Union[int, str]], str]):
+        """
+        Code generator constructor
+
+        :param lit: literal value to expression callback
+        :param goto: jump statement callback, gets static index or index expression
+        """
+        self._lit = lit
+        self._goto = goto
+        self._checked: bool = True     # generated instruction checks operand types
+
+    def emit(self, inst: instructions.Instruction, index: int) -> Optional[List[str]]:
+        """
+        Generate instruction statements
+
+        Check-free variants of instructions are generated without operand type checks
+
+        :param inst: instruction to generate
+        :param index: instruction index in program
+        :return: statements lines, None if instruction has no generated form
+        """
+        name = self.emitter(inst)
+        if name is None:
+            return None
+        self._checked = not isinstance(inst, instructions.Unchecked)
+        return getattr(self, name)(inst, index)
+
+    @staticmethod
+    def emitter(inst: instructions.Instruction) -> Optional[str]:
+        """
+        Name of method generating instruction
+
+        :param inst: instruction
+        :return: method name, None if instruction has no generated form
+        """
+        cls = type(inst).__bases__[0] if isinstance(inst, instructions.Unchecked) else type(inst)
+        name = f"_emit_{cls.__name__.lower()}"
+        return name if hasattr(CodeGen, name) else None
+
+    @staticmethod
+    def namespace(program: Program) -> Dict[str, Any]:
+        """
+        Names expected by generated code, bound to given program
+
+        :param program: executed program
+        :return: name: object dictionary
+        """
+        return {
+            "program": program,
+            "gf": program.get_global_frame,
+            "lfs": program.get_local_frame,
+            "cs": program.get_call_stack,
+            "ds": program.get_data_stack,
+            "EMPTY": program.get_empty_frame,
+            "UNDEFINED": UNDEFINED,
+            "Constant": types.Constant,
+            "StrBuffer": types.StrBuffer,
+            "TRUE": types.TRUE,
+            "FALSE": types.FALSE,
+            "Read": instructions.Read,
+            "RetCodes": RetCodes,
+            "error": Utils.error,
+            "flush": Output.flush_all,
+            "out": program.get_output.write,
+            "err": program.get_errors.write,
+        }
+
+    @staticmethod
+    def supports(inst: instructions.Instruction) -> bool:
+        """
+        Check if instruction has generated form
+
+        :param inst: instruction to check
+        :return: true if emit generates instruction statements
+        """
+        return CodeGen.emitter(inst) is not None
+
+    # operands access
+
+    @staticmethod
+    def _frame(var: types.Variable) -> str:
+        """Expression with frame of given variable, empty frame if frame doesn't exist"""
+        if var.get_frame == "GF":
+            return "gf"
+        elif var.get_frame == "LF":
+            return "(lfs[-1] if lfs else EMPTY)"
+        return "(program.tmp_frame or EMPTY)"
+
+    @staticmethod
+    def _existing_frame(var: types.Variable) -> str:
+        """Expression with frame of given variable, which surely exists"""
+        if var.get_frame == "GF":
+            return "gf"
+        elif var.get_frame == "LF":
+            return "lfs[-1]"
+        return "program.tmp_frame"
+
+    def load(self, arg: types.Types, dst: str) -> Operand:
+        """
+        Load symbol operand
+
+        :param arg: variable or constant
+        :param dst: name of local variable for loaded constant
+        :return: operand expressions
+        """
+        if isinstance(arg, types.Constant):
+            obj = self._lit(arg)
+            return Operand([], obj, self._lit(arg.get_value), repr(arg.get_type), arg)
+        if not arg.checked:     # proven defined and initialized
+            return Operand([f"{dst} = {self._existing_frame(arg)}[{self._lit(arg.slot)}]"],
+                           dst, f"{dst}.value", f"{dst}.type_", None)
+        # undefined and uninitialized slots are both false
+        lines = [f"{dst} = {self._frame(arg)}[{self._lit(arg.slot)}]",
+                 f"if not {dst}:",
+                 f"    {dst} = program.get_value({self._lit(arg)})"]
+        return Operand(lines, dst, f"{dst}.value", f"{dst}.type_", None)
+
+    def store(self, arg: types.Variable, src: str) -> List[str]:
+        """
+        Store constant into variable
+
+        :param arg: destination variable
+        :param src: expression with constant to store
+        :return: statements lines
+        """
+        slot = self._lit(arg.slot)
+        if not arg.checked:     # proven defined
+            return [f"{self._existing_frame(arg)}[{slot}] = {src}"]
+        lines = []
+        if not src.isidentifier():
+            lines.append(f"r = {src}")
+            src = "r"
+        frame = "gf"
+        if arg.get_frame != "GF":
+            lines.append(f"fr = {self._frame(arg)}")
+            frame = "fr"
+        return lines + [f"if {frame}[{slot}] is not UNDEFINED:",
+                        f"    {frame}[{slot}] = {src}",
+                        "else:",
+                        f"    program.var_set({self._lit(arg)}, {src})"]
+
+    @staticmethod
+    def pop(names: List[str]) -> List[Operand]:
+        """
+        Operands popped from the data stack
+
+        :param names: names of local variables for popped constants, the last one is popped first
+        :return: operands expressions (statements popping them are in the first operand)
+        """
+        lines = ["try:"] + [f"    {name} = ds.pop()" for name in reversed(names)] + \
+                ["except IndexError:",
+                 "    error('missing value', RetCodes.VALUE_NOT_EXIST_ERR)"]
+        return [Operand(lines if i == 0 else [], name, f"{name}.value", f"{name}.type_", None)
+                for i, name in enumerate(names)]
+
+    @staticmethod
+    def chars(op: Operand) -> str:
+        """Expression with characters of string operand, string buffer isn't joined"""
+        return op.value if op.const is not None else f"{op.obj}.get_chars"
+
+    @staticmethod
+    def freeze(op: Operand) -> List[str]:
+        """Statements replacing loaded string buffer with its frozen copy, buffer stays owned by its variable"""
+        if op.const is not None:
+            return []
+        return [f"if {op.obj}.__class__ is StrBuffer:",
+                f"    {op.obj} = {op.obj}.freeze()"]
+
+    def check_types(self, operands: List[Operand], types_: List[str], message: str, code: str) -> List[str]:
+        """
+        Operands types check, checks of constants are resolved during generation,
+        check-free instructions have no checks
+
+        :param operands: checked operands
+        :param types_: required types
+        :param message: error message
+        :param code: RetCodes attribute name
+        :return: statements lines
+        """
+        if not self._checked:
+            return []
+        conditions = []
+        for operand, type_ in zip(operands, types_):
+            if operand.const is None:
+                conditions.append(f"{operand.type_} != {type_!r}")
+            elif operand.const.get_type != type_:
+                conditions = ["True"]
+                break
+        if not conditions:
+            return []
+        return [f"if {' or '.join(conditions)}:",
+                f"    error({message!r}, RetCodes.{code})"]
+
+    @staticmethod
+    def indent(lines: List[str], level: int = 1) -> List[str]:
+        """Indent statements lines"""
+        return ["    " * level + line for line in lines]
+
+    # frames and function calls
+
+    def _emit_createframe(self, inst, index) -> List[str]:
+        return ["program.tmp_frame = EMPTY.copy()"]
+
+    def _emit_pushframe(self, inst, index) -> List[str]:
+        return ["if program.tmp_frame is None:",
+                "    error('accessing not existing frame', RetCodes.FRAME_NOT_EXIST_ERR)",
+                "lfs.append(program.tmp_frame)",
+                "program.tmp_frame = None"]
+
+    def _emit_popframe(self, inst, index) -> List[str]:
+        return ["if not lfs:",
+                "    error('accessing not existing frame', RetCodes.FRAME_NOT_EXIST_ERR)",
+                "program.tmp_frame = lfs.pop()"]
+
+    def _emit_defvar(self, inst, index) -> List[str]:
+        var: types.Variable = inst.arguments[0]
+        slot = self._lit(var.slot)
+        if var.get_frame == "GF":
+            lines = ["fr = gf"]
+        elif var.get_frame == "LF":
+            lines = ["if not lfs:",
+                     "    error('accessing not existing frame', RetCodes.FRAME_NOT_EXIST_ERR)",
+                     "fr = lfs[-1]"]
+        else:
+            lines = ["fr = program.tmp_frame",
+                     "if fr is None:",
+                     "    error('accessing not existing frame', RetCodes.FRAME_NOT_EXIST_ERR)"]
+        if var.checked:
+            lines += [f"if fr[{slot}] is not UNDEFINED:",
+                      "    error('redefinition of variable', RetCodes.SEMANTIC_ERR)"]
+        return lines + [f"fr[{slot}] = None"]
+
+    def _emit_call(self, inst, index) -> List[str]:
+        return [f"cs.append({self._lit(index)})",
+                self._goto(inst.target + 1)]
+
+    def _emit_return(self, inst, index) -> List[str]:
+        return ["if not cs:",
+                "    error('missing value', RetCodes.VALUE_NOT_EXIST_ERR)",
+                self._goto("cs.pop() + 1")]
+
+    def _emit_break(self, inst, index) -> List[str]:
+        return [f"program.program_ptr = {self._lit(index)}",
+                "err(f'{program.get_stats()}\\n')"]
+
+    # data stack
+
+    def _emit_pushs(self, inst, index) -> List[str]:
+        op = self.load(inst.arguments[0], "a")
+        return op.lines + self.freeze(op) + [f"ds.append({op.obj})"]
+
+    def _emit_pops(self, inst, index) -> List[str]:
+        op, = self.pop(["a"])
+        return op.lines + self.store(inst.arguments[0], "a")
+
+    def _emit_clears(self, inst, index) -> List[str]:
+        return ["ds.clear()"]
+
+    # control flow
+
+    def _emit_jump(self, inst, index) -> List[str]:
+        return [self._goto(inst.target + 1)]
+
+    def _emit_conditional(self, inst, negate: bool) -> List[str]:
+        return self.branch(inst, self.load(inst.arguments[1], "a"), self.load(inst.arguments[2], "b"), negate)
+
+    def branch(self, inst, op1: Operand, op2: Operand, negate: bool) -> List[str]:
+        """Conditional jump on equality of operands"""
+        condition = f"{op1.value} != {op2.value}" if negate else f"{op1.value} == {op2.value}"
+        if not self._checked:
+            return op1.lines + op2.lines + [f"if {condition}:",
+                                            f"    {self._goto(inst.target + 1)}"]
+        return op1.lines + op2.lines + [
+            f"if {op1.type_} == {op2.type_}:",
+            f"    if {condition}:",
+            f"        {self._goto(inst.target + 1)}",
+            f"elif {op1.type_} == 'nil' or {op2.type_} == 'nil':",
+            f"    {self._goto(inst.target + 1)}",
+            "else:",
+            "    error('bad operand type', RetCodes.OPP_TYPE_ERR)"]
+
+    def _emit_jumpifeq(self, inst, index) -> List[str]:
+        return self._emit_conditional(inst, negate=False)
+
+    def _emit_jumpifneq(self, inst, index) -> List[str]:
+        return self._emit_conditional(inst, negate=True)
+
+    def _emit_jumpifeqs(self, inst, index) -> List[str]:
+        return self.branch(inst, *self.pop(["a", "b"]), negate=False)
+
+    def _emit_jumpifneqs(self, inst, index) -> List[str]:
+        return self.branch(inst, *self.pop(["a", "b"]), negate=True)
+
+    def _emit_exit(self, inst, index) -> List[str]:
+        op = self.load(inst.arguments[0], "a")
+        return op.lines + \
+            self.check_types([op], ["int"], "'EXIT' can be applied only on int type", "OPP_TYPE_ERR") + \
+            [f"if {op.value} < 0 or {op.value} > 49:",
+             "    error('bad exit code', RetCodes.OPP_VALUE_ERR)",
+             "flush()",
+             f"exit({op.value})"]
+
+    # input and output
+
+    def _emit_write(self, inst, index) -> List[str]:
+        op = self.load(inst.arguments[0], "a")
+        if op.const is not None:
+            return [] if op.const.get_type == "nil" else [f"out({self._lit(str(op.const))})"]
+        return op.lines + [f"if {op.type_} != 'nil':",
+                           f"    out(str({op.obj}))"]
+
+    def _emit_dprint(self, inst, index) -> List[str]:
+        op = self.load(inst.arguments[0], "a")
+        return op.lines + [f"err(f'{{{op.obj}}}\\n')"]
+
+    def _emit_read(self, inst, index) -> List[str]:
+        return [f"r = Read.convert(program.read_line(), {self._lit(inst.arguments[1].get_value)})"] + \
+            self.store(inst.arguments[0], "r")
+
+    # moving values and types
+
+    def _emit_move(self, inst, index) -> List[str]:
+        op = self.load(inst.arguments[1], "a")
+        return op.lines + self.freeze(op) + self.store(inst.arguments[0], op.obj)
+
+    def _emit_type(self, inst, index) -> List[str]:
+        arg = inst.arguments[1]
+        if isinstance(arg, types.Constant):
+            return self.store(inst.arguments[0], self._lit(types.Constant("string", arg.get_type)))
+        return [f"a = program.get_value({self._lit(arg)}, True)",
+                "r = Constant('string', '' if a is None else a.type_)"] + \
+            self.store(inst.arguments[0], "r")
+
+    # arithmetic and logic
+
+    def _emit_arithmetic(self, inst, name: str, operator: str) -> List[str]:
+        op1 = self.load(inst.arguments[1], "a")
+        op2 = self.load(inst.arguments[2], "b")
+        return self.arithmetic(op1, op2, name, operator) + \
+            self.store(inst.arguments[0], f"Constant('int', {op1.value} {operator} {op2.value})")
+
+    def _emit_stack_arithmetic(self, name: str, operator: str) -> List[str]:
+        op1, op2 = self.pop(["a", "b"])
+        return self.arithmetic(op1, op2, name, operator) + \
+            [f"ds.append(Constant('int', {op1.value} {operator} {op2.value}))"]
+
+    def arithmetic(self, op1: Operand, op2: Operand, name: str, operator: str) -> List[str]:
+        """Loading and checks of integer operation operands"""
+        lines = op1.lines + op2.lines + \
+            self.check_types([op1, op2], ["int", "int"], f"'{name}' can be applied only on int types", "OPP_TYPE_ERR")
+        if operator == "//":
+            lines += [f"if {op2.value} == 0:",
+                      "    error('division by zero', RetCodes.OPP_VALUE_ERR)"]
+        return lines
+
+    def _emit_add(self, inst, index) -> List[str]:
+        return self._emit_arithmetic(inst, "ADD", "+")
+
+    def _emit_sub(self, inst, index) -> List[str]:
+        return self._emit_arithmetic(inst, "SUB", "-")
+
+    def _emit_mul(self, inst, index) -> List[str]:
+        return self._emit_arithmetic(inst, "MUL", "*")
+
+    def _emit_idiv(self, inst, index) -> List[str]:
+        return self._emit_arithmetic(inst, "IDIV", "//")
+
+    def _emit_adds(self, inst, index) -> List[str]:
+        return self._emit_stack_arithmetic("ADDS", "+")
+
+    def _emit_subs(self, inst, index) -> List[str]:
+        return self._emit_stack_arithmetic("SUBS", "-")
+
+    def _emit_muls(self, inst, index) -> List[str]:
+        return self._emit_stack_arithmetic("MULS", "*")
+
+    def _emit_idivs(self, inst, index) -> List[str]:
+        return self._emit_stack_arithmetic("IDIVS", "//")
+
+    def _emit_relational(self, inst, operator: str) -> List[str]:
+        op1 = self.load(inst.arguments[1], "a")
+        op2 = self.load(inst.arguments[2], "b")
+        return self.relational(op1, op2, operator) + self.store(inst.arguments[0], "r")
+
+    def _emit_stack_relational(self, operator: str) -> List[str]:
+        return self.relational(*self.pop(["a", "b"]), operator) + ["ds.append(r)"]
+
+    def relational(self, op1: Operand, op2: Operand, operator: str) -> List[str]:
+        """Comparison of operands, result is stored in r"""
+        lines = op1.lines + op2.lines
+        if not self._checked:
+            return lines + [f"r = TRUE if {op1.value} {operator} {op2.value} else FALSE"]
+        check = [f"if {op1.type_} != {op2.type_} or {op1.type_} not in ('int', 'bool', 'string'):",
+                 "    error('bad operand type', RetCodes.OPP_TYPE_ERR)",
+                 f"r = TRUE if {op1.value} {operator} {op2.value} else FALSE"]
+        if operator == "==":
+            # equality allows comparison with nil, compares types in that case
+            lines += [f"if {op1.type_} == 'nil' or {op2.type_} == 'nil':",
+                      f"    r = TRUE if {op1.type_} == {op2.type_} else FALSE",
+                      "else:"] + self.indent(check)
+        else:
+            lines += check
+        return lines
+
+    def _emit_lt(self, inst, index) -> List[str]:
+        return self._emit_relational(inst, "<")
+
+    def _emit_gt(self, inst, index) -> List[str]:
+        return self._emit_relational(inst, ">")
+
+    def _emit_eq(self, inst, index) -> List[str]:
+        return self._emit_relational(inst, "==")
+
+    def _emit_lts(self, inst, index) -> List[str]:
+        return self._emit_stack_relational("<")
+
+    def _emit_gts(self, inst, index) -> List[str]:
+        return self._emit_stack_relational(">")
+
+    def _emit_eqs(self, inst, index) -> List[str]:
+        return self._emit_stack_relational("==")
+
+    def _emit_logical(self, inst, operator: str) -> List[str]:
+        op1 = self.load(inst.arguments[1], "a")
+        op2 = self.load(inst.arguments[2], "b")
+        # both AND and OR report the same message
+        return op1.lines + op2.lines + \
+            self.check_types([op1, op2], ["bool", "bool"], "'AND' can be applied only on bool types", "OPP_TYPE_ERR") + \
+            self.store(inst.arguments[0], f"(TRUE if {op1.value} {operator} {op2.value} else FALSE)")
+
+    def _emit_stack_logical(self, name: str, operator: str) -> List[str]:
+        op1, op2 = self.pop(["a", "b"])
+        return op1.lines + \
+            self.check_types([op1, op2], ["bool", "bool"], f"'{name}' can be applied only on bool types",
+                             "OPP_TYPE_ERR") + \
+            [f"ds.append(TRUE if {op1.value} {operator} {op2.value} else FALSE)"]
+
+    def _emit_and(self, inst, index) -> List[str]:
+        return self._emit_logical(inst, "and")
+
+    def _emit_or(self, inst, index) -> List[str]:
+        return self._emit_logical(inst, "or")
+
+    def _emit_ands(self, inst, index) -> List[str]:
+        return self._emit_stack_logical("ANDS", "and")
+
+    def _emit_ors(self, inst, index) -> List[str]:
+        return self._emit_stack_logical("ORS", "or")
+
+    def _emit_nots(self, inst, index) -> List[str]:
+        op, = self.pop(["a"])
+        return op.lines + \
+            self.check_types([op], ["bool"], "'NOTS' can be applied only on bool type", "OPP_TYPE_ERR") + \
+            [f"ds.append(FALSE if {op.value} else TRUE)"]
+
+    def _emit_not(self, inst, index) -> List[str]:
+        op = self.load(inst.arguments[1], "a")
+        return op.lines + \
+            self.check_types([op], ["bool"], "'NOT' can be applied only on bool type", "OPP_TYPE_ERR") + \
+            self.store(inst.arguments[0], f"(FALSE if {op.value} else TRUE)")
+
+    # strings
+
+    def _emit_int2char(self, inst, index) -> List[str]:
+        op = self.load(inst.arguments[1], "a")
+        return op.lines + \
+            self.check_types([op], ["int"], "'INT2CHAR' can be applied only on int type", "OPP_TYPE_ERR") + \
+            ["try:",
+             f"    r = Constant('string', chr({op.value}))",
+             "except (ValueError, OverflowError):",
+             "    error('', RetCodes.STRING_ERR)"] + \
+            self.store(inst.arguments[0], "r")
+
+    def _emit_int2chars(self, inst, index) -> List[str]:
+        op, = self.pop(["a"])
+        return op.lines + \
+            self.check_types([op], ["int"], "'INT2CHARS' can be applied only on int type", "OPP_TYPE_ERR") + \
+            ["try:",
+             f"    ds.append(Constant('string', chr({op.value})))",
+             "except (ValueError, OverflowError):",
+             "    error('', RetCodes.STRING_ERR)"]
+
+    def _emit_stri2ints(self, inst, index) -> List[str]:
+        op1, op2 = self.pop(["a", "b"])
+        return op1.lines + \
+            self.check_types([op1, op2], ["string", "int"], "bad operand type", "OPP_TYPE_ERR") + \
+            [f"if {op2.value} < 0 or {op2.value} >= len({op1.value}):",
+             "    error('index out of range', RetCodes.STRING_ERR)",
+             f"ds.append(Constant('int', ord({op1.value}[{op2.value}])))"]
+
+    def _emit_stri2int(self, inst, index) -> List[str]:
+        return self._emit_char_at(inst, "Constant('int', ord({string}[{position}]))")
+
+    def _emit_getchar(self, inst, index) -> List[str]:
+        return self._emit_char_at(inst, "Constant('string', {string}[{position}])")
+
+    def _emit_char_at(self, inst, result: str) -> List[str]:
+        op1 = self.load(inst.arguments[1], "a")
+        op2 = self.load(inst.arguments[2], "b")
+        return op1.lines + op2.lines + \
+            self.check_types([op1, op2], ["string", "int"], "bad operand type", "OPP_TYPE_ERR") + \
+            [f"if {op2.value} < 0 or {op2.value} >= len({self.chars(op1)}):",
+             "    error('index out of range', RetCodes.STRING_ERR)"] + \
+            self.store(inst.arguments[0], result.format(string=self.chars(op1), position=op2.value))
+
+    def _emit_strlen(self, inst, index) -> List[str]:
+        op = self.load(inst.arguments[1], "a")
+        return op.lines + \
+            self.check_types([op], ["string"], "'INT2CHAR' can be applied only on string type", "OPP_TYPE_ERR") + \
+            self.store(inst.arguments[0], f"Constant('int', len({self.chars(op)}))")
+
+    def _emit_concat(self, inst, index) -> List[str]:
+        op1 = self.load(inst.arguments[1], "a")
+        op2 = self.load(inst.arguments[2], "b")
+        result = f"StrBuffer.append({op1.obj}, {op2.value})" if inst.appends() else \
+            f"Constant('string', {op1.value} + {op2.value})"
+        return op1.lines + op2.lines + \
+            self.check_types([op1, op2], ["string", "string"], "'CONCAT' can be applied only on string types",
+                             "OPP_TYPE_ERR") + \
+            self.store(inst.arguments[0], result)
+
+    def _emit_setchar(self, inst, index) -> List[str]:
+        op0 = self.load(inst.arguments[0], "s")
+        op1 = self.load(inst.arguments[1], "a")
+        op2 = self.load(inst.arguments[2], "b")
+        return op0.lines + op1.lines + op2.lines + \
+            self.check_types([op0, op1, op2], ["string", "int", "string"], "bad operand type", "OPP_TYPE_ERR") + \
+            [f"if {op1.value} < 0 or {op1.value} >= len({self.chars(op0)}) or not {op2.value}:",
+             "    error('index out of range', RetCodes.STRING_ERR)",
+             f"r = StrBuffer.setchar({op0.obj}, {op1.value}, {op2.value}[0])"] + \
+            self.store(inst.arguments[0], "r")
@@ -1,10 +1,26 @@
 """Interpret facade"""
 
-from typing import TextIO, List, Tuple
+from io import StringIO
+from sys import stdin
+from typing import TextIO, List, Dict, Any, Optional
 
 from interpret_ext.args_parse import ArgsParse
 from interpret_ext.xml_parse import XMLParse
 from interpret_ext.program import Program
+from interpret_ext.output import Output
+from interpret_ext.closure_engine import ClosureEngine
+from interpret_ext.tracer import TraceEngine
+from interpret_ext.transpiler import Transpiler
+from interpret_ext.cache import ProgramCache
+from interpret_ext.profiler import Profiler
+from interpret_ext.sampler import Sampler
+from interpret_ext.peephole import Peephole
+from interpret_ext.memo import Memoization
+from interpret_ext.optimizer import Optimizer
+from interpret_ext.assignment import DefiniteAssignment
+from interpret_ext.type_inference import TypeInference
+from interpret_ext.utils import Utils
+from interpret_ext.ret_codes import RetCodes
 
 
 class Interpret:
@@ -13,23 +29,128 @@ class Interpret:
     Handle all parts of interpret execution
     """
     def __init__(self):
-        self._source, self._input = self.process_arguments()
+        self._args: ArgsParse = self.process_arguments()
 
         # initialize instance of program
-        self.prog = Program(self._input)
-        self.process_xml()
+        self.prog = Program(self._args.get_input, self._args.get_line_buffered)
 
-        # start program evaluation
-        self.prog.eval_program()
+        self._source: TextIO = self._args.get_source
+        self._cache: Optional[ProgramCache] = None
+        if self._args.get_compile or self._args.get_cache:
+            self._cache = self.open_cache()
+
+        try:
+            self.run()
+        finally:
+            # pass remaining buffered output on normal termination
+            Output.flush_all()
+
+    def run(self) -> None:
+        """Load and execute program with chosen engine"""
+        if self._args.get_compile:
+            self.run_compiled()
+            return
+        self.load_program()
+        memo = Memoization(self.prog, self._args.get_memo_size) if self._args.get_memo else None
+        if memo is not None:
+            memo.optimize()     # before peephole, memoized calls aren't fused
+        if self._args.get_peephole:
+            self.optimize()
+        if memo is not None and self._args.get_memo_report is not None:
+            self.run_memo_reported(memo)
+        else:
+            self.execute()
+
+    def execute(self) -> None:
+        """Evaluate program, with call stack sampling if enabled"""
+        if self._args.get_sample is not None:
+            self.run_sampled()
+        else:
+            self.evaluate()
+
+    def evaluate(self) -> None:
+        """Evaluate loaded program with chosen engine"""
+        if self._args.get_engine == "closure":
+            ClosureEngine(self.prog).run()
+        elif self._args.get_engine == "trace":
+            TraceEngine(self.prog).run()
+        elif self._args.get_profile is not None:
+            self.run_profiled()
+        else:
+            self.prog.eval_program()
 
     @staticmethod
-    def process_arguments() -> Tuple[TextIO, TextIO]:
+    def open_report(path: str) -> TextIO:
+        """Open file for profiling report
+
+        :param path: report file path
+        :return: file opened for writing
+        """
+        try:
+            return open(path, "w")
+        except OSError:
+            Utils.error(f"can't open report output file ({path})", RetCodes.OPEN_OUT_ERR)
+
+    def run_sampled(self) -> None:
+        """Evaluate program with call stack sampling, report is written even on exit or error"""
+        report = self.open_report(self._args.get_sample)
+        sampler = Sampler(self.prog)
+        with report:
+            sampler.start()
+            try:
+                self.evaluate()
+            finally:
+                sampler.stop()
+                sampler.write(report)
+
+    def run_profiled(self) -> None:
+        """Evaluate program with profiling, report is written even on exit or error"""
+        report = self.open_report(self._args.get_profile)
+        profiler = Profiler(self.prog)
+        with report:
+            try:
+                self.prog.eval_program(profiler)
+            finally:
+                profiler.write(report)
+
+    def run_memo_reported(self, memo: Memoization) -> None:
+        """Evaluate program with memoized calls, report is written even on exit or error
+
+        :param memo: memoization of the program
+        """
+        report = self.open_report(self._args.get_memo_report)
+        with report:
+            try:
+                self.execute()
+            finally:
+                memo.write(report)
+
+    def optimize(self) -> None:
+        """Fuse instructions of loaded program into superinstructions"""
+        peephole = Peephole(self.prog)
+        peephole.optimize()
+        if self._args.get_peephole_report is not None:
+            with self.open_report(self._args.get_peephole_report) as report:
+                peephole.write(report)
+
+    @staticmethod
+    def process_arguments() -> ArgsParse:
         """Parse arguments
 
-        :return: source file, input file
+        :return: parsed arguments
+        """
+        return ArgsParse()
+
+    def open_cache(self) -> ProgramCache:
+        """Read whole source and open its cache
+
+        :return: cache of the source
         """
-        args: ArgsParse = ArgsParse()
-        return args.get_source, args.get_input
+        source: str = self._source.read()
+        source_path: Optional[str] = None if self._source is stdin else self._source.name
+        self._source = StringIO(source)
+        # optimized program is translated into other module, processed program is shared
+        return ProgramCache(source, source_path, self._args.get_cache_dir, "O" if self._args.get_optimize else "")
 
     def process_xml(self) -> None:
         """Get instructions from XML"""
@@ -37,3 +158,37 @@ class Interpret:
         instructions: List = xml.get_instructions
         # save instructions into a program and filter out labels
         self.prog.process_instructions(instructions)
+
+    def load_program(self) -> None:
+        """Load program instructions
+
+        Instructions are taken from binary program cache if enabled,
+        otherwise from XML source. Cache keeps not optimized program
+        """
+        cached = self._cache.load_program() if self._args.get_cache else None
+        if cached is not None:
+            self.prog.load_instructions(*cached)
+        else:
+            self.process_xml()
+            if self._args.get_cache:
+                self._cache.store_program(self.prog.get_instructions, self.prog.get_labels)
+        self.prog.link()
+        if self._args.get_optimize:
+            Optimizer(self.prog).optimize()
+            DefiniteAssignment(self.prog).optimize()
+            TypeInference(self.prog).optimize()
+
+    def run_compiled(self) -> None:
+        """Execute program translated into python module
+
+        Translated module is cached, so repeated runs of the same
+        source skip XML processing completely
+        """
+        code = self._cache.load_code()
+        if code is None:
+            self.load_program()
+            code = compile(Transpiler(self.prog).generate(), f"<ippcode22 {self._cache.code_key[:12]}>", "exec")
+            self._cache.store_code(code)
+        module: Dict[str, Any] = {"__name__": "ippcode22"}
+        exec(code, module)
+        module["run"](self.prog)
@@ -0,0 +1,102 @@
+"""Bulk reading of program input"""
+
+import mmap
+from codecs import getincrementaldecoder
+from io import IncrementalNewlineDecoder
+from os import fstat
+from stat import S_ISREG
+from typing import Callable, Iterator, Optional, TextIO
+
+
+class InputReader:
+    """Line reader of READ instruction input
+
+    Input stream is read in large chunks, which are split into lines
+    on demand. Large regular files are memory mapped and chunks
+    are decoded right from the mapping, without copying by read calls.
+    Line endings are translated the same way as in text files
+    (universal newlines) or, like in standard input, only '\\n' ends the line.
+    Empty string is returned at the end of input.
+
+    Attributes:
+    stream -- input text stream
+    """
+    CHUNK_SIZE: int = 1 << 16               # bytes read from stream at once
+    MMAP_THRESHOLD: int = 1 << 20           # minimal size of memory mapped file
+
+    def __init__(self, stream: TextIO, translate: bool = True, before_read: Optional[Callable[[], None]] = None):
+        """
+        Input reader constructor
+
+        :param stream: input text stream
+        :param translate: split lines also on '\\r' and '\\r\\n' (universal newlines)
+        :param before_read: called before (possibly blocking) read from the stream
+        """
+        self.stream = stream
+        self._before_read = before_read
+        self._lines: Iterator[str] = iter(())   # already split lines
+        self._rest = ""                     # incomplete line from the end of last chunk
+        self._eof = False
+        self._map: Optional[mmap.mmap] = self.map_file()
+        self._map_pos = 0
+        self._decoder: Optional[IncrementalNewlineDecoder] = None
+        if self._map is not None or hasattr(stream, "buffer"):
+            decoder = getincrementaldecoder(stream.encoding)(stream.errors or "strict")
+            self._decoder = IncrementalNewlineDecoder(decoder, translate=translate)
+
+    def map_file(self) -> Optional[mmap.mmap]:
+        """
+        Memory map input, if it's large regular file
+
+        :return: read only mapping, None if input can't be mapped
+        """
+        try:
+            if self.stream.tell() != 0:
+                return None
+            fd = self.stream.fileno()
+            info = fstat(fd)
+            if not S_ISREG(info.st_mode) or info.st_size < self.MMAP_THRESHOLD:
+                return None
+            return mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+        except (AttributeError, OSError, ValueError):
+            return None
+
+    def readline(self) -> str:
+        """
+        Read next input line
+
+        :return: line without line ending, empty string at the end of input
+        """
+        line = next(self._lines, None)
+        while line is None:
+            if self._eof:
+                return ""
+            self._fill()
+            line = next(self._lines, None)
+        return line
+
+    def _read_chunk(self) -> bytes:
+        """Next chunk of input bytes, empty at the end of input"""
+        if self._map is not None:
+            start = self._map_pos
+            self._map_pos = min(start + self.CHUNK_SIZE, len(self._map))
+            return self._map[start:self._map_pos]
+        # read only available bytes, so interactive input isn't blocked
+        return self.stream.buffer.read1(self.CHUNK_SIZE)
+
+    def _fill(self) -> None:
+        """Read next chunk of input and split it into lines"""
+        if self._before_read is not None:
+            self._before_read()
+        if self._decoder is not None:
+            data = self._read_chunk()
+            text = self._decoder.decode(data, final=not data)
+        else:
+            data = text = self.stream.read(self.CHUNK_SIZE)
+        if not data:
+            self._eof = True
+        lines = (self._rest + text).split("\n")
+        self._rest = lines.pop()
+        if self._eof and self._rest:
+            lines.append(self._rest)        # last line without line ending
+        self._lines = iter(lines)
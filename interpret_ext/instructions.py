@@ -1,12 +1,12 @@
 """Interpret available instructions"""
 
-from typing import List
+from typing import Dict, List, Tuple
 from abc import ABC, abstractmethod
-from sys import stderr, stdin
 
-from interpret_ext.types_ import Constant
+from interpret_ext.types_ import Constant, StrBuffer, Variable, NIL, TRUE, FALSE, EMPTY_STRING
 from interpret_ext.program import Program
 from interpret_ext.utils import Utils
+from interpret_ext.output import Output
 from interpret_ext.ret_codes import RetCodes
 
 
@@ -23,6 +23,8 @@ class Instruction:
     General instruction class
     Inherited by all instructions
     """
+    __slots__ = ("arguments", "program")
+
     def __init__(self, arguments: List):
         self.arguments: List = arguments
         # get singleton program instance
@@ -31,8 +33,10 @@ class Instruction:
 
 class Createframe(Instruction):
     """Create empty temporary frame"""
+    __slots__ = ()
+
     def eval(self):
-        self.program.tmp_frame = {}
+        self.program.create_frame()
 
 
 class Pushframe(Instruction):
@@ -40,6 +44,8 @@ class Pushframe(Instruction):
     Push temporary frame on local frame
     Unset temporary frame after
     """
+    __slots__ = ()
+
     def eval(self):
         if self.program.get_tmp_frame is None:
             Utils.error("accessing not existing frame", RetCodes.FRAME_NOT_EXIST_ERR)
@@ -52,6 +58,8 @@ class Popframe(Instruction):
     Pop frame, from top of the local frames, on temporary frame
     Throws error if local frame is emplty
     """
+    __slots__ = ()
+
     def eval(self):
         if len(self.program.get_local_frame) == 0:
             Utils.error("accessing not existing frame", RetCodes.FRAME_NOT_EXIST_ERR)
@@ -63,6 +71,8 @@ class Return(Instruction):
     Return from function on previous position
     Throws error if not called from function
     """
+    __slots__ = ()
+
     def eval(self):
         if len(self.program.get_call_stack) == 0:
             Utils.error("missing value", RetCodes.VALUE_NOT_EXIST_ERR)
@@ -71,8 +81,10 @@ class Return(Instruction):
 
 class Break(Instruction):
     """Prints current program stats on stderr"""
+    __slots__ = ()
+
     def eval(self):
-        print(self.program.get_stats(), file=stderr)
+        self.program.get_errors.write(f"{self.program.get_stats()}\n")
 
 
 class Defvar(Instruction):
@@ -80,67 +92,77 @@ class Defvar(Instruction):
     New variable definition
     Throws error if variable with stated name already exist
     """
-    def eval(self):
-        if self.program.is_exist(self.arguments[0]):
-            Utils.error("redefinition of variable", RetCodes.SEMANTIC_ERR)
-        self.program.var_init(self.arguments[0])
+    __slots__ = ()
 
-
-class Pops(Instruction):
-    """
-    Pop value from top of the data stack
-    Throws error if data stack is empty
-    """
     def eval(self):
-        if len(self.program.get_data_stack) == 0:
-            Utils.error("missing value", RetCodes.VALUE_NOT_EXIST_ERR)
-        self.program.var_set(self.arguments[0], self.program.data_stack.pop())
+        var = self.arguments[0]
+        # unchecked variable is proven not defined yet
+        if var.checked and self.program.is_exist(var):
+            Utils.error("redefinition of variable", RetCodes.SEMANTIC_ERR)
+        self.program.var_init(var)
 
 
 class Jump(Instruction):
     """
     Jump on the stated label
-    Throws error on undefined label
+
+    Label is resolved on instruction index by Program.link,
+    so undefined label is reported before program execution
     """
+    __slots__ = ("target",)
+
+    def __init__(self, arguments: List):
+        super().__init__(arguments)
+        self.target: int = -1   # index of the label, set after program load
+
     def eval(self):
-        if self.arguments[0].get_value not in self.program.get_labels.keys():
-            Utils.error("undefined label", RetCodes.SEMANTIC_ERR)
-        self.program.program_ptr = self.program.get_labels[self.arguments[0].get_value]  # set pointer on jumped label
+        self.program.program_ptr = self.target  # set pointer on jumped label
+
+    @property
+    def get_label(self) -> str:
+        """Target label name getter"""
+        return self.arguments[0].get_value
 
 
 class Call(Jump):
     """
     Function call
     Save program counter position on call stack for future return
-    Throws error if label doesn't exist
     """
+    __slots__ = ()
+
     def eval(self):
-        if self.arguments[0].get_value not in self.program.get_labels.keys():
-            Utils.error("undefined label", RetCodes.SEMANTIC_ERR)
         self.program.call_stack.append(self.program.program_ptr)
         Jump.eval(self)
 
 
 class Label(Instruction):
     """New label definition"""
+    __slots__ = ()
+
     def eval(self):
         return self.arguments[0].get_value
 
 
 class Pushs(Instruction):
+    __slots__ = ()
+
     def eval(self):
         """Push value on top of the data stack"""
-        self.program.data_stack.append(self.program.get_value(self.arguments[0]))
+        const = self.program.get_value(self.arguments[0])
+        if const.__class__ is StrBuffer:    # buffer stays owned by its variable
+            const = const.freeze()
+        self.program.data_stack.append(const)
 
 
 class Write(Instruction):
     """Write argument value on stdout"""
+    __slots__ = ()
+
     def eval(self):
         const = self.program.get_value(self.arguments[0])
-        if const.get_type == "nil":
-            print("", end="")
-        else:
-            print(const.get_value, end="")
+        if const.get_type != "nil":
+            self.program.get_output.write(str(const))
 
 
 class Exit(Instruction):
@@ -148,27 +170,37 @@ class Exit(Instruction):
     Exit program with given return code
     Throws error on not existing error code or unsuitable argument type
     """
+    __slots__ = ()
+
     def eval(self):
         const = self.program.get_value(self.arguments[0])
         if const.get_type != "int":
             Utils.error("'EXIT' can be applied only on int type", RetCodes.OPP_TYPE_ERR)
-        int_dec = int(const.get_value, 0)
+        int_dec: int = const.get_value
         if int_dec < 0 or int_dec > 49:
             Utils.error("bad exit code", RetCodes.OPP_VALUE_ERR)
+        Output.flush_all()
         exit(int_dec)
 
 
 class Dprint(Instruction):
     """Print argument value on stderr"""
+    __slots__ = ()
+
     def eval(self):
         const = self.program.get_value(self.arguments[0])
-        print(const.get_value, file=stderr)
+        self.program.get_errors.write(f"{const}\n")
 
 
 class Move(Instruction):
     """Set variable with given value"""
+    __slots__ = ()
+
     def eval(self):
-        self.program.var_set(self.arguments[0], self.program.get_value(self.arguments[1]))
+        const = self.program.get_value(self.arguments[1])
+        if const.__class__ is StrBuffer:    # buffer stays owned by its variable
+            const = const.freeze()
+        self.program.var_set(self.arguments[0], const)
 
 
 class Int2Char(Instruction):
@@ -176,14 +208,16 @@ class Int2Char(Instruction):
     Converting integer on suitable ascii character
     Throws error on unsuitable argument type
     """
+    __slots__ = ()
+
     def eval(self):
         const = self.program.get_value(self.arguments[1])
         if const.get_type != "int":
             Utils.error("'INT2CHAR' can be applied only on int type", RetCodes.OPP_TYPE_ERR)
         try:
-            answer: str = chr(int(const.get_value, 0))
+            answer: str = chr(const.get_value)
             self.program.var_set(self.arguments[0], Constant("string", answer))
-        except ValueError:
+        except (ValueError, OverflowError):
             Utils.error("", RetCodes.STRING_ERR)
 
 
@@ -192,19 +226,23 @@ class Strlen(Instruction):
     Count length of given string
     Throws error on unsuitable argument type
     """
+    __slots__ = ()
+
     def eval(self):
         const = self.program.get_value(self.arguments[1])
         if const.get_type != "string":
             Utils.error("'INT2CHAR' can be applied only on string type", RetCodes.OPP_TYPE_ERR)
-        self.program.var_set(self.arguments[0], Constant("int", str(len(const.get_value))))
+        self.program.var_set(self.arguments[0], Constant("int", len(const.get_chars)))
 
 
 class Type(Instruction):
     """Get type of the given argument"""
+    __slots__ = ()
+
     def eval(self):
         const = self.program.get_value(self.arguments[1], True)     # will return None in case of uninitialized variable
         if const is None:
-            self.program.var_set(self.arguments[0], Constant("string", ""))
+            self.program.var_set(self.arguments[0], EMPTY_STRING)
         else:
             self.program.var_set(self.arguments[0], Constant("string", const.get_type))
 
@@ -214,34 +252,42 @@ class Not(Instruction):
     Set boolean value on opposite
     Throws error on unsuitable argument type
     """
+    __slots__ = ()
+
     def eval(self):
         const = self.program.get_value(self.arguments[1])
         if const.get_type != "bool":
             Utils.error("'NOT' can be applied only on bool type", RetCodes.OPP_TYPE_ERR)
-        answer: str = "true" if const.get_value == "false" else "false"
-        self.program.var_set(self.arguments[0], Constant("bool", answer))
+        answer: bool = not const.get_value
+        self.program.var_set(self.arguments[0], TRUE if answer else FALSE)
 
 
 class Read(Instruction):
     """Read input"""
+    __slots__ = ()
+
     def eval(self):
-        type_: str = self.arguments[1].get_value
-        if self.program.get_input is stdin:
-            read = input().strip()
-        else:
-            read = self.program.get_input.readline().strip()
+        self.program.var_set(self.arguments[0], self.convert(self.program.read_line(), self.arguments[1].get_value))
+
+    @staticmethod
+    def convert(read: str, type_: str) -> Constant:
+        """
+        Convert line of input on constant of requested type
+
+        :param read: stripped input line
+        :param type_: requested type name (int, bool or string, verified on program load)
+        :return: constant, nil on empty or invalid input
+        """
         if read == "":
-            self.program.var_set(self.arguments[0], Constant("nil", "nil"))
+            return NIL
         elif type_ == "bool":
-            new_boolean = Constant("bool", "true" if read.lower() == "true" else "false")
-            self.program.var_set(self.arguments[0], new_boolean)
+            return TRUE if read.lower() == "true" else FALSE
         elif type_ == "int":
             try:
-                self.program.var_set(self.arguments[0], Constant("int", str(int(read, 0))))
+                return Constant("int", int(read, 0))
             except ValueError:
-                self.program.var_set(self.arguments[0], Constant("nil", "nil"))
-        elif type_ == "string":
-            self.program.var_set(self.arguments[0], Constant("string", read))
+                return NIL
+        return Constant("string", read)
 
 
 class Add(Instruction):
@@ -249,12 +295,14 @@ class Add(Instruction):
     Add 2 integer values
     Throws error on unsuitable type
     """
+    __slots__ = ()
+
     def eval(self):
         const1 = self.program.get_value(self.arguments[1])
         const2 = self.program.get_value(self.arguments[2])
         if const1.get_type != "int" or const2.get_type != "int":
             Utils.error("'ADD' can be applied only on int types", RetCodes.OPP_TYPE_ERR)
-        answer: str = str(int(const1.get_value, 0) + int(const2.get_value, 0))
+        answer: int = const1.get_value + const2.get_value
         self.program.var_set(self.arguments[0], Constant("int", answer))
 
 
@@ -263,12 +311,14 @@ class Sub(Instruction):
     Subtract 2 integer values
     Throws error on unsuitable type
     """
+    __slots__ = ()
+
     def eval(self):
         const1 = self.program.get_value(self.arguments[1])
         const2 = self.program.get_value(self.arguments[2])
         if const1.get_type != "int" or const2.get_type != "int":
             Utils.error("'SUB' can be applied only on int types", RetCodes.OPP_TYPE_ERR)
-        answer: str = str(int(const1.get_value, 0) - int(const2.get_value, 0))
+        answer: int = const1.get_value - const2.get_value
         self.program.var_set(self.arguments[0], Constant("int", answer))
 
 
@@ -277,12 +327,14 @@ class Mul(Instruction):
     Multiply 2 integer values
     Throws error on unsuitable type
     """
+    __slots__ = ()
+
     def eval(self):
         const1 = self.program.get_value(self.arguments[1])
         const2 = self.program.get_value(self.arguments[2])
         if const1.get_type != "int" or const2.get_type != "int":
             Utils.error("'MUL' can be applied only on int types", RetCodes.OPP_TYPE_ERR)
-        answer: str = str(int(const1.get_value, 0) * int(const2.get_value, 0))
+        answer: int = const1.get_value * const2.get_value
         self.program.var_set(self.arguments[0], Constant("int", answer))
 
 
@@ -291,13 +343,15 @@ class Idiv(Instruction):
     Integer division of 2 integer values
     Throws error on unsuitable type
     """
+    __slots__ = ()
+
     def eval(self):
         const1 = self.program.get_value(self.arguments[1])
         const2 = self.program.get_value(self.arguments[2])
         if const1.get_type != "int" or const2.get_type != "int":
             Utils.error("'IDIV' can be applied only on int types", RetCodes.OPP_TYPE_ERR)
         try:
-            answer: str = str(int(const1.get_value, 0) // int(const2.get_value, 0))
+            answer: int = const1.get_value // const2.get_value
             self.program.var_set(self.arguments[0], Constant("int", answer))
         except ZeroDivisionError:
             Utils.error("division by zero", RetCodes.OPP_VALUE_ERR)
@@ -308,11 +362,13 @@ class Lt(Instruction):
     Lesser than comparison 2 values
     Return boolean value
     """
+    __slots__ = ()
+
     def eval(self):
         const1 = self.program.get_value(self.arguments[1])
         const2 = self.program.get_value(self.arguments[2])
         answer: bool = Utils.compare_consts(const1, const2, operation=lambda x, y: x < y)
-        self.program.var_set(self.arguments[0], Constant("bool", str(answer).lower()))
+        self.program.var_set(self.arguments[0], TRUE if answer else FALSE)
 
 
 class Gt(Instruction):
@@ -320,11 +376,13 @@ class Gt(Instruction):
     Greater than comparison 2 values
     Return boolean value
     """
+    __slots__ = ()
+
     def eval(self):
         const1 = self.program.get_value(self.arguments[1])
         const2 = self.program.get_value(self.arguments[2])
         answer: bool = Utils.compare_consts(const1, const2, operation=lambda x, y: x > y)
-        self.program.var_set(self.arguments[0], Constant("bool", str(answer).lower()))
+        self.program.var_set(self.arguments[0], TRUE if answer else FALSE)
 
 
 class Eq(Instruction):
@@ -332,11 +390,13 @@ class Eq(Instruction):
     Equal comparison 2 values
     Return boolean value
     """
+    __slots__ = ()
+
     def eval(self):
         const1 = self.program.get_value(self.arguments[1])
         const2 = self.program.get_value(self.arguments[2])
         answer: bool = Utils.compare_consts(const1, const2, operation=lambda x, y: x == y, eq=True)
-        self.program.var_set(self.arguments[0], Constant("bool", str(answer).lower()))
+        self.program.var_set(self.arguments[0], TRUE if answer else FALSE)
 
 
 class And(Instruction):
@@ -344,15 +404,15 @@ class And(Instruction):
     Logical operation AND on 2 boolean values
     Throws error on unsuitable argument types
     """
+    __slots__ = ()
+
     def eval(self):
         const1 = self.program.get_value(self.arguments[1])
         const2 = self.program.get_value(self.arguments[2])
         if const1.get_type != "bool" or const2.get_type != "bool":
             Utils.error("'AND' can be applied only on bool types", RetCodes.OPP_TYPE_ERR)
-        value1: bool = True if const1.get_value == "true" else False
-        value2: bool = True if const2.get_value == "true" else False
-        answer: str = "true" if value1 and value2 else "false"
-        self.program.var_set(self.arguments[0], Constant("bool", answer))
+        answer: bool = const1.get_value and const2.get_value
+        self.program.var_set(self.arguments[0], TRUE if answer else FALSE)
 
 
 class Or(Instruction):
@@ -360,15 +420,15 @@ class Or(Instruction):
     Logical operation OR on 2 boolean values
     Throws error on unsuitable argument types
     """
+    __slots__ = ()
+
     def eval(self):
         const1 = self.program.get_value(self.arguments[1])
         const2 = self.program.get_value(self.arguments[2])
         if const1.get_type != "bool" or const2.get_type != "bool":
             Utils.error("'AND' can be applied only on bool types", RetCodes.OPP_TYPE_ERR)
-        value1: bool = True if const1.get_value == "true" else False
-        value2: bool = True if const2.get_value == "true" else False
-        answer: str = "true" if value1 or value2 else "false"
-        self.program.var_set(self.arguments[0], Constant("bool", answer))
+        answer: bool = const1.get_value or const2.get_value
+        self.program.var_set(self.arguments[0], TRUE if answer else FALSE)
 
 
 class Stri2Int(Instruction):
@@ -376,16 +436,18 @@ class Stri2Int(Instruction):
     Get character ascii value on given position in string
     Throws error on unsuitable argument types
     """
+    __slots__ = ()
+
     def eval(self):
         string = self.program.get_value(self.arguments[1])
         position = self.program.get_value(self.arguments[2])
         if string.get_type != "string" or position.get_type != "int":
             Utils.error("bad operand type", RetCodes.OPP_TYPE_ERR)
-        position_int = int(position.get_value, 0)
+        position_int: int = position.get_value
         try:
             if position_int < 0:
                 raise IndexError
-            ord_value: str = str(ord(string.get_value[position_int]))
+            ord_value: int = ord(string.get_chars[position_int])
             self.program.var_set(self.arguments[0], Constant("int", ord_value))
         except IndexError:
             Utils.error("index out of range", RetCodes.STRING_ERR)
@@ -396,12 +458,22 @@ class Concat(Instruction):
     Concatenate 2 strings
     Throws error on unsuitable argument types
     """
+    __slots__ = ()
+
     def eval(self):
         const1 = self.program.get_value(self.arguments[1])
         const2 = self.program.get_value(self.arguments[2])
         if const1.get_type != "string" or const2.get_type != "string":
             Utils.error("'CONCAT' can be applied only on string types", RetCodes.OPP_TYPE_ERR)
-        self.program.var_set(self.arguments[0], Constant("string", const1.get_value + const2.get_value))
+        if self.appends():
+            self.program.var_set(self.arguments[0], StrBuffer.append(const1, const2.get_value))
+        else:
+            self.program.var_set(self.arguments[0], Constant("string", const1.get_value + const2.get_value))
+
+    def appends(self) -> bool:
+        """Check if destination is the first operand, so its string can be extended in place"""
+        dst, src = self.arguments[0], self.arguments[1]
+        return isinstance(src, Variable) and src.slot == dst.slot and src.get_frame == dst.get_frame
 
 
 class Setchar(Instruction):
@@ -409,18 +481,19 @@ class Setchar(Instruction):
     Change character on given position in string
     Throws error on unsuitable argument types
     """
+    __slots__ = ()
+
     def eval(self):
         string = self.program.get_value(self.arguments[0])
         position = self.program.get_value(self.arguments[1])
         change = self.program.get_value(self.arguments[2])
         if string.get_type != "string" or position.get_type != "int" or change.get_type != "string":
             Utils.error("bad operand type", RetCodes.OPP_TYPE_ERR)
-        position_int = int(position.get_value, 0)
+        position_int: int = position.get_value
         try:
-            if position_int < 0 or position_int >= len(string.get_value):
+            if position_int < 0 or position_int >= len(string.get_chars):
                 raise IndexError
-            new_string = string.get_value[:position_int] + change.get_value[0] + string.get_value[position_int + 1:]
-            self.program.var_set(self.arguments[0], Constant("string", new_string))
+            self.program.var_set(self.arguments[0], StrBuffer.setchar(string, position_int, change.get_value[0]))
         except IndexError:
             Utils.error("index out of range", RetCodes.STRING_ERR)
 
@@ -430,16 +503,18 @@ class Getchar(Instruction):
     Get character from given position in string
     Throws error on unsuitable argument types
     """
+    __slots__ = ()
+
     def eval(self):
         string = self.program.get_value(self.arguments[1])
         position = self.program.get_value(self.arguments[2])
         if string.get_type != "string" or position.get_type != "int":
             Utils.error("bad operand type", RetCodes.OPP_TYPE_ERR)
-        position_int = int(position.get_value, 0)
+        position_int: int = position.get_value
         try:
             if position_int < 0:
                 raise IndexError
-            self.program.var_set(self.arguments[0], Constant("string", string.get_value[position_int]))
+            self.program.var_set(self.arguments[0], Constant("string", string.get_chars[position_int]))
         except IndexError:
             Utils.error("index out of range", RetCodes.STRING_ERR)
 
@@ -447,11 +522,11 @@ class Getchar(Instruction):
 class Jumpifeq(Jump):
     """
     Jump on given label if arguments types and values are equal
-    Throws error on different argument types or undefined label
+    Throws error on different argument types
     """
+    __slots__ = ()
+
     def eval(self):
-        if self.arguments[0].get_value not in self.program.get_labels.keys():
-            Utils.error("undefined label", RetCodes.SEMANTIC_ERR)
         const1 = self.program.get_value(self.arguments[1])
         const2 = self.program.get_value(self.arguments[2])
         if const1.get_type == const2.get_type:
@@ -466,11 +541,11 @@ class Jumpifeq(Jump):
 class Jumpifneq(Jump):
     """
     Jump on given label if arguments types and values are not equal
-    Throws error on different argument types or undefined label
+    Throws error on different argument types
     """
+    __slots__ = ()
+
     def eval(self):
-        if self.arguments[0].get_value not in self.program.get_labels.keys():
-            Utils.error("undefined label", RetCodes.SEMANTIC_ERR)
         const1 = self.program.get_value(self.arguments[1])
         const2 = self.program.get_value(self.arguments[2])
         if const1.get_type == const2.get_type:
@@ -480,3 +555,536 @@ class Jumpifneq(Jump):
             Jump.eval(self)
         else:
             Utils.error("bad operand type", RetCodes.OPP_TYPE_ERR)
+
+
+class StackInstruction(Instruction):
+    """
+    General stack instruction class
+    Operands are popped from the data stack, result is pushed back on it
+    """
+    __slots__ = ()
+
+    def pop_operands(self):
+        """
+        Pop two operands from top of the data stack
+        Throws error if data stack has less than 2 values
+
+        :return: first and second operand (second is the top of the stack)
+        """
+        stack = self.program.data_stack
+        try:
+            const2 = stack.pop()
+            const1 = stack.pop()
+        except IndexError:
+            Utils.error("missing value", RetCodes.VALUE_NOT_EXIST_ERR)
+        return const1, const2
+
+    def pop_operand(self) -> Constant:
+        """
+        Pop operand from top of the data stack
+        Throws error if data stack is empty
+
+        :return: popped operand
+        """
+        try:
+            return self.program.data_stack.pop()
+        except IndexError:
+            Utils.error("missing value", RetCodes.VALUE_NOT_EXIST_ERR)
+
+
+class Pops(StackInstruction):
+    """
+    Pop value from top of the data stack
+    Throws error if data stack is empty
+    """
+    __slots__ = ()
+
+    def eval(self):
+        self.program.var_set(self.arguments[0], self.pop_operand())
+
+
+class Clears(Instruction):
+    """Remove all values from the data stack"""
+    __slots__ = ()
+
+    def eval(self):
+        self.program.data_stack.clear()
+
+
+class Adds(StackInstruction):
+    """
+    Add 2 integer values on the data stack
+    Throws error on unsuitable type
+    """
+    __slots__ = ()
+
+    def eval(self):
+        const1, const2 = self.pop_operands()
+        if const1.get_type != "int" or const2.get_type != "int":
+            Utils.error("'ADDS' can be applied only on int types", RetCodes.OPP_TYPE_ERR)
+        self.program.data_stack.append(Constant("int", const1.get_value + const2.get_value))
+
+
+class Subs(StackInstruction):
+    """
+    Subtract 2 integer values on the data stack
+    Throws error on unsuitable type
+    """
+    __slots__ = ()
+
+    def eval(self):
+        const1, const2 = self.pop_operands()
+        if const1.get_type != "int" or const2.get_type != "int":
+            Utils.error("'SUBS' can be applied only on int types", RetCodes.OPP_TYPE_ERR)
+        self.program.data_stack.append(Constant("int", const1.get_value - const2.get_value))
+
+
+class Muls(StackInstruction):
+    """
+    Multiply 2 integer values on the data stack
+    Throws error on unsuitable type
+    """
+    __slots__ = ()
+
+    def eval(self):
+        const1, const2 = self.pop_operands()
+        if const1.get_type != "int" or const2.get_type != "int":
+            Utils.error("'MULS' can be applied only on int types", RetCodes.OPP_TYPE_ERR)
+        self.program.data_stack.append(Constant("int", const1.get_value * const2.get_value))
+
+
+class Idivs(StackInstruction):
+    """
+    Integer division of 2 integer values on the data stack
+    Throws error on unsuitable type
+    """
+    __slots__ = ()
+
+    def eval(self):
+        const1, const2 = self.pop_operands()
+        if const1.get_type != "int" or const2.get_type != "int":
+            Utils.error("'IDIVS' can be applied only on int types", RetCodes.OPP_TYPE_ERR)
+        if const2.get_value == 0:
+            Utils.error("division by zero", RetCodes.OPP_VALUE_ERR)
+        self.program.data_stack.append(Constant("int", const1.get_value // const2.get_value))
+
+
+class Lts(StackInstruction):
+    """
+    Lesser than comparison 2 values on the data stack
+    Push boolean value
+    """
+    __slots__ = ()
+
+    def eval(self):
+        const1, const2 = self.pop_operands()
+        answer: bool = Utils.compare_consts(const1, const2, operation=lambda x, y: x < y)
+        self.program.data_stack.append(TRUE if answer else FALSE)
+
+
+class Gts(StackInstruction):
+    """
+    Greater than comparison 2 values on the data stack
+    Push boolean value
+    """
+    __slots__ = ()
+
+    def eval(self):
+        const1, const2 = self.pop_operands()
+        answer: bool = Utils.compare_consts(const1, const2, operation=lambda x, y: x > y)
+        self.program.data_stack.append(TRUE if answer else FALSE)
+
+
+class Eqs(StackInstruction):
+    """
+    Equal comparison 2 values on the data stack
+    Push boolean value
+    """
+    __slots__ = ()
+
+    def eval(self):
+        const1, const2 = self.pop_operands()
+        answer: bool = Utils.compare_consts(const1, const2, operation=lambda x, y: x == y, eq=True)
+        self.program.data_stack.append(TRUE if answer else FALSE)
+
+
+class Ands(StackInstruction):
+    """
+    Logical operation AND on 2 boolean values on the data stack
+    Throws error on unsuitable argument types
+    """
+    __slots__ = ()
+
+    def eval(self):
+        const1, const2 = self.pop_operands()
+        if const1.get_type != "bool" or const2.get_type != "bool":
+            Utils.error("'ANDS' can be applied only on bool types", RetCodes.OPP_TYPE_ERR)
+        self.program.data_stack.append(TRUE if const1.get_value and const2.get_value else FALSE)
+
+
+class Ors(StackInstruction):
+    """
+    Logical operation OR on 2 boolean values on the data stack
+    Throws error on unsuitable argument types
+    """
+    __slots__ = ()
+
+    def eval(self):
+        const1, const2 = self.pop_operands()
+        if const1.get_type != "bool" or const2.get_type != "bool":
+            Utils.error("'ORS' can be applied only on bool types", RetCodes.OPP_TYPE_ERR)
+        self.program.data_stack.append(TRUE if const1.get_value or const2.get_value else FALSE)
+
+
+class Nots(StackInstruction):
+    """
+    Set boolean value on top of the data stack on opposite
+    Throws error on unsuitable argument type
+    """
+    __slots__ = ()
+
+    def eval(self):
+        const = self.pop_operand()
+        if const.get_type != "bool":
+            Utils.error("'NOTS' can be applied only on bool type", RetCodes.OPP_TYPE_ERR)
+        self.program.data_stack.append(FALSE if const.get_value else TRUE)
+
+
+class Int2Chars(StackInstruction):
+    """
+    Converting integer on top of the data stack on suitable ascii character
+    Throws error on unsuitable argument type
+    """
+    __slots__ = ()
+
+    def eval(self):
+        const = self.pop_operand()
+        if const.get_type != "int":
+            Utils.error("'INT2CHARS' can be applied only on int type", RetCodes.OPP_TYPE_ERR)
+        try:
+            self.program.data_stack.append(Constant("string", chr(const.get_value)))
+        except (ValueError, OverflowError):
+            Utils.error("", RetCodes.STRING_ERR)
+
+
+class Stri2Ints(StackInstruction):
+    """
+    Get character ascii value on given position in string, both on the data stack
+    Throws error on unsuitable argument types
+    """
+    __slots__ = ()
+
+    def eval(self):
+        string, position = self.pop_operands()
+        if string.get_type != "string" or position.get_type != "int":
+            Utils.error("bad operand type", RetCodes.OPP_TYPE_ERR)
+        position_int: int = position.get_value
+        if position_int < 0 or position_int >= len(string.get_value):
+            Utils.error("index out of range", RetCodes.STRING_ERR)
+        self.program.data_stack.append(Constant("int", ord(string.get_value[position_int])))
+
+
+class Jumpifeqs(Jump, StackInstruction):
+    """
+    Jump on given label if types and values of 2 values on the data stack are equal
+    Throws error on different argument types
+    """
+    __slots__ = ()
+
+    def eval(self):
+        const1, const2 = self.pop_operands()
+        if const1.get_type == const2.get_type:
+            if const1.get_value == const2.get_value:
+                Jump.eval(self)
+        elif const1.get_type == "nil" or const2.get_type == "nil":
+            Jump.eval(self)
+        else:
+            Utils.error("bad operand type", RetCodes.OPP_TYPE_ERR)
+
+
+class Jumpifneqs(Jump, StackInstruction):
+    """
+    Jump on given label if types and values of 2 values on the data stack are not equal
+    Throws error on different argument types
+    """
+    __slots__ = ()
+
+    def eval(self):
+        const1, const2 = self.pop_operands()
+        if const1.get_type == const2.get_type:
+            if const1.get_value != const2.get_value:
+                Jump.eval(self)
+        elif const1.get_type == "nil" or const2.get_type == "nil":
+            Jump.eval(self)
+        else:
+            Utils.error("bad operand type", RetCodes.OPP_TYPE_ERR)
+
+
+class Unchecked:
+    """
+    Variant of instruction without operand type checks
+    Used by type inference where operand types are proven,
+    the checked instruction is the first base class of variant
+    """
+    __slots__ = ()
+
+
+class AddUnchecked(Add, Unchecked):
+    """ADD of integer operands"""
+    __slots__ = ()
+
+    def eval(self):
+        const1 = self.program.get_value(self.arguments[1])
+        const2 = self.program.get_value(self.arguments[2])
+        answer: int = const1.value + const2.value
+        self.program.var_set(self.arguments[0], Constant("int", answer))
+
+
+class SubUnchecked(Sub, Unchecked):
+    """SUB of integer operands"""
+    __slots__ = ()
+
+    def eval(self):
+        const1 = self.program.get_value(self.arguments[1])
+        const2 = self.program.get_value(self.arguments[2])
+        answer: int = const1.value - const2.value
+        self.program.var_set(self.arguments[0], Constant("int", answer))
+
+
+class MulUnchecked(Mul, Unchecked):
+    """MUL of integer operands"""
+    __slots__ = ()
+
+    def eval(self):
+        const1 = self.program.get_value(self.arguments[1])
+        const2 = self.program.get_value(self.arguments[2])
+        answer: int = const1.value * const2.value
+        self.program.var_set(self.arguments[0], Constant("int", answer))
+
+
+class IdivUnchecked(Idiv, Unchecked):
+    """IDIV of integer operands, division by zero is still checked"""
+    __slots__ = ()
+
+    def eval(self):
+        const1 = self.program.get_value(self.arguments[1])
+        const2 = self.program.get_value(self.arguments[2])
+        if const2.value == 0:
+            Utils.error("division by zero", RetCodes.OPP_VALUE_ERR)
+        self.program.var_set(self.arguments[0], Constant("int", const1.value // const2.value))
+
+
+class LtUnchecked(Lt, Unchecked):
+    """LT of operands of the same comparable type"""
+    __slots__ = ()
+
+    def eval(self):
+        const1 = self.program.get_value(self.arguments[1])
+        const2 = self.program.get_value(self.arguments[2])
+        answer: bool = const1.value < const2.value
+        self.program.var_set(self.arguments[0], TRUE if answer else FALSE)
+
+
+class GtUnchecked(Gt, Unchecked):
+    """GT of operands of the same comparable type"""
+    __slots__ = ()
+
+    def eval(self):
+        const1 = self.program.get_value(self.arguments[1])
+        const2 = self.program.get_value(self.arguments[2])
+        answer: bool = const1.value > const2.value
+        self.program.var_set(self.arguments[0], TRUE if answer else FALSE)
+
+
+class EqUnchecked(Eq, Unchecked):
+    """EQ of operands of the same comparable type"""
+    __slots__ = ()
+
+    def eval(self):
+        const1 = self.program.get_value(self.arguments[1])
+        const2 = self.program.get_value(self.arguments[2])
+        answer: bool = const1.value == const2.value
+        self.program.var_set(self.arguments[0], TRUE if answer else FALSE)
+
+
+class AndUnchecked(And, Unchecked):
+    """AND of bool operands"""
+    __slots__ = ()
+
+    def eval(self):
+        const1 = self.program.get_value(self.arguments[1])
+        const2 = self.program.get_value(self.arguments[2])
+        answer: bool = const1.value and const2.value
+        self.program.var_set(self.arguments[0], TRUE if answer else FALSE)
+
+
+class OrUnchecked(Or, Unchecked):
+    """OR of bool operands"""
+    __slots__ = ()
+
+    def eval(self):
+        const1 = self.program.get_value(self.arguments[1])
+        const2 = self.program.get_value(self.arguments[2])
+        answer: bool = const1.value or const2.value
+        self.program.var_set(self.arguments[0], TRUE if answer else FALSE)
+
+
+class NotUnchecked(Not, Unchecked):
+    """NOT of bool operand"""
+    __slots__ = ()
+
+    def eval(self):
+        self.program.var_set(self.arguments[0], FALSE if self.program.get_value(self.arguments[1]).value else TRUE)
+
+
+class Int2CharUnchecked(Int2Char, Unchecked):
+    """INT2CHAR of integer operand, code point range is still checked"""
+    __slots__ = ()
+
+    def eval(self):
+        try:
+            answer: str = chr(self.program.get_value(self.arguments[1]).value)
+        except (ValueError, OverflowError):
+            Utils.error("", RetCodes.STRING_ERR)
+        self.program.var_set(self.arguments[0], Constant("string", answer))
+
+
+class StrlenUnchecked(Strlen, Unchecked):
+    """STRLEN of string operand"""
+    __slots__ = ()
+
+    def eval(self):
+        length: int = len(self.program.get_value(self.arguments[1]).get_chars)
+        self.program.var_set(self.arguments[0], Constant("int", length))
+
+
+class ConcatUnchecked(Concat, Unchecked):
+    """CONCAT of string operands"""
+    __slots__ = ()
+
+    def eval(self):
+        const1 = self.program.get_value(self.arguments[1])
+        const2 = self.program.get_value(self.arguments[2])
+        if self.appends():
+            self.program.var_set(self.arguments[0], StrBuffer.append(const1, const2.value))
+        else:
+            self.program.var_set(self.arguments[0], Constant("string", const1.value + const2.value))
+
+
+class Stri2IntUnchecked(Stri2Int, Unchecked):
+    """STRI2INT of string and integer operands, index is still checked"""
+    __slots__ = ()
+
+    def eval(self):
+        string = self.program.get_value(self.arguments[1]).get_chars
+        position: int = self.program.get_value(self.arguments[2]).value
+        if position < 0 or position >= len(string):
+            Utils.error("index out of range", RetCodes.STRING_ERR)
+        self.program.var_set(self.arguments[0], Constant("int", ord(string[position])))
+
+
+class GetcharUnchecked(Getchar, Unchecked):
+    """GETCHAR of string and integer operands, index is still checked"""
+    __slots__ = ()
+
+    def eval(self):
+        string = self.program.get_value(self.arguments[1]).get_chars
+        position: int = self.program.get_value(self.arguments[2]).value
+        if position < 0 or position >= len(string):
+            Utils.error("index out of range", RetCodes.STRING_ERR)
+        self.program.var_set(self.arguments[0], Constant("string", string[position]))
+
+
+class SetcharUnchecked(Setchar, Unchecked):
+    """SETCHAR of string, integer and string operands, index is still checked"""
+    __slots__ = ()
+
+    def eval(self):
+        string = self.program.get_value(self.arguments[0])
+        position: int = self.program.get_value(self.arguments[1]).value
+        change: str = self.program.get_value(self.arguments[2]).value
+        if position < 0 or position >= len(string.get_chars) or not change:
+            Utils.error("index out of range", RetCodes.STRING_ERR)
+        self.program.var_set(self.arguments[0], StrBuffer.setchar(string, position, change[0]))
+
+
+class JumpifeqUnchecked(Jumpifeq, Unchecked):
+    """JUMPIFEQ of operands of the same type"""
+    __slots__ = ()
+
+    def eval(self):
+        if self.program.get_value(self.arguments[1]).value == self.program.get_value(self.arguments[2]).value:
+            self.program.program_ptr = self.target
+
+
+class JumpifneqUnchecked(Jumpifneq, Unchecked):
+    """JUMPIFNEQ of operands of the same type"""
+    __slots__ = ()
+
+    def eval(self):
+        if self.program.get_value(self.arguments[1]).value != self.program.get_value(self.arguments[2]).value:
+            self.program.program_ptr = self.target
+
+
+# opcode: instruction class and kinds of its operands, verified on program load
+# kinds: var (variable), symb (variable or constant), label and type
+OPCODES: Dict[str, Tuple[type, Tuple[str, ...]]] = {
+    # frames and function calls
+    "MOVE": (Move, ("var", "symb")),
+    "CREATEFRAME": (Createframe, ()),
+    "PUSHFRAME": (Pushframe, ()),
+    "POPFRAME": (Popframe, ()),
+    "DEFVAR": (Defvar, ("var",)),
+    "CALL": (Call, ("label",)),
+    "RETURN": (Return, ()),
+    # data stack
+    "PUSHS": (Pushs, ("symb",)),
+    "POPS": (Pops, ("var",)),
+    "CLEARS": (Clears, ()),
+    # arithmetic, relational, logical and conversion
+    "ADD": (Add, ("var", "symb", "symb")),
+    "SUB": (Sub, ("var", "symb", "symb")),
+    "MUL": (Mul, ("var", "symb", "symb")),
+    "IDIV": (Idiv, ("var", "symb", "symb")),
+    "LT": (Lt, ("var", "symb", "symb")),
+    "GT": (Gt, ("var", "symb", "symb")),
+    "EQ": (Eq, ("var", "symb", "symb")),
+    "AND": (And, ("var", "symb", "symb")),
+    "OR": (Or, ("var", "symb", "symb")),
+    "NOT": (Not, ("var", "symb")),
+    "INT2CHAR": (Int2Char, ("var", "symb")),
+    "STRI2INT": (Stri2Int, ("var", "symb", "symb")),
+    "ADDS": (Adds, ()),
+    "SUBS": (Subs, ()),
+    "MULS": (Muls, ()),
+    "IDIVS": (Idivs, ()),
+    "LTS": (Lts, ()),
+    "GTS": (Gts, ()),
+    "EQS": (Eqs, ()),
+    "ANDS": (Ands, ()),
+    "ORS": (Ors, ()),
+    "NOTS": (Nots, ()),
+    "INT2CHARS": (Int2Chars, ()),
+    "STRI2INTS": (Stri2Ints, ()),
+    # input and output
+    "READ": (Read, ("var", "type")),
+    "WRITE": (Write, ("symb",)),
+    # strings
+    "CONCAT": (Concat, ("var", "symb", "symb")),
+    "STRLEN": (Strlen, ("var", "symb")),
+    "GETCHAR": (Getchar, ("var", "symb", "symb")),
+    "SETCHAR": (Setchar, ("var", "symb", "symb")),
+    # types
+    "TYPE": (Type, ("var", "symb")),
+    # control flow
+    "LABEL": (Label, ("label",)),
+    "JUMP": (Jump, ("label",)),
+    "JUMPIFEQ": (Jumpifeq, ("label", "symb", "symb")),
+    "JUMPIFNEQ": (Jumpifneq, ("label", "symb", "symb")),
+    "JUMPIFEQS": (Jumpifeqs, ("label",)),
+    "JUMPIFNEQS": (Jumpifneqs, ("label",)),
+    "EXIT": (Exit, ("symb",)),
+    # debugging
+    "DPRINT": (Dprint, ("symb",)),
+    "BREAK": (Break, ()),
+}
@@ -0,0 +1,323 @@
+"""Memoization of pure function calls"""
+
+import json
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional, Set, TextIO, Tuple
+
+from interpret_ext.program import Program
+from interpret_ext.cfg import ControlFlowGraph
+import interpret_ext.instructions as instructions
+import interpret_ext.types_ as types
+
+# instructions with side effects or access to data of caller, function containing them isn't pure
+IMPURE: Tuple[type, ...] = (instructions.Read, instructions.Write, instructions.Dprint, instructions.Break,
+                            instructions.Clears)
+
+# (popped, pushed) values of data stack instructions
+STACK_EFFECTS: Dict[type, Tuple[int, int]] = {
+    instructions.Pushs: (0, 1), instructions.Pops: (1, 0),
+    instructions.Adds: (2, 1), instructions.Subs: (2, 1), instructions.Muls: (2, 1), instructions.Idivs: (2, 1),
+    instructions.Lts: (2, 1), instructions.Gts: (2, 1), instructions.Eqs: (2, 1),
+    instructions.Ands: (2, 1), instructions.Ors: (2, 1), instructions.Nots: (1, 1),
+    instructions.Int2Chars: (1, 1), instructions.Stri2Ints: (2, 1),
+    instructions.Jumpifeqs: (2, 0), instructions.Jumpifneqs: (2, 0),
+}
+
+# local frames pushed and data stack values pushed by function since its call
+State = Tuple[int, int]
+
+# result of call: pushed data stack values, pushed local frames and temporary frame
+Result = Tuple[Tuple[types.Constant, ...], Tuple[tuple, ...], Optional[tuple]]
+
+
+class Purity:
+    """Static purity analysis of called functions
+
+    Function (instructions reachable from CALL target up to RETURN) is pure,
+    if it has no input and output, doesn't access global frame and doesn't
+    reach data of its caller: local frame is accessed and popped only
+    after the function pushed its own one and data stack values are popped
+    only after the function pushed them. Called functions must be pure too.
+    Local frames and data stack values pushed by pure function
+    must be the same on every RETURN (function summary).
+
+    Result of pure function depends only on the temporary frame at CALL,
+    which is the only data of caller the function can read, and whole effect
+    of the call is given by temporary frame, pushed local frames and pushed
+    data stack values on return.
+
+    Attributes:
+    program -- linked program
+    """
+    def __init__(self, program: Program):
+        """
+        Purity analysis constructor
+
+        :param program: linked program
+        """
+        self.program = program
+        self._insts: List[instructions.Instruction] = program.get_instructions
+        self._cfg: ControlFlowGraph = ControlFlowGraph(self._insts)
+        self._block_of: Dict[int, int] = {start: block for block, start in enumerate(self._cfg.starts)}
+
+    def analyze(self) -> Dict[int, State]:
+        """
+        Find pure functions
+
+        Summaries of recursive functions are found iteratively, call of function
+        without known summary doesn't return, until the summary is found.
+
+        :return: summaries of pure functions by their targets
+        """
+        targets = {inst.target for inst in self._insts if isinstance(inst, instructions.Call)}
+        summaries: Dict[int, State] = {}
+        impure: Set[int] = set()
+        changed = True
+        while changed:
+            changed = False
+            for target in sorted(targets - impure):
+                pure, summary = self.function(target, summaries, impure)
+                if not pure:
+                    impure.add(target)
+                    summaries.pop(target, None)
+                    changed = True
+                elif summary is not None and summary != summaries.get(target):
+                    summaries[target] = summary
+                    changed = True
+        return summaries
+
+    def function(self, target: int, summaries: Dict[int, State], impure: Set[int]) -> Tuple[bool, Optional[State]]:
+        """
+        Analyze function
+
+        :param target: index of function label
+        :param summaries: known summaries of functions
+        :param impure: targets of impure functions
+        :return: purity of function and its summary, None if no RETURN is reached
+        """
+        cfg = self._cfg
+        first = self._block_of.get(target + 1)
+        if first is None:
+            return False, None
+        entry: Dict[int, State] = {first: (0, 0)}
+        pending: List[int] = [first]
+        summary: Optional[State] = None
+        while pending:
+            block = pending.pop()
+            state: Optional[State] = entry[block]
+            for index in range(cfg.starts[block], cfg.end(block)):
+                state = self.transfer(self._insts[index], state)
+                if state is None:
+                    return False, None
+            last = self._insts[cfg.end(block) - 1]
+            outgoing: List[Tuple[int, State]] = []
+            if isinstance(last, instructions.Return):
+                if summary is not None and summary != state:
+                    return False, None
+                summary = state
+            elif isinstance(last, instructions.Call):
+                if last.target in impure:
+                    return False, None
+                called = summaries.get(last.target)
+                if called is not None and cfg.returns[block] is not None:
+                    outgoing.append((cfg.returns[block], (state[0] + called[0], state[1] + called[1])))
+            else:
+                outgoing = [(successor, state) for successor in cfg.successors[block]]
+            for successor, state_out in outgoing:
+                if successor not in entry:
+                    entry[successor] = state_out
+                    pending.append(successor)
+                elif entry[successor] != state_out:
+                    return False, None     # frames or stack depth depends on path
+        return True, summary
+
+    @staticmethod
+    def transfer(inst: instructions.Instruction, state: State) -> Optional[State]:
+        """
+        Update function state by effect of instruction
+
+        :param inst: instruction
+        :param state: state before instruction
+        :return: state after instruction, None if instruction isn't allowed in pure function
+        """
+        if isinstance(inst, IMPURE):
+            return None
+        frames, values = state
+        for arg in inst.arguments:
+            if isinstance(arg, types.Variable) and \
+                    (arg.get_frame == "GF" or arg.get_frame == "LF" and frames == 0):
+                return None
+        effect = STACK_EFFECTS.get(type(inst))
+        if effect is not None:
+            if values < effect[0]:
+                return None
+            values += effect[1] - effect[0]
+        if isinstance(inst, instructions.Pushframe):
+            frames += 1
+        elif isinstance(inst, instructions.Popframe):
+            if frames == 0:
+                return None
+            frames -= 1
+        return frames, values
+
+
+class Memoization:
+    """Memoization of pure function calls
+
+    Optional load time pass (--memo). CALL of pure function (see Purity)
+    is replaced with MemoCall and RETURN reachable from pure function with MemoReturn.
+    MemoCall looks up result of the call by function and content of temporary
+    frame in bounded LRU cache. Cached result is applied directly: temporary frame
+    and pushed local frames are set to copies of stored ones and stored data stack
+    values are pushed. Otherwise the call is executed and its result is stored
+    by MemoReturn returning from it.
+
+    Attributes:
+    program -- linked program
+    size -- maximal count of cached results
+    stats -- count of cache hits, misses and evictions
+    """
+    SIZE: int = 4096        # default maximal count of cached results
+
+    def __init__(self, program: Program, size: int = SIZE):
+        """
+        Memoization constructor
+
+        :param program: linked program
+        :param size: maximal count of cached results
+        """
+        self.program = program
+        self.size = size
+        self.stats: Counter = Counter()
+        self._cache: OrderedDict = OrderedDict()    # (target, frame key): result, in order of use
+        self._pending: List[Tuple[Any, int, int, int]] = []    # (key, stack size, frames count, call depth)
+        self._functions: Dict[int, State] = {}
+        self._calls: Dict[int, Counter] = {}    # hits and misses by function target
+
+    def optimize(self) -> None:
+        """Find pure functions and replace their calls and returns"""
+        self._functions = Purity(self.program).analyze()
+        insts = self.program.get_instructions
+        cfg = ControlFlowGraph(insts)
+        block_of = {start: block for block, start in enumerate(cfg.starts)}
+        returns: Set[int] = set()
+        for target in self._functions:
+            for block in cfg.reachable(block_of[target + 1], calls=True):
+                returns.update(index for index in range(cfg.starts[block], cfg.end(block))
+                               if type(insts[index]) is instructions.Return)
+        for index, inst in enumerate(insts):
+            if type(inst) is instructions.Call and inst.target in self._functions:
+                insts[index] = MemoCall(inst, self)
+                self._calls.setdefault(inst.target, Counter())
+        for index in returns:
+            insts[index] = MemoReturn(insts[index], self)
+
+    @staticmethod
+    def key(frame: Optional[list]) -> Optional[tuple]:
+        """Hashable content of frame, constants are compared by type and value"""
+        if frame is None:
+            return None
+        return tuple((value.type_, value.value) if value else value for value in frame)
+
+    @staticmethod
+    def freeze(frame: list) -> tuple:
+        """Copy of frame, which can't be changed by later string changes"""
+        return tuple(value.freeze() if value.__class__ is types.StrBuffer else value for value in frame)
+
+    def lookup(self, call: "MemoCall") -> bool:
+        """
+        Apply cached result of call, or prepare storing of its result
+
+        :param call: executed call
+        :return: true if cached result was applied
+        """
+        program = self.program
+        key = (call.target, self.key(program.tmp_frame))
+        result: Optional[Result] = self._cache.get(key)
+        if result is None:
+            self.stats["misses"] += 1
+            self._calls[call.target]["misses"] += 1
+            self._pending.append((key, len(program.data_stack), len(program.local_frame),
+                                  len(program.call_stack) + 1))
+            return False
+        self.stats["hits"] += 1
+        self._calls[call.target]["hits"] += 1
+        self._cache.move_to_end(key)
+        values, frames, tmp_frame = result
+        program.data_stack.extend(values)
+        program.local_frame.extend(list(frame) for frame in frames)
+        program.tmp_frame = None if tmp_frame is None else list(tmp_frame)
+        return True
+
+    def store(self, depth: int) -> None:
+        """
+        Store result of call, if the return ends pending call
+
+        :param depth: call stack size before return
+        """
+        if not self._pending or self._pending[-1][3] != depth:
+            return
+        key, values, frames, _ = self._pending.pop()
+        program = self.program
+        tmp_frame = None if program.tmp_frame is None else self.freeze(program.tmp_frame)
+        self._cache[key] = (tuple(program.data_stack[values:]),
+                            tuple(self.freeze(frame) for frame in program.local_frame[frames:]), tmp_frame)
+        if len(self._cache) > self.size:
+            self._cache.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Build report of cache usage
+
+        :return: report with cache statistics and calls of pure functions
+        """
+        names: Dict[int, str] = {target: name for name, target in self.program.get_labels.items()}
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            "hits": self.stats["hits"],
+            "misses": self.stats["misses"],
+            "evictions": self.stats["evictions"],
+            "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+            "cached": len(self._cache),
+            "functions": [{"function": names.get(target, str(target)), "hits": calls["hits"],
+                           "misses": calls["misses"]}
+                          for target, calls in sorted(self._calls.items(), key=lambda item: names.get(item[0], ""))],
+        }
+
+    def write(self, file: TextIO) -> None:
+        """
+        Write JSON report
+
+        :param file: opened output file
+        """
+        json.dump(self.report(), file, indent=2)
+        file.write("\n")
+
+
+class MemoCall(instructions.Call):
+    """CALL of pure function, cached result is applied instead of the call"""
+    __slots__ = ("memo",)
+
+    def __init__(self, call: instructions.Call, memo: Memoization):
+        super().__init__(call.arguments)
+        self.target = call.target
+        self.memo = memo
+
+    def eval(self):
+        if not self.memo.lookup(self):
+            instructions.Call.eval(self)
+
+
+class MemoReturn(instructions.Return):
+    """RETURN of pure function, result of pending call is stored"""
+    __slots__ = ("memo",)
+
+    def __init__(self, ret: instructions.Return, memo: Memoization):
+        super().__init__(ret.arguments)
+        self.memo = memo
+
+    def eval(self):
+        depth = len(self.program.call_stack)
+        instructions.Return.eval(self)
+        self.memo.store(depth)
@@ -0,0 +1,484 @@
+"""Static optimization of loaded program"""
+
+from collections import Counter
+from heapq import heappop, heappush
+from typing import Dict, List, Optional, Set, Tuple
+
+from interpret_ext.program import Program
+from interpret_ext.cfg import ControlFlowGraph
+import interpret_ext.instructions as instructions
+import interpret_ext.types_ as types
+
+Key = Tuple[str, int]   # variable frame and slot
+Facts = Tuple[Dict[Key, types.Constant], Dict[Key, types.Variable]]    # known constants and copies
+
+# symbol operands read by instructions (SETCHAR reads its destination too, but it stays variable)
+READS: Dict[type, Tuple[int, ...]] = {
+    instructions.Move: (1,), instructions.Int2Char: (1,), instructions.Strlen: (1,), instructions.Type: (1,),
+    instructions.Not: (1,), instructions.Add: (1, 2), instructions.Sub: (1, 2), instructions.Mul: (1, 2),
+    instructions.Idiv: (1, 2), instructions.Lt: (1, 2), instructions.Gt: (1, 2), instructions.Eq: (1, 2),
+    instructions.And: (1, 2), instructions.Or: (1, 2), instructions.Stri2Int: (1, 2), instructions.Concat: (1, 2),
+    instructions.Getchar: (1, 2), instructions.Setchar: (1, 2), instructions.Jumpifeq: (1, 2),
+    instructions.Jumpifneq: (1, 2), instructions.Write: (0,), instructions.Pushs: (0,), instructions.Exit: (0,),
+    instructions.Dprint: (0,),
+}
+
+# instructions writing their first operand
+WRITES: Set[type] = {
+    instructions.Move, instructions.Int2Char, instructions.Strlen, instructions.Type, instructions.Not,
+    instructions.Read, instructions.Add, instructions.Sub, instructions.Mul, instructions.Idiv, instructions.Lt,
+    instructions.Gt, instructions.Eq, instructions.And, instructions.Or, instructions.Stri2Int,
+    instructions.Concat, instructions.Getchar, instructions.Setchar, instructions.Pops, instructions.Defvar,
+}
+
+# conditional jumps on symbol operands
+CONDITIONAL: Tuple[type, ...] = (instructions.Jumpifeq, instructions.Jumpifneq)
+
+
+def key(var: types.Variable) -> Key:
+    """Identification of linked variable"""
+    return var.get_frame, var.slot
+
+
+def fold(cls: type, args: List[types.Types]) -> Optional[types.Constant]:
+    """
+    Evaluate instruction with constant operands
+
+    :param cls: instruction class
+    :param args: instruction operands
+    :return: result constant, None if instruction can't be folded or would fail
+    """
+    if len(args) < 2 or not all(isinstance(args[i], types.Constant) for i in READS.get(cls, (0,))):
+        return None
+    a: types.Constant = args[1]
+    b: Optional[types.Constant] = args[2] if len(args) > 2 else None
+    if cls is instructions.Move:
+        return a
+    if cls is instructions.Type:
+        return types.Constant.of("string", a.get_type)
+    if cls in (instructions.Add, instructions.Sub, instructions.Mul, instructions.Idiv):
+        if a.get_type != "int" or b.get_type != "int" or (cls is instructions.Idiv and b.get_value == 0):
+            return None
+        if cls is instructions.Add:
+            return types.Constant("int", a.get_value + b.get_value)
+        elif cls is instructions.Sub:
+            return types.Constant("int", a.get_value - b.get_value)
+        elif cls is instructions.Mul:
+            return types.Constant("int", a.get_value * b.get_value)
+        return types.Constant("int", a.get_value // b.get_value)
+    if cls in (instructions.Lt, instructions.Gt, instructions.Eq):
+        if cls is instructions.Eq and (a.get_type == "nil" or b.get_type == "nil"):
+            return types.Constant.of("bool", a.get_type == b.get_type)
+        if a.get_type != b.get_type or a.get_type not in ("int", "bool", "string"):
+            return None
+        if cls is instructions.Lt:
+            return types.Constant.of("bool", a.get_value < b.get_value)
+        elif cls is instructions.Gt:
+            return types.Constant.of("bool", a.get_value > b.get_value)
+        return types.Constant.of("bool", a.get_value == b.get_value)
+    if cls in (instructions.And, instructions.Or):
+        if a.get_type != "bool" or b.get_type != "bool":
+            return None
+        if cls is instructions.And:
+            return types.Constant.of("bool", a.get_value and b.get_value)
+        return types.Constant.of("bool", a.get_value or b.get_value)
+    if cls is instructions.Not:
+        return types.Constant.of("bool", not a.get_value) if a.get_type == "bool" else None
+    if cls is instructions.Concat:
+        if a.get_type != "string" or b.get_type != "string":
+            return None
+        return types.Constant.of("string", a.get_value + b.get_value)
+    if cls is instructions.Strlen:
+        return types.Constant("int", len(a.get_value)) if a.get_type == "string" else None
+    if cls is instructions.Int2Char:
+        if a.get_type != "int" or not 0 <= a.get_value <= 0x10FFFF:
+            return None
+        return types.Constant("string", chr(a.get_value))
+    if cls in (instructions.Stri2Int, instructions.Getchar):
+        if a.get_type != "string" or b.get_type != "int" or not 0 <= b.get_value < len(a.get_value):
+            return None
+        if cls is instructions.Stri2Int:
+            return types.Constant("int", ord(a.get_value[b.get_value]))
+        return types.Constant("string", a.get_value[b.get_value])
+    return None
+
+
+def decide(inst: instructions.Jump) -> Optional[bool]:
+    """
+    Decide conditional jump with constant operands
+
+    :param inst: JUMPIFEQ or JUMPIFNEQ
+    :return: true if jump is always taken, false if never, None if unknown or jump would fail
+    """
+    a, b = inst.arguments[1], inst.arguments[2]
+    if not isinstance(a, types.Constant) or not isinstance(b, types.Constant):
+        return None
+    if a.get_type == b.get_type:
+        return (a.get_value == b.get_value) != isinstance(inst, instructions.Jumpifneq)
+    elif a.get_type == "nil" or b.get_type == "nil":
+        return True
+    return None
+
+
+class Optimizer:
+    """Static optimizer
+
+    Optional load time pass over linked program (-O). Instructions are split
+    into basic blocks of control flow graph, on which known values of variables
+    are propagated: operations with constant operands are folded into MOVE,
+    copies made by MOVE are propagated, decided conditional jumps become JUMP
+    or are removed. Unreachable code (e.g. after JUMP, EXIT or RETURN) is removed
+    and so are DEFVAR and MOVE of global variables, which are never read.
+    CALL followed by RETURN (tail call) becomes JUMP, called function
+    returns directly to the caller, so tail recursion doesn't grow the call stack.
+
+    Values are known only in the current frames, frames changing
+    instructions forget them, CALL forgets all values on return.
+    Only instructions, which can't fail, are folded or removed,
+    so errors of optimized program stay the same.
+    Programs with BREAK are not optimized, it prints labels and frames.
+
+    Attributes:
+    program -- linked program to optimize
+    stats -- count of applied optimizations by their kind
+    """
+    _MAX_ROUNDS: int = 8
+
+    def __init__(self, program: Program):
+        """
+        Optimizer constructor
+
+        :param program: linked program
+        """
+        self.program = program
+        self.stats: Counter = Counter()
+        self._insts: List[instructions.Instruction] = program.get_instructions
+        self._cfg: ControlFlowGraph = ControlFlowGraph([])
+        self._constants: Dict[Tuple[str, object], types.Constant] = {}    # folded constants
+        self._changed: bool = False     # instruction was rewritten in the last round
+
+    def optimize(self) -> None:
+        """Optimize program instructions until nothing changes"""
+        if any(isinstance(inst, instructions.Break) for inst in self._insts):
+            return
+        for _ in range(self._MAX_ROUNDS):
+            tail_calls = self.tail_calls()
+            self._cfg = ControlFlowGraph(self._insts)
+            reachable = self._cfg.reachable(0, calls=True)
+            removed = self.propagate(reachable)
+            removed |= self.dead_stores(reachable)
+            for block in range(len(self._cfg.starts)):
+                if block not in reachable:
+                    removed.update(range(self._cfg.starts[block], self._cfg.end(block)))
+                    self.stats["unreachable"] += self._cfg.end(block) - self._cfg.starts[block]
+            # jumps on the next instruction
+            for index, inst in enumerate(self._insts):
+                if type(inst) is instructions.Jump and inst.target == index and index not in removed:
+                    removed.add(index)
+                    self.stats["jump"] += 1
+            if not removed and not self._changed and not tail_calls:
+                break
+            self.compact(removed)
+
+    # tail calls
+
+    def tail_calls(self) -> bool:
+        """
+        Replace CALL followed by RETURN with JUMP
+
+        RETURN may follow after unconditional jumps. Instructions between CALL
+        and RETURN (e.g. POPFRAME) must run after return of called function,
+        so such calls are kept.
+
+        :return: true if any call was replaced
+        """
+        replaced = False
+        for index, inst in enumerate(self._insts):
+            if type(inst) is instructions.Call and self.returns_after(index):
+                jump = instructions.Jump(inst.arguments)
+                jump.target = inst.target
+                self._insts[index] = jump
+                self.stats["tail_call"] += 1
+                replaced = True
+        return replaced
+
+    def returns_after(self, index: int) -> bool:
+        """
+        Check if instruction is followed by RETURN
+
+        :param index: instruction index
+        :return: true if the next executed instruction, after unconditional jumps, is RETURN
+        """
+        visited: Set[int] = set()
+        following = index + 1
+        while following < len(self._insts) and type(self._insts[following]) is instructions.Jump:
+            if following in visited:
+                return False    # infinite loop of jumps
+            visited.add(following)
+            following = self._insts[following].target + 1
+        return following < len(self._insts) and type(self._insts[following]) is instructions.Return
+
+    # propagation of known values
+
+    @staticmethod
+    def kill(facts: Facts, killed) -> None:
+        """
+        Forget values of variables
+
+        :param facts: known values
+        :param killed: predicate on variable keys
+        """
+        consts, copies = facts
+        for known in (consts, copies):
+            for var in [var for var in known if killed(var)]:
+                del known[var]
+        for var in [var for var, source in copies.items() if killed(key(source))]:
+            del copies[var]
+
+    @staticmethod
+    def kill_variable(facts: Facts, dst: Key) -> None:
+        """
+        Forget value of written variable and copies of it
+
+        :param facts: known values
+        :param dst: written variable
+        """
+        consts, copies = facts
+        consts.pop(dst, None)
+        copies.pop(dst, None)
+        for var in [var for var, source in copies.items() if key(source) == dst]:
+            del copies[var]
+
+    def transfer(self, inst: instructions.Instruction, facts: Facts,
+                 rewrite: bool = True) -> instructions.Instruction:
+        """
+        Rewrite instruction by known values and update them by its effect
+
+        :param inst: instruction
+        :param facts: values known before instruction, updated in place
+        :param rewrite: build rewritten instruction, only values are updated otherwise
+        :return: rewritten instruction (the same one if nothing changed or not rewritten)
+        """
+        consts, copies = facts
+        cls = type(inst)
+        reads = READS.get(cls, ())
+        arguments = inst.arguments
+        if reads:
+            arguments = list(arguments)
+            for position in reads:
+                arg = arguments[position]
+                if isinstance(arg, types.Variable):
+                    var = key(arg)
+                    arguments[position] = consts.get(var) or copies.get(var) or arg
+            if rewrite and arguments != inst.arguments:
+                inst = self.rebuild(inst, arguments)
+        if cls in WRITES:
+            dst = key(arguments[0])
+            value = fold(cls, arguments)
+            if value is not None and cls is not instructions.Move:
+                # folded constants are shared, so known values of the same result are identical
+                value = self._constants.setdefault((value.get_type, value.get_value), value)
+                if rewrite:
+                    inst = instructions.Move([arguments[0], value])
+            self.kill_variable(facts, dst)
+            if value is not None:
+                consts[dst] = value
+            elif cls is instructions.Move and isinstance(arguments[1], types.Variable) and key(arguments[1]) != dst:
+                copies[dst] = arguments[1]
+        elif cls is instructions.Createframe:
+            self.kill(facts, lambda var: var[0] == "TF")
+        elif cls in (instructions.Pushframe, instructions.Popframe):
+            self.kill(facts, lambda var: var[0] != "GF")
+        return inst
+
+    def rebuild(self, inst: instructions.Instruction, arguments: List) -> instructions.Instruction:
+        """New instruction of the same kind with other operands"""
+        new = type(inst)(arguments)
+        if isinstance(inst, instructions.Jump):
+            new.target = inst.target
+        return new
+
+    @staticmethod
+    def meet(first: Optional[Facts], second: Facts) -> Facts:
+        """Values known on both paths"""
+        if first is None:
+            return second[0].copy(), second[1].copy()
+        consts = {var: value for var, value in first[0].items()
+                  if var in second[0] and second[0][var].get_type == value.get_type and
+                  second[0][var].get_value == value.get_value}
+        copies = {var: source for var, source in first[1].items()
+                  if var in second[1] and key(second[1][var]) == key(source)}
+        return consts, copies
+
+    def propagate(self, reachable: Set[int]) -> Set[int]:
+        """
+        Propagate known values through reachable blocks and rewrite instructions
+
+        :param reachable: reachable blocks
+        :return: indices of instructions to remove
+        """
+        blocks = sorted(reachable)
+        entry: Dict[int, Facts] = {0: ({}, {})} if blocks else {}
+        pending: List[int] = [0] if blocks else []     # heap of blocks with changed entry values
+        while pending:
+            block = heappop(pending)
+            while pending and pending[0] == block:
+                heappop(pending)
+            facts = (entry[block][0].copy(), entry[block][1].copy())
+            for index in range(self._cfg.starts[block], self._cfg.end(block)):
+                self.transfer(self._insts[index], facts, rewrite=False)
+            outgoing = [(successor, facts) for successor in self._cfg.successors[block]]
+            if self._cfg.returns[block] is not None:
+                outgoing.append((self._cfg.returns[block], ({}, {})))     # callee may change anything
+            for successor, out in outgoing:
+                new = self.meet(entry.get(successor), out)
+                if successor not in entry or new != entry[successor]:
+                    entry[successor] = new
+                    heappush(pending, successor)
+        # rewrite with final values
+        self._changed = False
+        removed: Set[int] = set()
+        for block in blocks:
+            facts = entry.get(block, ({}, {}))
+            for index in range(self._cfg.starts[block], self._cfg.end(block)):
+                inst = self.transfer(self._insts[index], facts)
+                if isinstance(inst, CONDITIONAL):
+                    taken = decide(inst)
+                    if taken is False:
+                        removed.add(index)
+                    elif taken:
+                        jump = instructions.Jump(inst.arguments[:1])
+                        jump.target = inst.target
+                        inst = jump
+                    if taken is not None:
+                        self.stats["decided"] += 1
+                if inst is not self._insts[index]:
+                    self.stats["folded" if type(inst) is not type(self._insts[index]) else "propagated"] += 1
+                    self._insts[index] = inst
+                    self._changed = True
+        return removed
+
+    # dead stores
+
+    def dead_stores(self, reachable: Set[int]) -> Set[int]:
+        """
+        Find DEFVAR and MOVE of global variables, which are never read
+
+        Variable must be defined by single DEFVAR, which runs at most once
+        (outside of loops and functions) before all its MOVE instructions,
+        which move constants only, so none of them can fail.
+
+        :param reachable: reachable blocks
+        :return: indices of instructions to remove
+        """
+        defvars: Dict[Key, List[int]] = {}
+        moves: Dict[Key, List[int]] = {}
+        used: Set[Key] = set()
+        for block in reachable:
+            for index in range(self._cfg.starts[block], self._cfg.end(block)):
+                inst = self._insts[index]
+                for position, arg in enumerate(inst.arguments):
+                    if not isinstance(arg, types.Variable) or arg.get_frame != "GF":
+                        continue
+                    var = key(arg)
+                    if position == 0 and type(inst) is instructions.Defvar:
+                        defvars.setdefault(var, []).append(index)
+                    elif position == 0 and type(inst) is instructions.Move and \
+                            isinstance(inst.arguments[1], types.Constant):
+                        moves.setdefault(var, []).append(index)
+                    else:
+                        used.add(var)
+        candidates = [var for var in defvars if var not in used and len(defvars[var]) == 1]
+        if not candidates:
+            return set()
+        block_of = {}
+        for block in reachable:
+            for index in range(self._cfg.starts[block], self._cfg.end(block)):
+                block_of[index] = block
+        called = self.called(reachable)
+        dominators = self.dominators(reachable)
+        loops: Dict[int, bool] = {}
+        removed: Set[int] = set()
+        for var in candidates:
+            definition = defvars[var][0]
+            def_block = block_of[definition]
+            if def_block not in loops:
+                loops[def_block] = self.in_loop(def_block)
+            if def_block in called or loops[def_block]:
+                continue
+            if all(block_of[move] == def_block and move > definition or
+                   block_of[move] != def_block and def_block in dominators[block_of[move]]
+                   for move in moves.get(var, [])):
+                removed.add(definition)
+                removed.update(moves.get(var, []))
+                self.stats["dead"] += 1 + len(moves.get(var, []))
+        return removed
+
+    def called(self, reachable: Set[int]) -> Set[int]:
+        """Blocks reachable from CALL targets"""
+        called: Set[int] = set()
+        block_of = {start: block for block, start in enumerate(self._cfg.starts)}
+        for block in reachable:
+            inst = self._insts[self._cfg.end(block) - 1]
+            target = block_of.get(inst.target + 1) if type(inst) is instructions.Call else None
+            if target is not None and target not in called:
+                called |= self._cfg.reachable(target, calls=True)
+        return called
+
+    def in_loop(self, block: int) -> bool:
+        """Check if block can be executed repeatedly"""
+        cfg = self._cfg
+        following = cfg.successors[block] + ([cfg.returns[block]] if cfg.returns[block] is not None else [])
+        return any(block in self._cfg.reachable(successor, calls=True) for successor in following)
+
+    def dominators(self, reachable: Set[int]) -> Dict[int, Set[int]]:
+        """Dominators of every reachable block"""
+        predecessors: Dict[int, List[int]] = {block: [] for block in reachable}
+        for block in reachable:
+            returns = self._cfg.returns[block]
+            for successor in self._cfg.successors[block] + ([returns] if returns is not None else []):
+                predecessors[successor].append(block)
+        dominators = {block: set(reachable) for block in reachable}
+        dominators[0] = {0}
+        changed = True
+        while changed:
+            changed = False
+            for block in sorted(reachable - {0}):
+                new = set.intersection(*(dominators[p] for p in predecessors[block])) if predecessors[block] \
+                    else set()
+                new.add(block)
+                if new != dominators[block]:
+                    dominators[block] = new
+                    changed = True
+        return dominators
+
+    # removing instructions
+
+    def compact(self, removed: Set[int]) -> None:
+        """
+        Remove instructions and move jump targets and labels
+
+        :param removed: indices of removed instructions
+        """
+        if not removed:
+            return
+        kept = [index for index in range(len(self._insts)) if index not in removed]
+        # new index of the last kept instruction up to old index (-1 if none)
+        position: List[int] = []
+        count = 0
+        for index in range(len(self._insts)):
+            if index not in removed:
+                count += 1
+            position.append(count - 1)
+
+        def moved(target: int) -> int:
+            return position[target] if target >= 0 else -1
+
+        insts = [self._insts[index] for index in kept]
+        for inst in insts:
+            if isinstance(inst, instructions.Jump):
+                inst.target = moved(inst.target)
+        labels = self.program.get_labels
+        for name, target in labels.items():
+            labels[name] = moved(target)
+        self._insts[:] = insts
@@ -0,0 +1,64 @@
+"""Buffered program output"""
+
+from typing import List, Optional, TextIO
+
+
+class Output:
+    """Buffered output channel
+
+    Collects written texts and passes them to the stream at once,
+    when buffer is full or on explicit flush.
+    Channels share the order of writes: before writing into one channel,
+    pending texts of previously used channel are flushed,
+    so stdout and stderr outputs keep their original interleaving.
+
+    Attributes:
+    stream -- output stream
+    line_buffered -- flush after every written line
+    """
+    BUFFER_SIZE: int = 1 << 16      # count of characters, which triggers flush
+
+    _channels: List["Output"] = []  # all created channels
+    _active: Optional["Output"] = None  # channel with pending texts
+
+    def __init__(self, stream: TextIO, line_buffered: bool = False):
+        """
+        Output channel constructor
+
+        :param stream: output stream
+        :param line_buffered: flush after every written line (interactive use)
+        """
+        self.stream = stream
+        self.line_buffered = line_buffered
+        self._parts: List[str] = []
+        self._size = 0
+        Output._channels.append(self)
+
+    def write(self, text: str) -> None:
+        """
+        Write text into channel buffer
+
+        :param text: text to write
+        """
+        if Output._active is not self:
+            if Output._active is not None:
+                Output._active.flush()
+            Output._active = self
+        self._parts.append(text)
+        self._size += len(text)
+        if self._size >= self.BUFFER_SIZE or (self.line_buffered and "\n" in text):
+            self.flush()
+
+    def flush(self) -> None:
+        """Pass buffered texts to the stream"""
+        if self._parts:
+            self.stream.write("".join(self._parts))
+            self._parts.clear()
+            self._size = 0
+            self.stream.flush()
+
+    @staticmethod
+    def flush_all() -> None:
+        """Flush all channels (e.g. before program exit)"""
+        for channel in Output._channels:
+            channel.flush()
@@ -0,0 +1,244 @@
+"""Peephole optimization of loaded program"""
+
+import json
+import operator
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, TextIO, Tuple
+
+from interpret_ext.program import Program, UNDEFINED
+from interpret_ext.utils import Utils
+from interpret_ext.ret_codes import RetCodes
+import interpret_ext.instructions as instructions
+import interpret_ext.types_ as types
+
+
+def same_variable(arg: types.Types, var: types.Variable) -> bool:
+    """
+    Check if operand is the given variable
+
+    :param arg: instruction operand
+    :param var: linked variable
+    :return: true if operand is variable with the same frame and slot
+    """
+    return isinstance(arg, types.Variable) and arg.get_frame == var.get_frame and arg.slot == var.slot
+
+
+def checked(inst: instructions.Instruction) -> type:
+    """
+    Class of instruction, checked instruction class for check-free variants
+
+    :param inst: instruction
+    :return: instruction class
+    """
+    return type(inst).__bases__[0] if isinstance(inst, instructions.Unchecked) else type(inst)
+
+
+class Superinstruction(instructions.Instruction):
+    """
+    General superinstruction class
+    Executes whole sequence of instructions as single instruction
+
+    Superinstruction replaces the first instruction of the sequence,
+    the rest of the sequence stays in place, so jumps into the middle
+    of the sequence execute the original instructions.
+    Errors are checked in the same order as by the original instructions.
+
+    Attributes:
+    parts -- fused instructions
+    index -- index of the first fused instruction
+    """
+    __slots__ = ("parts", "index")
+
+    def __init__(self, parts: List[instructions.Instruction], index: int):
+        super().__init__([arg for part in parts for arg in part.arguments])
+        self.parts = parts
+        self.index = index
+
+    @property
+    def get_pattern(self) -> str:
+        """Opcodes of fused instructions"""
+        return " ".join(type(part).__name__.upper() for part in self.parts)
+
+
+class ArithmeticJump(Superinstruction):
+    """
+    ADD, SUB or MUL followed by JUMPIFEQ or JUMPIFNEQ (e.g. loop counter increment and test)
+    Computed value is compared directly, when the jump tests the result variable
+    """
+    __slots__ = ("_operation", "_name", "_negate", "_reuse1", "_reuse2")
+    OPERATIONS: Dict[type, Tuple[str, Callable]] = {
+        instructions.Add: ("ADD", operator.add),
+        instructions.Sub: ("SUB", operator.sub),
+        instructions.Mul: ("MUL", operator.mul),
+    }
+
+    def __init__(self, parts: List[instructions.Instruction], index: int):
+        super().__init__(parts, index)
+        self._name, self._operation = self.OPERATIONS[checked(parts[0])]
+        self._negate = isinstance(parts[1], instructions.Jumpifneq)
+        dst = parts[0].arguments[0]
+        self._reuse1 = same_variable(parts[1].arguments[1], dst)
+        self._reuse2 = same_variable(parts[1].arguments[2], dst)
+
+    def eval(self):
+        arith, jump = self.parts
+        program = self.program
+        const1 = program.get_value(arith.arguments[1])
+        const2 = program.get_value(arith.arguments[2])
+        if const1.get_type != "int" or const2.get_type != "int":
+            Utils.error(f"'{self._name}' can be applied only on int types", RetCodes.OPP_TYPE_ERR)
+        result = types.Constant("int", self._operation(const1.get_value, const2.get_value))
+        program.var_set(arith.arguments[0], result)
+        const1 = result if self._reuse1 else program.get_value(jump.arguments[1])
+        const2 = result if self._reuse2 else program.get_value(jump.arguments[2])
+        if const1.get_type == const2.get_type:
+            taken = (const1.get_value == const2.get_value) != self._negate
+        elif const1.get_type == "nil" or const2.get_type == "nil":
+            taken = True
+        else:
+            Utils.error("bad operand type", RetCodes.OPP_TYPE_ERR)
+        program.program_ptr = jump.target if taken else self.index + 1
+
+
+class PopsMove(Superinstruction):
+    """POPS followed by MOVE, popped value is moved directly, when MOVE reads the popped variable"""
+    __slots__ = ("_reuse",)
+
+    def __init__(self, parts: List[instructions.Instruction], index: int):
+        super().__init__(parts, index)
+        self._reuse = same_variable(parts[1].arguments[1], parts[0].arguments[0])
+
+    def eval(self):
+        pops, move = self.parts
+        program = self.program
+        value = pops.pop_operand()
+        program.var_set(pops.arguments[0], value)
+        if self._reuse:
+            program.var_set(move.arguments[0], value)
+        else:
+            move.eval()
+        program.program_ptr = self.index + 1
+
+
+class CallSequence(Superinstruction):
+    """
+    Function call with arguments passing:
+    CREATEFRAME, DEFVAR and MOVE of temporary variables, optional PUSHFRAME and CALL
+    New frame is filled directly by variables slots
+    """
+    __slots__ = ("_steps", "_push")
+
+    def __init__(self, parts: List[instructions.Instruction], index: int):
+        super().__init__(parts, index)
+        # (slot, source) pairs, source is None for variable definition
+        self._steps: List[Tuple[int, Optional[types.Types]]] = [
+            (part.arguments[0].slot, None if isinstance(part, instructions.Defvar) else part.arguments[1])
+            for part in parts[1:-1] if not isinstance(part, instructions.Pushframe)]
+        self._push: bool = isinstance(parts[-2], instructions.Pushframe)
+
+    def eval(self):
+        program = self.program
+        frame = program.get_empty_frame.copy()
+        program.tmp_frame = frame
+        for slot, source in self._steps:
+            if source is None:
+                if frame[slot] is not UNDEFINED:
+                    Utils.error("redefinition of variable", RetCodes.SEMANTIC_ERR)
+                frame[slot] = None
+            else:
+                value = program.get_value(source)
+                if value.__class__ is types.StrBuffer:     # buffer stays owned by its variable
+                    value = value.freeze()
+                if frame[slot] is UNDEFINED:
+                    Utils.error("undefined variable", RetCodes.VAR_NOT_EXIST_ERR)
+                frame[slot] = value
+        if self._push:
+            program.local_frame.append(frame)
+            program.tmp_frame = None
+        call_index = self.index + len(self.parts) - 1
+        program.call_stack.append(call_index)
+        program.program_ptr = self.parts[-1].target
+
+
+class Peephole:
+    """Peephole optimizer
+
+    Load time pass over linked program instructions, which replaces
+    recurring instructions sequences with superinstructions.
+    Instructions indices don't change, so label targets stay valid.
+
+    Attributes:
+    program -- linked program to optimize
+    fused -- count of fused sequences by opcodes pattern
+    """
+    def __init__(self, program: Program):
+        """
+        Peephole optimizer constructor
+
+        :param program: linked program
+        """
+        self.program = program
+        self.fused: Counter = Counter()
+        self._superinstructions: Dict[str, str] = {}    # pattern: superinstruction name
+
+    def optimize(self) -> None:
+        """Fuse instructions sequences of the whole program"""
+        insts = self.program.get_instructions
+        index = 0
+        while index < len(insts):
+            superinstruction = self.match(insts, index)
+            if superinstruction is None:
+                index += 1
+                continue
+            insts[index] = superinstruction
+            self.fused[superinstruction.get_pattern] += 1
+            self._superinstructions[superinstruction.get_pattern] = type(superinstruction).__name__
+            index += len(superinstruction.parts)
+
+    @staticmethod
+    def match(insts: List[instructions.Instruction], index: int) -> Optional[Superinstruction]:
+        """
+        Find superinstruction of sequence starting on given index
+
+        :param insts: program instructions
+        :param index: index of the first instruction
+        :return: superinstruction, None if no pattern matches
+        """
+        first = insts[index]
+        second = insts[index + 1] if index + 1 < len(insts) else None
+        if checked(first) in ArithmeticJump.OPERATIONS and checked(second) in (instructions.Jumpifeq,
+                                                                                 instructions.Jumpifneq):
+            return ArithmeticJump([first, second], index)
+        if type(first) is instructions.Pops and type(second) is instructions.Move:
+            return PopsMove([first, second], index)
+        if type(first) is instructions.Createframe:
+            end = index + 1
+            while end < len(insts) and type(insts[end]) in (instructions.Defvar, instructions.Move) and \
+                    insts[end].arguments[0].get_frame == "TF":
+                end += 1
+            if end < len(insts) and type(insts[end]) is instructions.Pushframe:
+                end += 1
+            if end < len(insts) and type(insts[end]) is instructions.Call:
+                return CallSequence(insts[index:end + 1], index)
+        return None
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Build report of fused patterns
+
+        :return: report with count of fused sequences and patterns sorted by count
+        """
+        return {
+            "fused_sequences": sum(self.fused.values()),
+            "patterns": [{"pattern": pattern, "superinstruction": self._superinstructions[pattern], "count": count}
+                         for pattern, count in self.fused.most_common()],
+        }
+
+    def write(self, file: TextIO) -> None:
+        """
+        Write JSON report
+
+        :param file: opened output file
+        """
+        json.dump(self.report(), file, indent=1)
+        file.write("\n")
@@ -0,0 +1,87 @@
+"""Per-opcode execution profiling"""
+
+import json
+from typing import Any, Dict, List, TextIO
+
+
+class Profiler:
+    """Execution profile of interpreted program
+
+    Counts and cumulative wall times are collected per instruction index
+    by instrumented dispatch loop of Program.eval_program.
+    Report aggregates them per opcode and per label: time of instruction
+    is attributed to the nearest preceding LABEL ("<main>" before the first label).
+
+    Attributes:
+    program -- profiled program
+    counts -- executions count of every instruction
+    times -- cumulative wall time of every instruction in seconds
+    """
+    MAIN = "<main>"
+
+    def __init__(self, program):
+        """
+        Profiler constructor
+
+        :param program: loaded and linked program
+        """
+        self.program = program
+        self.counts: List[int] = [0] * len(program.get_instructions)
+        self.times: List[float] = [0.0] * len(program.get_instructions)
+
+    def label_of(self) -> List[str]:
+        """
+        Nearest preceding label of every instruction
+
+        :return: label names indexed by instruction index
+        """
+        starts: Dict[int, str] = {}     # index of first instruction after label: label name
+        for name, line in self.program.get_labels.items():
+            starts[line + 1] = name     # of consecutive labels the last one is the nearest
+        labels: List[str] = []
+        current = self.MAIN
+        for index in range(len(self.counts)):
+            current = starts.get(index, current)
+            labels.append(current)
+        return labels
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Build profile report
+
+        :return: report with totals, opcodes, instructions and hot labels, sorted by time
+        """
+        insts = self.program.get_instructions
+        labels = self.label_of()
+        opcodes: Dict[str, Dict[str, Any]] = {}
+        hot_labels: Dict[str, Dict[str, Any]] = {}
+        executed: List[Dict[str, Any]] = []
+        for index, (count, time) in enumerate(zip(self.counts, self.times)):
+            if count == 0:
+                continue
+            opcode = type(insts[index]).__name__.upper()
+            executed.append({"index": index, "opcode": opcode, "label": labels[index], "count": count, "time": time})
+            for key, summary in ((opcode, opcodes), (labels[index], hot_labels)):
+                entry = summary.setdefault(key, {"count": 0, "time": 0.0})
+                entry["count"] += count
+                entry["time"] += time
+
+        def by_time(summary: Dict[str, Dict[str, Any]], key: str) -> List[Dict[str, Any]]:
+            return sorted(({key: name, **entry} for name, entry in summary.items()), key=lambda e: -e["time"])
+
+        return {
+            "executed_instructions": sum(self.counts),
+            "total_time": sum(self.times),
+            "opcodes": by_time(opcodes, "opcode"),
+            "hot_labels": by_time(hot_labels, "label"),
+            "instructions": sorted(executed, key=lambda e: -e["time"]),
+        }
+
+    def write(self, file: TextIO) -> None:
+        """
+        Write JSON report
+
+        :param file: opened output file
+        """
+        json.dump(self.report(), file, indent=1)
+        file.write("\n")
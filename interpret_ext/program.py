@@ -1,13 +1,30 @@
 """Main program information"""
 
-from typing import List, Dict, Union, TextIO, Optional
+from sys import stdin, stdout, stderr
+from time import perf_counter
+from typing import Callable, List, Dict, Union, TextIO, Optional
 
 from interpret_ext.utils import Utils
+from interpret_ext.output import Output
+from interpret_ext.input_reader import InputReader
+from interpret_ext.profiler import Profiler
 from interpret_ext.ret_codes import RetCodes
 import interpret_ext.instructions as instructions
 import interpret_ext.types_ as types
 
 
+class Undefined:
+    """Value of global frame slot of not defined variable"""
+    def __bool__(self) -> bool:
+        return False
+
+    def __repr__(self) -> str:
+        return "<undefined>"
+
+
+UNDEFINED = Undefined()
+
+
 class Program:
     """
     General program class
@@ -26,17 +43,27 @@ class Program:
             Program(None)
         return Program.__instance
 
-    def __init__(self, input_):
+    def __init__(self, input_, line_buffered: bool = False):
         """
         Program constructor
 
         :param input_: input file for read instruction
+        :param line_buffered: flush program output after every line
         """
         if Program.__instance is None:
             self._input: TextIO = input_
-            self.global_frame: Dict = {}
-            self.local_frame: List = []
-            self.tmp_frame: Optional[dict] = None
+            self._reader: Optional[InputReader] = None
+            if input_ is not None:
+                # like input(), show pending output (e.g. prompt) before waiting on standard input
+                self._reader = InputReader(input_, input_ is not stdin, Output.flush_all if input_ is stdin else None)
+            self.output = Output(stdout, line_buffered)     # WRITE output
+            self.errors = Output(stderr, line_buffered)     # DPRINT and BREAK output
+            self.global_frame: List = []    # variables values indexed by slot, UNDEFINED if not defined
+            self._global_slots: Dict[str, int] = {}     # global variables name:slot dictionary
+            self.local_frame: List[List] = []    # stack of local frames, indexed like global frame
+            self.tmp_frame: Optional[List] = None
+            self._frame_slots: Dict[str, int] = {}      # local and temporary variables name:slot dictionary
+            self._empty_frame: List = []    # frame with all variables undefined
             self.data_stack: List[types.Types] = []
             self.call_stack: List[int] = []
 
@@ -62,15 +89,99 @@ class Program:
             else:
                 self._bare_instructions.append(inst)
 
-    def eval_program(self) -> None:
+    def load_instructions(self, insts: List, labels: Dict[str, int]) -> None:
+        """
+        Set already processed instructions and labels (e.g. from program cache)
+
+        :param insts: instructions without labels
+        :param labels: labels name:line dictionary
+        """
+        self._bare_instructions = insts
+        self._labels = labels
+
+    def link(self) -> None:
+        """
+        Prepare processed instructions for execution
+
+        Must be called once after instructions processing or loading
+        """
+        global_slots: Dict[str, int] = {}
+        frame_slots: Dict[str, int] = {}
+        for inst in self._bare_instructions:
+            # replace label names with instruction indices in all branching instructions
+            if isinstance(inst, instructions.Jump):
+                target: Optional[int] = self._labels.get(inst.get_label)
+                if target is None:
+                    Utils.error(f"undefined label ({inst.get_label})", RetCodes.SEMANTIC_ERR)
+                inst.target = target
+            # resolve variables on frame slots, temporary frames become local, so they share the shape
+            for arg in inst.arguments:
+                if isinstance(arg, types.Variable):
+                    slots = global_slots if arg.get_frame == "GF" else frame_slots
+                    arg.slot = slots.setdefault(arg.get_value, len(slots))
+        self.set_global_slots(global_slots)
+        self.set_frame_slots(frame_slots)
+
+    def set_global_slots(self, slots: Dict[str, int]) -> None:
+        """
+        Set layout of global frame, all variables are undefined
+
+        :param slots: global variables name:slot dictionary
+        """
+        self._global_slots = slots
+        self.global_frame[:] = [UNDEFINED] * len(slots)
+
+    def set_frame_slots(self, slots: Dict[str, int]) -> None:
+        """
+        Set shape of temporary and local frames
+
+        :param slots: local and temporary variables name:slot dictionary
+        """
+        self._frame_slots = slots
+        self._empty_frame[:] = [UNDEFINED] * len(slots)
+
+    def create_frame(self) -> None:
+        """Replace temporary frame with new frame, all variables are undefined"""
+        self.tmp_frame = self._empty_frame.copy()
+
+    def frame(self, var: types.Variable) -> List:
+        """
+        Get frame of given variable
+        Throws error if frame doesn't exist
+
+        :param var: variable
+        :return: frame values indexed by variable slots
+        """
+        if var.get_frame == "GF":
+            return self.global_frame
+        elif var.get_frame == "LF":
+            if len(self.local_frame) == 0:
+                Utils.error("accessing not existing frame", RetCodes.FRAME_NOT_EXIST_ERR)
+            return self.local_frame[-1]
+        if self.tmp_frame is None:
+            Utils.error("accessing not existing frame", RetCodes.FRAME_NOT_EXIST_ERR)
+        return self.tmp_frame
+
+    def eval_program(self, profiler: Optional[Profiler] = None,
+                     backward: Optional[Callable[[int], int]] = None) -> None:
         """
         Program evaluation
 
         Execute instructions one by one
+
+        :param profiler: collect execution profile, instrumented loop is used only if given
+        :param backward: called after instruction, which moved program pointer backward (e.g. loop jump),
+                         gets index of the instruction and returns new program pointer
         """
         # check if file without instructions
         if len(self._bare_instructions) == 0:
             return
+        if profiler is not None:
+            self._eval_profiled(profiler)
+            return
+        if backward is not None:
+            self._eval_traced(backward)
+            return
         # loop through the instructions
         while True:
             instruction = self._bare_instructions[self._program_ptr]
@@ -79,6 +190,40 @@ class Program:
             if self._program_ptr > len(self._bare_instructions) - 1:
                 break
 
+    def _eval_profiled(self, profiler: Profiler) -> None:
+        """
+        Program evaluation with collecting execution count and time of every instruction
+
+        :param profiler: collected profile
+        """
+        counts, times = profiler.counts, profiler.times
+        while True:
+            index = self._program_ptr
+            counts[index] += 1      # counted before evaluation, so EXIT is included
+            start = perf_counter()
+            self._bare_instructions[index].eval()
+            times[index] += perf_counter() - start
+            self._program_ptr += 1
+            if self._program_ptr > len(self._bare_instructions) - 1:
+                break
+
+    def _eval_traced(self, backward: Callable[[int], int]) -> None:
+        """
+        Program evaluation with callback on backward control transfers
+
+        :param backward: callback getting index of the instruction, returns new program pointer
+        """
+        insts = self._bare_instructions
+        end = len(insts)
+        while True:
+            index = self._program_ptr
+            insts[index].eval()
+            if self._program_ptr < index:
+                self._program_ptr = backward(index)
+            self._program_ptr += 1
+            if self._program_ptr >= end:
+                break
+
     def is_exist(self, var: types.Variable) -> bool:
         """
         Check if given variable exist
@@ -86,16 +231,7 @@ class Program:
         :param var: variable to check
         :return: true if variable exist, false otherwise
         """
-        if var.get_frame == "GF":
-            return var.value in self.get_global_frame
-        elif var.get_frame == "LF":
-            if len(self.get_local_frame) == 0:
-                Utils.error("accessing not existing frame", RetCodes.FRAME_NOT_EXIST_ERR)
-            return var.value in self.get_local_frame[-1]
-        elif var.get_frame == "TF":
-            if self.get_tmp_frame is None:
-                Utils.error("accessing not existing frame", RetCodes.FRAME_NOT_EXIST_ERR)
-            return var.value in self.get_tmp_frame
+        return self.frame(var)[var.slot] is not UNDEFINED
 
     def var_init(self, var: types.Variable) -> None:
         """
@@ -103,14 +239,9 @@ class Program:
 
         :param var: variable to define
         """
-        if var.get_frame == "GF":
-            self.global_frame[var.value] = None
-        elif var.get_frame == "LF":
-            self.local_frame[-1][var.value] = None
-        elif var.get_frame == "TF":
-            self.tmp_frame[var.value] = None
+        self.frame(var)[var.slot] = None
 
-    def var_set(self, var: types.Variable, value: str) -> None:
+    def var_set(self, var: types.Variable, value: types.Constant) -> None:
         """
         Set value on defined variable
         Throws error if variable undefined
@@ -118,14 +249,10 @@ class Program:
         :param var: variable to set
         :param value: value to set
         """
-        if not self.is_exist(var):
+        frame = self.frame(var)
+        if var.checked and frame[var.slot] is UNDEFINED:
             Utils.error("undefined variable", RetCodes.VAR_NOT_EXIST_ERR)
-        if var.get_frame == "GF":
-            self.global_frame[var.value] = value
-        elif var.get_frame == "LF":
-            self.local_frame[-1][var.value] = value
-        elif var.get_frame == "TF":
-            self.tmp_frame[var.value] = value
+        frame[var.slot] = value
 
     def get_value(self, var: Union[types.Variable, types.Constant], type_=False) -> types.Constant:
         """
@@ -137,52 +264,97 @@ class Program:
         """
         if isinstance(var, types.Constant):
             return var
-        else:
-            if not self.is_exist(var):
-                Utils.error("undefined variable", RetCodes.VAR_NOT_EXIST_ERR)
-            var_value = None
-            if var.get_frame == "GF":
-                var_value = self.get_global_frame[var.value]
-            elif var.get_frame == "LF":
-                var_value = self.get_local_frame[-1][var.value]
-            elif var.get_frame == "TF":
-                var_value = self.get_tmp_frame[var.value]
-            if var_value is None and type_ is False:
-                Utils.error("missing value", RetCodes.VALUE_NOT_EXIST_ERR)
-            return var_value
+        if not var.checked:     # variable proven defined (and initialized unless type_ is requested)
+            return self.frame(var)[var.slot]
+        var_value = self.frame(var)[var.slot]
+        if var_value is UNDEFINED:
+            Utils.error("undefined variable", RetCodes.VAR_NOT_EXIST_ERR)
+        elif var_value is None and type_ is False:
+            Utils.error("missing value", RetCodes.VALUE_NOT_EXIST_ERR)
+        return var_value
+
+    def read_line(self) -> str:
+        """
+        Read next line of program input
+
+        :return: line without surrounding whitespaces, empty string at the end of input
+        """
+        return self._reader.readline().strip()
 
     def get_stats(self) -> str:
         """Debugging information"""
-        return f"Global frame: {self.get_global_frame}" \
-               f"Local frame: {self.get_local_frame}" \
-               f"Temporary frame: {self.get_tmp_frame}" \
+        tmp_frame = None if self.tmp_frame is None else self.frame_names(self.tmp_frame, self._frame_slots)
+        return f"Global frame: {self.frame_names(self.global_frame, self._global_slots)}" \
+               f"Local frame: {[self.frame_names(frame, self._frame_slots) for frame in self.local_frame]}" \
+               f"Temporary frame: {tmp_frame}" \
                f"Data stack: {self.get_data_stack}" \
                f"Call stack: {self.get_call_stack}" \
                f"Labels: {self.get_labels}" \
                f"Program pointer: {self.program_ptr}"
 
+    @staticmethod
+    def frame_names(frame: List, slots: Dict[str, int]) -> Dict:
+        """
+        Frame as dictionary of defined variables
+
+        :param frame: frame values indexed by slots
+        :param slots: variables name:slot dictionary
+        :return: variables name:value dictionary
+        """
+        return {name: frame[slot] for name, slot in slots.items() if frame[slot] is not UNDEFINED}
+
     @property
     def get_input(self) -> TextIO:
         """Input file getter"""
         return self._input
 
+    @property
+    def get_output(self) -> Output:
+        """Standard output channel getter"""
+        return self.output
+
+    @property
+    def get_errors(self) -> Output:
+        """Standard error output channel getter"""
+        return self.errors
+
+    @property
+    def get_instructions(self) -> List:
+        """Instructions without labels getter"""
+        return self._bare_instructions
+
     @property
     def get_labels(self) -> dict:
         """Dictionary with labels getter"""
         return self._labels
 
     @property
-    def get_global_frame(self) -> dict:
-        """Dictionary of global frame values getter"""
+    def get_global_frame(self) -> list:
+        """Global frame values getter (indexed by variable slot)"""
         return self.global_frame
 
+    @property
+    def get_global_slots(self) -> Dict[str, int]:
+        """Global variables name:slot dictionary getter"""
+        return self._global_slots
+
     @property
     def get_local_frame(self) -> list:
         """Local frame getter"""
         return self.local_frame
 
     @property
-    def get_tmp_frame(self) -> Optional[dict]:
+    def get_frame_slots(self) -> Dict[str, int]:
+        """Local and temporary variables name:slot dictionary getter"""
+        return self._frame_slots
+
+    @property
+    def get_empty_frame(self) -> List:
+        """Frame with all variables undefined getter (must not be modified)"""
+        return self._empty_frame
+
+    @property
+    def get_tmp_frame(self) -> Optional[List]:
         """Temporary frame getter"""
         return self.tmp_frame
 
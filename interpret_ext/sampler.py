@@ -0,0 +1,88 @@
+"""Sampling profiling of program call stack"""
+
+from collections import Counter
+from threading import Event, Thread
+from typing import Dict, TextIO
+
+import interpret_ext.instructions as instructions
+
+
+class Sampler:
+    """Sampling call graph profiler
+
+    Background thread periodically copies program call stack.
+    Return addresses on the call stack are indices of CALL instructions,
+    which are mapped on their target labels, so every sample is a stack
+    of called functions. Report is written in folded stacks format
+    ("<main>;f;g count" lines), readable by flamegraph tools.
+
+    Attributes:
+    program -- sampled program
+    interval -- time between samples in seconds
+    """
+    INTERVAL: float = 0.01
+    MAIN = "<main>"
+
+    def __init__(self, program, interval: float = INTERVAL):
+        """
+        Sampler constructor
+
+        :param program: loaded program
+        :param interval: time between samples in seconds
+        """
+        self.program = program
+        self.interval = interval
+        self._samples: Counter = Counter()      # call stack: samples count
+        self._stop = Event()
+        self._thread = Thread(target=self._sample, name="ippcode22-sampler", daemon=True)
+
+    def start(self) -> None:
+        """Start sampling thread"""
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling thread and wait for it"""
+        self._stop.set()
+        self._thread.join()
+
+    def _sample(self) -> None:
+        """Sampling thread loop"""
+        call_stack = self.program.get_call_stack
+        samples = self._samples
+        while not self._stop.wait(self.interval):
+            samples[tuple(call_stack)] += 1     # list copy is atomic under GIL
+
+    def folded(self) -> Dict[str, int]:
+        """
+        Samples in folded stacks form
+
+        :return: semicolon separated function names: samples count
+        """
+        insts = self.program.get_instructions
+        folded: Counter = Counter()
+        for stack, count in self._samples.items():
+            names = [self.MAIN] + [self.callee(insts, address) for address in stack]
+            folded[";".join(names)] += count
+        return folded
+
+    @staticmethod
+    def callee(insts, address: int) -> str:
+        """
+        Function name of call stack entry
+
+        :param insts: program instructions
+        :param address: return address (index of CALL instruction)
+        :return: called label name
+        """
+        if 0 <= address < len(insts) and isinstance(insts[address], instructions.Call):
+            return insts[address].get_label
+        return f"?{address}"
+
+    def write(self, file: TextIO) -> None:
+        """
+        Write folded stacks report
+
+        :param file: opened output file
+        """
+        for stack, count in sorted(self.folded().items()):
+            file.write(f"{stack} {count}\n")
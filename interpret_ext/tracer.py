@@ -0,0 +1,145 @@
+"""Tracing compiler of hot loops"""
+
+from collections import Counter
+from typing import Any, Callable, Dict, List, Set, Tuple, Union
+
+from interpret_ext.codegen import CodeGen
+from interpret_ext.program import Program
+import interpret_ext.instructions as instructions
+
+
+class TraceEngine:
+    """Tracing execution engine
+
+    Program is evaluated by Program.eval_program, which reports backward
+    control transfers. Taken backward jumps (JUMP, JUMPIFEQ, JUMPIFNEQ,
+    and their stack variants) are counted. When a jump gets hot, one iteration
+    of its loop is executed with recording of executed instructions.
+    The recorded linear trace is compiled into single Python function,
+    in which every instruction, whose successor can differ from the recorded one,
+    is guarded: the function returns on the first deviation and evaluation
+    continues in the interpreter. Loop head with compiled trace enters the trace
+    on every backward jump into it.
+
+    Traces are generated by CodeGen, so their errors are the same as of interpreted
+    instructions. Loops with instructions without generated form
+    or with too long trace are left to the interpreter.
+
+    Attributes:
+    program -- program to execute
+    stats -- count of compiled traces, entries into traces and rejected loops
+    """
+    HOT: int = 50           # taken backward jumps, after which the loop is traced
+    MAX_TRACE: int = 1000   # instructions in trace, longer loops are not traced
+
+    def __init__(self, program: Program):
+        """
+        Engine constructor
+
+        :param program: loaded program
+        """
+        self.program = program
+        self.stats: Counter = Counter()
+        self._insts: List[instructions.Instruction] = program.get_instructions
+        self._namespace: Dict[str, Any] = CodeGen.namespace(program)
+        self._counts: Counter = Counter()       # taken backward jumps by loop head
+        self._traces: Dict[int, Callable[[], int]] = {}  # loop head: compiled trace
+        self._rejected: Set[int] = set()        # heads of loops, which can't be traced
+
+    def run(self) -> None:
+        """Execute program"""
+        self.program.eval_program(backward=self.backward)
+
+    def backward(self, index: int) -> int:
+        """
+        Handle backward control transfer
+
+        :param index: index of instruction, which moved program pointer backward
+        :return: new program pointer (index of the last executed instruction)
+        """
+        program = self.program
+        inst = self._insts[index]
+        if not isinstance(inst, instructions.Jump) or isinstance(inst, instructions.Call):
+            return program.program_ptr     # RETURN
+        head = program.program_ptr + 1
+        trace = self._traces.get(head)
+        if trace is None:
+            if head in self._rejected:
+                return program.program_ptr
+            self._counts[head] += 1
+            if self._counts[head] < self.HOT:
+                return program.program_ptr
+            path, resume = self.record(head)
+            if resume != head or not path:
+                self._rejected.add(head)
+                self.stats["rejected"] += 1
+                return resume - 1
+            trace = self._traces[head] = self.compile_trace(path)
+            self.stats["compiled"] += 1
+        self.stats["entered"] += 1
+        return trace() - 1
+
+    def record(self, head: int) -> Tuple[List[Tuple[int, int]], int]:
+        """
+        Execute one loop iteration and record executed instructions
+
+        Recording stops when the loop returns to its head, on instruction
+        without generated form, on too long trace or on the end of program.
+
+        :param head: index of the first instruction of loop
+        :return: executed instructions indices with indices of their successors
+                 and index of instruction, on which evaluation continues (head if the loop was closed)
+        """
+        program = self.program
+        insts = self._insts
+        path: List[Tuple[int, int]] = []
+        ptr = head
+        while ptr < len(insts) and len(path) < self.MAX_TRACE and CodeGen.supports(insts[ptr]):
+            program.program_ptr = ptr
+            insts[ptr].eval()
+            path.append((ptr, program.program_ptr + 1))
+            ptr = program.program_ptr + 1
+            if ptr == head:
+                break
+        return path, ptr
+
+    def compile_trace(self, path: List[Tuple[int, int]]) -> Callable[[], int]:
+        """
+        Compile recorded trace into function
+
+        :param path: recorded instructions indices with indices of their successors
+        :return: function executing the loop, returns index of instruction,
+                 on which evaluation continues after deviation from the trace
+        """
+        bindings: Dict[str, Any] = {}
+
+        def lit(value: Any) -> str:
+            if type(value) is int:
+                return repr(value)
+            name = f"k{len(bindings)}"
+            bindings[name] = value
+            return name
+
+        body: List[str] = []
+        for index, successor in path:
+            inst = self._insts[index]
+
+            # recorded successor continues the trace, other targets leave it
+            def goto(target: Union[int, str], successor: int = successor) -> str:
+                if isinstance(target, str):
+                    return f"if (nt := {target}) != {successor}: return nt"
+                return "break" if target == successor else f"return {target}"
+
+            lines = CodeGen(lit, goto).emit(inst, index)
+            if isinstance(inst, (instructions.Jump, instructions.Return)):
+                if isinstance(inst, instructions.Jump) and type(inst) not in (instructions.Jump, instructions.Call):
+                    lines.append(goto(index + 1))   # conditional jump isn't taken
+                # single iteration loop, so break continues after the instruction
+                lines = ["for _ in (None,):"] + CodeGen.indent(lines)
+            body += [f"# {index}: {type(inst).__name__.upper()}"] + lines
+        source = "\n".join([f"def factory({', '.join(bindings)}):",
+                            "    def trace():",
+                            "        while True:"] + CodeGen.indent(body, 3) + ["    return trace"])
+        scope: Dict[str, Any] = {}
+        exec(compile(source, f"<trace {path[0][0]}>", "exec"), self._namespace, scope)
+        return scope["factory"](**bindings)
@@ -0,0 +1,166 @@
+"""Ahead-of-time translation of loaded program into python module"""
+
+from typing import Any, Dict, List, Union
+
+from interpret_ext.codegen import CodeGen
+from interpret_ext.program import Program
+import interpret_ext.instructions as instructions
+import interpret_ext.types_ as types
+
+
+class Transpiler:
+    """Program to python source translation
+
+    Splits instructions into basic blocks, every block is translated into
+    nested function of the module 'run' function, returning index of the next block.
+    Blocks are dispatched in while loop, negative block index ends the program.
+    Instructions without generated form are rebuilt on module import
+    and executed through their eval method.
+
+    Attributes:
+    program -- loaded program to translate
+    """
+    _HEADER: List[str] = [
+        '"""IPPcode22 program translated by interpret.py --compile"""',
+        "",
+        "from interpret_ext.output import Output",
+        "from interpret_ext.program import UNDEFINED",
+        "from interpret_ext.ret_codes import RetCodes",
+        "from interpret_ext.types_ import Constant, StrBuffer, Variable, Label, Type, TRUE, FALSE",
+        "from interpret_ext.utils import Utils",
+        "import interpret_ext.instructions as instructions",
+        "",
+        "Read = instructions.Read",
+        "error = Utils.error",
+        "flush = Output.flush_all",
+    ]
+
+    _MAX_BLOCK: int = 256                       # maximal count of instructions in one block
+
+    def __init__(self, program: Program):
+        """
+        Transpiler constructor
+
+        :param program: program with processed instructions
+        """
+        self.program = program
+        self._literals: Dict[str, str] = {}     # literal source: module level name
+        self._setup: List[str] = []             # module level statements run after literals creation
+        self._leaders: List[int] = self.find_leaders()
+        self._block_of: Dict[int, int] = {leader: block for block, leader in enumerate(self._leaders)}
+
+    def find_leaders(self) -> List[int]:
+        """
+        Find first instructions of basic blocks
+
+        :return: sorted indices of blocks leaders
+        """
+        insts: List = self.program.get_instructions
+        leaders = {0} if insts else set()
+        for index, inst in enumerate(insts):
+            if isinstance(inst, instructions.Jump):
+                leaders.add(inst.target + 1)
+            if isinstance(inst, (instructions.Jump, instructions.Return, instructions.Exit)) or \
+                    not CodeGen.supports(inst):
+                leaders.add(index + 1)
+        # split long straight-line code, huge functions are slow to compile
+        leaders.update(range(0, len(insts), self._MAX_BLOCK))
+        return sorted(leader for leader in leaders if leader < len(insts))
+
+    def lit(self, value: Any) -> str:
+        """
+        Source expression of literal value
+
+        :param value: native value or operand
+        :return: python expression
+        """
+        if isinstance(value, types.Constant):
+            source = f"Constant({value.get_type!r}, {value.get_value!r})"
+        elif isinstance(value, types.Variable):
+            source = f"Variable({value.get_frame + '@' + value.get_value!r})"
+            if source not in self._literals and value.slot >= 0:
+                self._setup.append(f"K{len(self._literals)}.slot = {value.slot}")
+        elif isinstance(value, (types.Label, types.Type)):
+            source = f"{type(value).__name__}({value.get_value!r})"
+        elif isinstance(value, instructions.Instruction):
+            source = f"instructions.{type(value).__name__}([{', '.join(self.lit(arg) for arg in value.arguments)}])"
+        else:
+            return repr(value)
+        if source not in self._literals:
+            self._literals[source] = f"K{len(self._literals)}"
+        return self._literals[source]
+
+    def goto(self, target: Union[int, str]) -> str:
+        """
+        Statement continuing on given instruction
+
+        :param target: instruction index or expression with it
+        :return: return statement of block function
+        """
+        if isinstance(target, str):
+            return f"return BLOCK_AT.get({target}, -1)"
+        return f"return {self._block_of.get(target, -1)}"
+
+    def generate(self) -> str:
+        """
+        Translate program into module source
+
+        :return: python source code
+        """
+        insts: List = self.program.get_instructions
+        bounds = self._leaders + [len(insts)]
+        body: List[str] = []
+        for block, (start, end) in enumerate(zip(bounds, bounds[1:])):
+            body.append(f"def b{block}():")
+            lines: List[str] = []
+            for index in range(start, end):
+                lines.append(f"# {index}: {type(insts[index]).__name__.upper()}")
+                inst_lines = CodeGen(self.lit, self.goto).emit(insts[index], index)
+                if inst_lines is None:
+                    inst_lines = [f"program.program_ptr = {index}",
+                                  f"{self.fallback(insts[index])}.eval()",
+                                  self.goto("program.program_ptr + 1")]
+                lines += inst_lines
+            if not lines[-1].startswith("return"):
+                lines.append(self.goto(end))    # fall through into the next block
+            body += CodeGen.indent(lines)
+
+        module = self._HEADER + [f"{name} = {source}" for source, name in self._literals.items()] + self._setup
+        module += [f"BLOCK_AT = {self._block_of!r}",
+                   f"LABELS = {self.program.get_labels!r}",
+                   f"GLOBAL_SLOTS = {self.program.get_global_slots!r}",
+                   f"FRAME_SLOTS = {self.program.get_frame_slots!r}",
+                   "",
+                   "",
+                   "def run(program):",
+                   '    """Execute translated program"""',
+                   "    gf = program.get_global_frame",
+                   "    lfs = program.get_local_frame",
+                   "    cs = program.get_call_stack",
+                   "    ds = program.get_data_stack",
+                   "    out = program.get_output.write",
+                   "    err = program.get_errors.write",
+                   "    program.get_labels.update(LABELS)",
+                   "    program.set_global_slots(GLOBAL_SLOTS)",
+                   "    program.set_frame_slots(FRAME_SLOTS)",
+                   "    EMPTY = program.get_empty_frame",
+                   ""]
+        module += CodeGen.indent(body)
+        module += CodeGen.indent(["",
+                                  f"blocks = ({''.join(f'b{block}, ' for block in range(len(self._leaders)))})",
+                                  f"block = {0 if self._leaders else -1}",
+                                  "while block >= 0:",
+                                  "    block = blocks[block]()"])
+        return "\n".join(module) + "\n"
+
+    def fallback(self, inst: instructions.Instruction) -> str:
+        """
+        Module level instruction rebuilt on import
+
+        :param inst: instruction without generated form
+        :return: name of rebuilt instruction
+        """
+        name = self.lit(inst)
+        if isinstance(inst, instructions.Jump):
+            self._setup.append(f"{name}.target = {inst.target}")
+        return name
@@ -0,0 +1,217 @@
+"""Static type inference of loaded program"""
+
+from collections import Counter
+from heapq import heappop, heappush
+from typing import Dict, List, Optional, Tuple
+
+from interpret_ext.program import Program
+from interpret_ext.cfg import ControlFlowGraph
+from interpret_ext.utils import Utils
+import interpret_ext.instructions as instructions
+import interpret_ext.types_ as types
+
+Key = Tuple[str, int]   # variable frame and slot
+TypeFacts = Dict[Key, str]  # known types of variables
+
+# required types of symbol operands by position, instruction fails on other types
+REQUIRES: Dict[type, Dict[int, str]] = {
+    instructions.Add: {1: "int", 2: "int"}, instructions.Sub: {1: "int", 2: "int"},
+    instructions.Mul: {1: "int", 2: "int"}, instructions.Idiv: {1: "int", 2: "int"},
+    instructions.And: {1: "bool", 2: "bool"}, instructions.Or: {1: "bool", 2: "bool"},
+    instructions.Not: {1: "bool"}, instructions.Int2Char: {1: "int"}, instructions.Strlen: {1: "string"},
+    instructions.Concat: {1: "string", 2: "string"}, instructions.Stri2Int: {1: "string", 2: "int"},
+    instructions.Getchar: {1: "string", 2: "int"}, instructions.Setchar: {0: "string", 1: "int", 2: "string"},
+    instructions.Exit: {0: "int"},
+}
+
+# relational instructions, operands must have the same comparable type
+RELATIONAL: Tuple[type, ...] = (instructions.Lt, instructions.Gt, instructions.Eq)
+
+# conditional jumps, operands must have the same type or one of them is nil
+CONDITIONAL: Tuple[type, ...] = (instructions.Jumpifeq, instructions.Jumpifneq)
+
+# type of result of instructions writing their first operand, None if it isn't known statically
+RESULTS: Dict[type, Optional[str]] = {
+    instructions.Add: "int", instructions.Sub: "int", instructions.Mul: "int", instructions.Idiv: "int",
+    instructions.Strlen: "int", instructions.Stri2Int: "int",
+    instructions.Lt: "bool", instructions.Gt: "bool", instructions.Eq: "bool",
+    instructions.And: "bool", instructions.Or: "bool", instructions.Not: "bool",
+    instructions.Concat: "string", instructions.Getchar: "string", instructions.Int2Char: "string",
+    instructions.Setchar: "string", instructions.Type: "string",
+    instructions.Read: None, instructions.Pops: None, instructions.Defvar: None,
+}
+
+# check-free variants of instructions
+UNCHECKED: Dict[type, type] = {
+    instructions.Add: instructions.AddUnchecked, instructions.Sub: instructions.SubUnchecked,
+    instructions.Mul: instructions.MulUnchecked, instructions.Idiv: instructions.IdivUnchecked,
+    instructions.Lt: instructions.LtUnchecked, instructions.Gt: instructions.GtUnchecked,
+    instructions.Eq: instructions.EqUnchecked, instructions.And: instructions.AndUnchecked,
+    instructions.Or: instructions.OrUnchecked, instructions.Not: instructions.NotUnchecked,
+    instructions.Int2Char: instructions.Int2CharUnchecked, instructions.Strlen: instructions.StrlenUnchecked,
+    instructions.Concat: instructions.ConcatUnchecked, instructions.Stri2Int: instructions.Stri2IntUnchecked,
+    instructions.Getchar: instructions.GetcharUnchecked, instructions.Setchar: instructions.SetcharUnchecked,
+    instructions.Jumpifeq: instructions.JumpifeqUnchecked, instructions.Jumpifneq: instructions.JumpifneqUnchecked,
+}
+
+
+def key(var: types.Variable) -> Key:
+    """Identification of linked variable"""
+    return var.get_frame, var.slot
+
+
+class TypeInference:
+    """Static type inference
+
+    Optional load time pass over linked program (-O). Known types of variables
+    are propagated through basic blocks of control flow graph: results of
+    instructions have fixed types (e.g. ADD int, CONCAT string), MOVE copies
+    type of its source and operand types checked by instruction are known after it,
+    because instruction fails on other types. Instructions, whose operand types
+    are proven, are replaced with their check-free variants (Unchecked),
+    other instructions keep their checks, so errors of program stay the same.
+
+    Types are known only in the current frames, frames changing
+    instructions forget them, CALL forgets all types on return.
+
+    Attributes:
+    program -- linked program
+    stats -- count of replaced instructions by opcode
+    """
+    def __init__(self, program: Program):
+        """
+        Type inference constructor
+
+        :param program: linked program
+        """
+        self.program = program
+        self.stats: Counter = Counter()
+        self._insts: List[instructions.Instruction] = program.get_instructions
+        self._cfg: ControlFlowGraph = ControlFlowGraph(self._insts)
+
+    def optimize(self) -> None:
+        """Infer types and replace instructions with proven operand types"""
+        cfg = self._cfg
+        for block, facts in self.infer().items():
+            for index in range(cfg.starts[block], cfg.end(block)):
+                inst = self._insts[index]
+                if self.proven(inst, facts):
+                    self._insts[index] = self.unchecked(inst)
+                    self.stats[type(inst).__name__.upper()] += 1
+                self.transfer(inst, facts)
+
+    def infer(self) -> Dict[int, TypeFacts]:
+        """
+        Propagate known types through reachable blocks
+
+        :return: types known on entry of every reachable block
+        """
+        cfg = self._cfg
+        entry: Dict[int, TypeFacts] = {0: {}} if cfg.starts else {}
+        pending: List[int] = [0] if cfg.starts else []     # heap of blocks with changed entry types
+        while pending:
+            block = heappop(pending)
+            while pending and pending[0] == block:
+                heappop(pending)
+            facts = entry[block].copy()
+            for index in range(cfg.starts[block], cfg.end(block)):
+                self.transfer(self._insts[index], facts)
+            outgoing = [(successor, facts) for successor in cfg.successors[block]]
+            if cfg.returns[block] is not None:
+                outgoing.append((cfg.returns[block], {}))     # callee may change anything
+            for successor, out in outgoing:
+                new = self.meet(entry.get(successor), out)
+                if successor not in entry or new != entry[successor]:
+                    entry[successor] = new
+                    heappush(pending, successor)
+        return entry
+
+    @staticmethod
+    def meet(first: Optional[TypeFacts], second: TypeFacts) -> TypeFacts:
+        """Types known on both paths"""
+        if first is None:
+            return second.copy()
+        return {var: type_ for var, type_ in first.items() if second.get(var) == type_}
+
+    @staticmethod
+    def type_of(arg: types.Types, facts: TypeFacts) -> Optional[str]:
+        """
+        Known type of symbol operand
+
+        :param arg: constant or variable
+        :param facts: known types
+        :return: type name, None if unknown
+        """
+        if isinstance(arg, types.Constant):
+            return arg.get_type
+        return facts.get(key(arg))
+
+    @staticmethod
+    def transfer(inst: instructions.Instruction, facts: TypeFacts) -> None:
+        """
+        Update known types by effect of instruction
+
+        :param inst: instruction
+        :param facts: types known before instruction, updated in place
+        """
+        cls = type(inst)
+        args = inst.arguments
+        # checked operands have required types, if execution continues
+        for position, type_ in REQUIRES.get(cls, {}).items():
+            if isinstance(args[position], types.Variable):
+                facts[key(args[position])] = type_
+        if cls in RELATIONAL:
+            type1 = TypeInference.type_of(args[1], facts)
+            type2 = TypeInference.type_of(args[2], facts)
+            known = type1 or type2
+            if cls is not instructions.Eq and known in Utils.COMPARABLE_TYPES:
+                for arg in args[1:3]:
+                    if isinstance(arg, types.Variable):
+                        facts[key(arg)] = known
+        if cls is instructions.Move:
+            type_ = TypeInference.type_of(args[1], facts)
+            if type_ is None:
+                facts.pop(key(args[0]), None)
+            else:
+                facts[key(args[0])] = type_
+        elif cls in RESULTS:
+            if RESULTS[cls] is None:
+                facts.pop(key(args[0]), None)
+            else:
+                facts[key(args[0])] = RESULTS[cls]
+        elif cls is instructions.Createframe:
+            for var in [var for var in facts if var[0] == "TF"]:
+                del facts[var]
+        elif cls in (instructions.Pushframe, instructions.Popframe):
+            for var in [var for var in facts if var[0] != "GF"]:
+                del facts[var]
+
+    @staticmethod
+    def proven(inst: instructions.Instruction, facts: TypeFacts) -> bool:
+        """
+        Check if instruction can't fail on operand types
+
+        :param inst: instruction
+        :param facts: types known before instruction
+        :return: true if instruction has check-free variant and operand types are proven
+        """
+        cls = type(inst)
+        if cls not in UNCHECKED:
+            return False
+        args = inst.arguments
+        if cls in RELATIONAL or cls in CONDITIONAL:
+            type1 = TypeInference.type_of(args[1], facts)
+            type2 = TypeInference.type_of(args[2], facts)
+            # EQ compares nil by its type, LT and GT fail on it, jumps compare values of the same type only
+            return type1 is not None and type1 == type2 and \
+                (type1 in Utils.COMPARABLE_TYPES if cls in RELATIONAL else True)
+        return all(TypeInference.type_of(args[position], facts) == type_
+                   for position, type_ in REQUIRES[cls].items())
+
+    @staticmethod
+    def unchecked(inst: instructions.Instruction) -> instructions.Instruction:
+        """Check-free variant of instruction with the same operands"""
+        new = UNCHECKED[type(inst)](inst.arguments)
+        if isinstance(inst, instructions.Jump):
+            new.target = inst.target
+        return new
@@ -1,38 +1,27 @@
 """Input program types"""
 
-import re
+from typing import List, Sequence, Union
 
 
 class Types:
     """General types class
 
     Inherited by all existing arguments types
-    Provide methods for easier sorting and getters
+    Operands are compact slotted records shared between instructions,
+    so they must not be modified after creation
+    (except variable slot, which is set once on program linking
+    and string buffers, which are owned by single variable)
     """
-    def __init__(self, value: str, order: int = -1):
+    __slots__ = ("value",)
+
+    def __init__(self, value: str):
         """
         Types constructor
 
         :param value: argument value
-        :param order: argument position
         """
-        self.order = order
         self.value = value
 
-    def __eq__(self, other):
-        return self.order == other.order
-
-    def __lt__(self, other):
-        return self.order < other.order
-
-    def __gt__(self, other):
-        return self.order > other.order
-
-    @property
-    def get_order(self) -> int:
-        """Argument order getter"""
-        return self.order
-
     @property
     def get_value(self) -> str:
         """Argument value getter"""
@@ -40,69 +29,177 @@ class Types:
 
 
 class Variable(Types):
-    """Variable argument"""
-    def __init__(self, value: str, order: int = -1):
+    """Variable argument
+
+    Variable accesses are checked for undefined or uninitialized variable,
+    unless the access is proven safe on program load (see DefiniteAssignment)
+    """
+    __slots__ = ("_frame", "slot", "checked")
+
+    def __init__(self, value: str):
         """
         Variable type constructor
 
-        :param value: variable name
-        :param order: variable order in instruction
+        :param value: variable name with frame
         """
         self._frame, value = value.split("@")
-        super().__init__(value, order)
+        super().__init__(value)
+        self.slot: int = -1     # index in variable frame, set on program linking
+        self.checked: bool = True   # access is checked, set on proven safe copies only
 
     @property
     def get_frame(self) -> str:
         """Variable frame getter"""
         return self._frame
 
+    def unchecked(self) -> "Variable":
+        """
+        Copy of linked variable for accesses proven safe
+
+        :return: variable with the same frame and slot, which isn't checked on access
+        """
+        var = Variable(f"{self._frame}@{self.value}")
+        var.slot = self.slot
+        var.checked = False
+        return var
+
 
 class Constant(Types):
-    """Constant argument"""
-    def __init__(self, type_: str, value: str, order: int = -1):
+    """Constant argument
+
+    Value is kept in its native Python form:
+    int for 'int', bool for 'bool', str for 'string' and None for 'nil'.
+    Common constants are shared: use NIL, TRUE, FALSE and EMPTY_STRING
+    """
+    __slots__ = ("type_",)
+
+    def __init__(self, type_: str, value: Union[int, bool, str, None]):
         """
         Constant type constructor
 
         :param type_: constant type
-        :param value: constant value
-        :param order: constant order in instruction arguments
+        :param value: constant native value
         """
-        # check if string is empty
-        if value is None and type_ == "string":
-            value = ""
-        super().__init__(value, order)
+        super().__init__(value)
         self.type_ = type_
 
-        # if constant a string, check for escape sequences
-        if self.type_ == "string":
-            pattern = re.compile(r'(\\[0-9]{3})', re.UNICODE)
-            self.value = re.sub(pattern, lambda x: chr(int(x.group()[1:])), self.value)
+    def __str__(self) -> str:
+        """Constant value in IPPcode22 text representation"""
+        if self.type_ == "bool":
+            return "true" if self.value else "false"
+        elif self.type_ == "nil":
+            return "nil"
+        return str(self.value)
+
+    @staticmethod
+    def of(type_: str, value: Union[int, bool, str, None]) -> "Constant":
+        """
+        Constant of given value, shared instance for common values
+
+        :param type_: constant type
+        :param value: constant native value
+        :return: constant
+        """
+        if type_ == "bool":
+            return TRUE if value else FALSE
+        elif type_ == "nil":
+            return NIL
+        elif type_ == "string" and value == "":
+            return EMPTY_STRING
+        return Constant(type_, value)
 
     @property
     def get_type(self) -> str:
         """Constant type getter"""
         return self.type_
 
+    @property
+    def get_chars(self) -> Sequence[str]:
+        """Characters of string value, string buffer doesn't join them"""
+        return self.value
 
-class Label(Types):
-    """Label argument"""
-    def __init__(self, value: str, order: int = -1):
+
+class StrBuffer(Constant):
+    """Mutable string value
+
+    Variable changed by SETCHAR or extended by CONCAT of itself holds
+    its string as list of characters, so SETCHAR is O(1) and repeated CONCAT
+    is amortized linear. Plain string is joined only when value is read
+    (e.g. by WRITE or EQ) and kept until the next change.
+    Buffer is owned by the variable holding it: MOVE and PUSHS store
+    its frozen copy, so buffer is never shared.
+    """
+    __slots__ = ("_chars", "_text")
+
+    def __init__(self, text: str):
         """
-        Label type constructor
+        String buffer constructor
 
-        :param value: label name
-        :param order: label order in instruction
+        :param text: initial string
         """
-        super().__init__(value, order)
+        self.type_ = "string"
+        self._chars: List[str] = list(text)
+        self._text: Union[str, None] = text   # joined characters, None after change
 
+    @property
+    def value(self) -> str:
+        """String value, characters are joined after change"""
+        if self._text is None:
+            self._text = "".join(self._chars)
+        return self._text
 
-class Type(Types):
-    """Type argument"""
-    def __init__(self, value: str, order: int = -1):
+    @property
+    def get_chars(self) -> Sequence[str]:
+        """Characters of string value"""
+        return self._chars
+
+    def freeze(self) -> Constant:
+        """Immutable copy of buffer"""
+        return Constant("string", self.value)
+
+    @staticmethod
+    def setchar(const: Constant, position: int, char: str) -> "StrBuffer":
+        """
+        Change character of string in place
+
+        :param const: string of variable, plain string is converted into buffer
+        :param position: valid index of character
+        :param char: new character
+        :return: changed buffer (the given one, if it's buffer already)
         """
-        'Type' type constructor
+        buffer = const if const.__class__ is StrBuffer else StrBuffer(const.value)
+        buffer._chars[position] = char
+        buffer._text = None
+        return buffer
 
-        :param value: type name
-        :param order: type order in instruction
+    @staticmethod
+    def append(const: Constant, text: str) -> "StrBuffer":
         """
-        super().__init__(value, order)
+        Append string in place
+
+        :param const: string of variable, plain string is converted into buffer
+        :param text: appended string
+        :return: extended buffer (the given one, if it's buffer already)
+        """
+        if const.__class__ is not StrBuffer:
+            return StrBuffer(const.value + text)
+        if text:
+            const._chars.extend(text)
+            const._text = None
+        return const
+
+
+class Label(Types):
+    """Label argument"""
+    __slots__ = ()
+
+
+class Type(Types):
+    """Type argument"""
+    __slots__ = ()
+
+
+NIL = Constant("nil", None)
+TRUE = Constant("bool", True)
+FALSE = Constant("bool", False)
+EMPTY_STRING = Constant("string", "")
@@ -1,89 +1,144 @@
 """Parsing instructions and their arguments from XML"""
 
 import xml.etree.ElementTree as ET
-from typing import TextIO, Dict, List
-from re import match
+from array import array
+from typing import TextIO, List, Optional, Callable, Dict, Tuple
+from re import match, compile as re_compile
 
 from interpret_ext.ret_codes import RetCodes
 from interpret_ext.utils import Utils
-from interpret_ext.instructions import *
+import interpret_ext.instructions as instructions
 import interpret_ext.types_ as types
 
 
+class XMLStructError(Exception):
+    """Unexpected XML structure, reported after the whole document is checked for well-formedness"""
+
+
 class XMLParse:
     """XML parsing
     
     Collect and save elements from xml
     Pass xml through validations
+
+    XML is parsed as a stream, every instruction element is validated
+    and built as soon as it's complete and dropped from the tree after.
+    Structure errors are reported only when the rest of the document
+    is well-formed, bad XML format takes precedence as with whole tree parsing.
     """
     _ROOT_ATTRIBUTES: List = ["language", "name", "description"]
+    _TYPES: Tuple = ("int", "string", "bool")   # values of type operand
+    _ESCAPE_PATTERN = re_compile(r"\\([0-9]{3})")
+    _VARIABLE_PATTERN = re_compile(r"(GF|LF|TF)@[^@\s]+$")
+    # int literal as accepted by parse.php, leading zero without 0o prefix is decimal
+    _INT_PATTERN = re_compile(r"([+-]?)(?:0[xX]([0-9a-fA-F]+)|0[oO]([0-7]+)|([0-9]+))")
 
     def __init__(self, xml_source: TextIO):
         """
         XML parser constructor
 
-        Create XML element tree instance,
-        check if xml is valid
+        Parse XML stream, check if xml is valid
 
         :param xml_source: xml source file
         """
+        self._orders: array = array("Q")      # instructions orders, in document order
+        self._instructions: List = []
+        self._operands: Dict[Tuple[str, Optional[str]], types.Types] = {}    # interned operands
+        struct_error: Optional[str] = None
         try:
-            self._xml_tree: ET.ElementTree = ET.parse(xml_source)
+            depth = 0
+            root: Optional[ET.Element] = None
+            for event, element in ET.iterparse(xml_source, events=("start", "end")):
+                if event == "start":
+                    depth += 1
+                    if depth == 1:
+                        root = element
+                        struct_error = self.try_struct(struct_error, self.check_header, root)
+                elif depth == 2:
+                    depth -= 1
+                    struct_error = self.try_struct(struct_error, self.add_instruction, element)
+                    root.clear()    # drop processed instruction element
+                else:
+                    depth -= 1
         except ET.ParseError:
             Utils.error("bad xml format", RetCodes.XML_FORMAT_ERR)
-        self._xml_root = self._xml_tree.getroot()
-
-        self.check_header()
+        if struct_error is not None:
+            Utils.error(struct_error, RetCodes.XML_STRUCT_ERR)
         self._instructions = self.sort_xml()
 
-    def sort_xml(self) -> List:
-        """Sort XML source file into dictionary with instructions
+    @staticmethod
+    def try_struct(struct_error: Optional[str], check: Callable, element: ET.Element) -> Optional[str]:
+        """
+        Run structure check, unless any structure error was already found
 
-        :return: list with instructions
+        :param struct_error: first found structure error
+        :param check: check to run
+        :param element: checked element
+        :return: first found structure error
         """
-        instructions_data: Dict[int, Instruction] = {}
-        for inst in self._xml_root:
-            if inst.tag != "instruction":
-                Utils.error(f"unknown element ({inst.tag})", RetCodes.XML_STRUCT_ERR)
-            inst_attributes = inst.attrib.keys()
-            # check for required keywords present
-            if "order" not in inst_attributes or "opcode" not in inst_attributes or len(inst_attributes) != 2:
-                Utils.error("bad instruction attributes", RetCodes.XML_STRUCT_ERR)
-            # check if argument order is valid integer
+        if struct_error is None:
             try:
-                inst_order: int = int(inst.attrib["order"])
-                if inst_order <= 0:
-                    raise ValueError
-            except ValueError:
-                Utils.error(f"order must be positive integer (given: {inst.attrib['order']})", RetCodes.XML_STRUCT_ERR)
-
-            arguments: List = self.sort_arguments(inst)
-            instr_cls: str = inst.attrib["opcode"].title()
-            try:
-                instruction = eval(instr_cls)(arguments)
-            except NameError:
-                Utils.error(f"unknown opcode ({inst.attrib['opcode']})", RetCodes.XML_STRUCT_ERR)
-            if instructions_data.get(inst_order) is None:
-                instructions_data[inst_order] = instruction
-            else:
-                Utils.error(f"instruction order key already exist ({inst_order})", RetCodes.XML_STRUCT_ERR)
-        # sort instructions by their order
-        sorted_instructions = dict(sorted(instructions_data.items()))     # sort instructions by their order
-        return [value for value in sorted_instructions.values()]  # return only instructions
-
-    def check_header(self) -> None:
-        """Check program header for correct name and attributes"""
-        if self._xml_root.tag != "program":
-            Utils.error(f"invalid root name ({self._xml_root.tag})", RetCodes.XML_STRUCT_ERR)
+                check(element)
+            except XMLStructError as err:
+                return str(err)
+        return struct_error
+
+    def add_instruction(self, inst: ET.Element) -> None:
+        """Validate and build instruction from its element
+
+        :param inst: instruction element
+        """
+        if inst.tag != "instruction":
+            raise XMLStructError(f"unknown element ({inst.tag})")
+        inst_attributes = inst.attrib.keys()
+        # check for required keywords present
+        if "order" not in inst_attributes or "opcode" not in inst_attributes or len(inst_attributes) != 2:
+            raise XMLStructError("bad instruction attributes")
+        # check if argument order is valid integer
         try:
-            if self._xml_root.attrib["language"].lower() != "ippcode22":
-                Utils.error(f"only IPPcode22 language in root supported (given: {self._xml_root.attrib['language']})",
-                            RetCodes.XML_STRUCT_ERR)
-            for attr in self._xml_root.attrib.keys():
-                if attr not in self._ROOT_ATTRIBUTES:
-                    Utils.error(f"unsupported root attribute ({attr})", RetCodes.XML_STRUCT_ERR)
-        except KeyError:
-            Utils.error("root language attribute not stated", RetCodes.XML_STRUCT_ERR)
+            inst_order: int = int(inst.attrib["order"])
+            if inst_order <= 0:
+                raise ValueError
+            self._orders.append(inst_order)
+        except (ValueError, OverflowError):
+            raise XMLStructError(f"order must be positive integer (given: {inst.attrib['order']})")
+
+        arguments: List = self.sort_arguments(inst)
+        opcode: str = inst.attrib["opcode"].upper()
+        if opcode not in instructions.OPCODES:
+            raise XMLStructError(f"unknown opcode ({inst.attrib['opcode']})")
+        instr_cls, kinds = instructions.OPCODES[opcode]
+        self.check_operands(opcode, arguments, kinds)
+        self._instructions.append(instr_cls(arguments))
+
+    def sort_xml(self) -> List:
+        """Sort instructions by their order
+
+        :return: list with instructions
+        """
+        orders = self._orders
+        if all(orders[i] < orders[i + 1] for i in range(len(orders) - 1)):
+            return self._instructions   # already in order, the usual case
+        index: List[int] = sorted(range(len(orders)), key=orders.__getitem__)
+        for prev, cur in zip(index, index[1:]):
+            if orders[prev] == orders[cur]:
+                Utils.error(f"instruction order key already exist ({orders[cur]})", RetCodes.XML_STRUCT_ERR)
+        return [self._instructions[i] for i in index]
+
+    def check_header(self, root: ET.Element) -> None:
+        """Check program header for correct name and attributes
+
+        :param root: root element
+        """
+        if root.tag != "program":
+            raise XMLStructError(f"invalid root name ({root.tag})")
+        if "language" not in root.attrib:
+            raise XMLStructError("root language attribute not stated")
+        if root.attrib["language"].lower() != "ippcode22":
+            raise XMLStructError(f"only IPPcode22 language in root supported (given: {root.attrib['language']})")
+        for attr in root.attrib.keys():
+            if attr not in self._ROOT_ATTRIBUTES:
+                raise XMLStructError(f"unsupported root attribute ({attr})")
 
     def sort_arguments(self, inst: ET.Element) -> list:
         """Getting arguments from XML instruction
@@ -91,47 +146,110 @@ class XMLParse:
         :param inst: instruction
         :return: list with arguments
         """
-        instruction_args: List = [types.Types]
+        instruction_args: Dict[int, types.Types] = {}     # arguments by their order
         # pass instruction arguments through required validations
         for arg in inst:
             if not match(r"^(arg[123])$", arg.tag):
-                Utils.error("unknown argument name", RetCodes.XML_STRUCT_ERR)
+                raise XMLStructError("unknown argument name")
             else:
                 # check if type attribute was given
                 if len(arg.attrib) != 1 or arg.attrib.get("type") is None:
-                    Utils.error("bad argument attributes", RetCodes.XML_STRUCT_ERR)
+                    raise XMLStructError("bad argument attributes")
                 arg_order = int(arg.tag[-1])
                 # check if type attribute was given more than once
-                if arg_order in [argument.get_order for argument in instruction_args]:
-                    Utils.error("repeating argument order", RetCodes.XML_STRUCT_ERR)
+                if arg_order in instruction_args:
+                    raise XMLStructError("repeating argument order")
                 else:
-                    instruction_args.append(self.assign_type(arg_order, arg.attrib["type"], arg.text))
-        # sort arguments on their correct position
-        instruction_args = sorted(instruction_args[1:])
-        # check if arguments aren't missing
-        if (len(instruction_args) == 2 and instruction_args[1].get_order != 2) or \
-                (len(instruction_args) == 1 and instruction_args[0].get_order != 1):
-            Utils.error("missing arguments", RetCodes.XML_STRUCT_ERR)
-        return instruction_args
+                    instruction_args[arg_order] = self.assign_type(arg.attrib["type"], arg.text)
+        # sort arguments on their correct position and check if arguments aren't missing
+        orders: List[int] = sorted(instruction_args)
+        if orders != list(range(1, len(orders) + 1)):
+            raise XMLStructError("missing arguments")
+        return [instruction_args[order] for order in orders]
 
-    @staticmethod
-    def assign_type(order: int, type_: str, value: str) -> types.Types:
+    def check_operands(self, opcode: str, arguments: List[types.Types], kinds: Tuple[str, ...]) -> None:
+        """Check count and kinds of instruction operands
+
+        :param opcode: instruction opcode
+        :param arguments: sorted instruction arguments
+        :param kinds: required operand kinds (var, symb, label or type)
+        """
+        if len(arguments) != len(kinds):
+            raise XMLStructError(f"'{opcode}' requires {len(kinds)} operands (given: {len(arguments)})")
+        for position, (arg, kind) in enumerate(zip(arguments, kinds), 1):
+            if kind == "var":
+                valid = isinstance(arg, types.Variable)
+            elif kind == "symb":
+                valid = isinstance(arg, (types.Variable, types.Constant))
+            elif kind == "label":
+                valid = isinstance(arg, types.Label)
+            else:
+                valid = isinstance(arg, types.Type)
+                if valid and arg.get_value not in self._TYPES:
+                    raise XMLStructError(f"unsupported type ({arg.get_value})")
+            if not valid:
+                raise XMLStructError(f"'{opcode}' operand {position} must be {kind}")
+
+    def assign_type(self, type_: str, value: Optional[str]) -> types.Types:
         """
         Assign argument to suitable type class
 
-        :param order: argument order for future sorting
+        Equal operands are interned, so they're shared between instructions
+
         :param type_: argument type
         :param value: argument value
         :return: suitable argument type class instance
         """
-        if type_ == "int" or type_ == "bool" or type_ == "string" or type_ == "nil":
-            return types.Constant(type_, value, order=order)
-        elif type_ == "var":
-            return types.Variable(value, order=order)
-        elif type_ == "label":
-            return types.Label(value, order=order)
-        elif type_ == "type":
-            return types.Type(value, order=order)
+        operand = self._operands.get((type_, value))
+        if operand is None:
+            if type_ == "int" or type_ == "bool" or type_ == "string" or type_ == "nil":
+                operand = types.Constant.of(type_, self.parse_literal(type_, value))
+            elif type_ == "var":
+                if value is None or not self._VARIABLE_PATTERN.match(value):
+                    raise XMLStructError(f"bad variable ({value})")
+                operand = types.Variable(value)
+            elif type_ == "label":
+                operand = types.Label(value)
+            elif type_ == "type":
+                operand = types.Type(value)
+            else:
+                raise XMLStructError(f"unknown argument type ({type_})")
+            self._operands[(type_, value)] = operand
+        return operand
+
+    @classmethod
+    def parse_literal(cls, type_: str, value: str):
+        """
+        Convert constant literal on its native value
+
+        :param type_: constant type
+        :param value: constant literal from XML
+        :return: int, bool, str or None (nil) value
+        """
+        if type_ == "int":
+            literal = cls._INT_PATTERN.fullmatch(value or "")
+            if literal is None:
+                raise XMLStructError(f"bad int literal ({value})")
+            sign, hexadecimal, octal, decimal = literal.groups()
+            if hexadecimal is not None:
+                number = int(hexadecimal, 16)
+            elif octal is not None:
+                number = int(octal, 8)
+            else:
+                number = int(decimal, 10)
+            return -number if sign == "-" else number
+        elif type_ == "bool":
+            if value not in ("true", "false"):
+                raise XMLStructError(f"bad bool literal ({value})")
+            return value == "true"
+        elif type_ == "nil":
+            if value != "nil":
+                raise XMLStructError(f"bad nil literal ({value})")
+            return None
+        # string literal, replace escape sequences
+        if value is None:
+            return ""
+        return cls._ESCAPE_PATTERN.sub(lambda x: chr(int(x.group(1))), value)
 
     @property
     def get_instructions(self) -> List: